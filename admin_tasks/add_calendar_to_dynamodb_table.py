@@ -8,7 +8,7 @@ from pprint import pprint
 import thiscovery_lib.utilities as utils
 from src.common.acuity_utilities import AcuityClient
 from thiscovery_lib.dynamodb_utilities import Dynamodb
-from src.main import STACK_NAME
+from src.main import STACK_NAME, get_block_schedule
 
 
 def main():
@@ -25,17 +25,19 @@ def main():
             target_calendar = c
             continue
     if target_calendar:
+        calendar_item = {
+            'label': target_calendar['name'],
+            'block_monday_morning': True,
+            'emails_to_notify': list(),
+            'myinterview_link': None,
+        }
+        calendar_item['block_schedule'] = get_block_schedule(calendar_item)
         response = ddb_client.put_item(
             'Calendars',
             target_calendar['id'],
             item_type='acuity-calendar',
             item_details=target_calendar,
-            item={
-                'label': target_calendar['name'],
-                'block_monday_morning': True,
-                'emails_to_notify': list(),
-                'myinterview_link': None,
-            },
+            item=calendar_item,
         )
         assert response['ResponseMetadata']['HTTPStatusCode'] == HTTPStatus.OK, f'Dynamodb client put_item operation failed with response: {response}'
         print(f'Calendar "{calendar_name}" successfully added to Dynamodb table')
@@ -0,0 +1,57 @@
+"""
+This script sets the appointment_datetime attribute of existing Appointments items of upcoming appointments, so that
+they are included in the sparse reminder-stages-index queried by RemindersHandler (see src/reminders.py). Items
+written since reminder cadences were introduced already have this attribute
+"""
+import local.dev_config  # env variables
+import local.secrets  # env variables
+import thiscovery_lib.utilities as utils
+from thiscovery_lib.dynamodb_utilities import Dynamodb
+
+from src.common.constants import APPOINTMENTS_TABLE, STACK_NAME
+
+
+def backfill_appointment_datetime(dry_run=True):
+    """
+    Returns:
+        List of (appointment id, appointment_datetime) tuples of items that needed (or, if dry_run is False,
+        received) an update
+    """
+    ddb_client = Dynamodb(stack_name=STACK_NAME)
+    table = ddb_client.get_table(table_name=APPOINTMENTS_TABLE)
+    today = utils.now_with_tz().strftime('%Y-%m-%d')
+    changes = list()
+    for item in ddb_client.scan(table_name=APPOINTMENTS_TABLE):
+        if item.get('appointment_datetime') or (item.get('appointment_date') or '') < today:
+            continue
+        appointment_datetime = (item.get('acuity_info') or dict()).get('datetime')
+        if appointment_datetime is None:
+            continue
+        changes.append((item['id'], appointment_datetime))
+        if dry_run:
+            continue
+        table.update_item(
+            Key={'id': item['id']},
+            UpdateExpression='SET appointment_datetime = :appointment_datetime',
+            ExpressionAttributeValues={':appointment_datetime': appointment_datetime},
+        )
+    return changes
+
+
+def main():
+    changes = backfill_appointment_datetime(dry_run=True)
+    if not changes:
+        print('All upcoming Appointments items are up to date')
+        return
+    for appointment_id, appointment_datetime in changes:
+        print(f'{appointment_id}: appointment_datetime -> {appointment_datetime}')
+    confirmation = input("\nWould you like to update the items above? (y/n)")
+    if confirmation in ['y', 'Y']:
+        backfill_appointment_datetime(dry_run=False)
+        print("Done")
+    else:
+        print("Aborted")
+
+
+if __name__ == '__main__':
+    main()
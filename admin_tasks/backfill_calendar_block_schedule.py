@@ -0,0 +1,62 @@
+"""
+This script sets (or removes) the block_schedule attribute of existing Calendars items, so that the
+sparse block-schedule-index queried by CalendarBlocker (see src/main.py) contains exactly the calendars
+with block rules (block_rules, or block_monday_morning set to True). CalendarBlocks items need no backfill,
+as all of them already have the status attribute used by status-index
+"""
+import local.dev_config  # env variables
+import local.secrets  # env variables
+from thiscovery_lib.dynamodb_utilities import Dynamodb
+
+from src.common.constants import CALENDARS_TABLE, STACK_NAME
+from src.main import get_block_schedule
+
+
+def backfill_block_schedule(dry_run=True):
+    """
+    Returns:
+        List of (calendar id, label, current block_schedule, expected block_schedule) tuples of items that needed
+        (or, if dry_run is False, received) an update
+    """
+    ddb_client = Dynamodb(stack_name=STACK_NAME)
+    table = ddb_client.get_table(table_name=CALENDARS_TABLE)
+    changes = list()
+    for item in ddb_client.scan(table_name=CALENDARS_TABLE):
+        expected = get_block_schedule(item)
+        current = item.get('block_schedule')
+        if current == expected:
+            continue
+        changes.append((item['id'], item.get('label'), current, expected))
+        if dry_run:
+            continue
+        if expected is None:
+            table.update_item(
+                Key={'id': item['id']},
+                UpdateExpression='REMOVE block_schedule',
+            )
+        else:
+            table.update_item(
+                Key={'id': item['id']},
+                UpdateExpression='SET block_schedule = :block_schedule',
+                ExpressionAttributeValues={':block_schedule': expected},
+            )
+    return changes
+
+
+def main():
+    changes = backfill_block_schedule(dry_run=True)
+    if not changes:
+        print('All Calendars items are up to date')
+        return
+    for calendar_id, label, current, expected in changes:
+        print(f'{calendar_id} ({label}): block_schedule {current} -> {expected}')
+    confirmation = input("\nWould you like to update the items above? (y/n)")
+    if confirmation in ['y', 'Y']:
+        backfill_block_schedule(dry_run=False)
+        print("Done")
+    else:
+        print("Aborted")
+
+
+if __name__ == '__main__':
+    main()
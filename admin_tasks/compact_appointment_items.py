@@ -0,0 +1,59 @@
+"""
+This script rewrites existing Appointments items so that acuity_info is stored in the compact
+format used when ACUITY_INFO_STORAGE_MODE is 'compact' or 'compact_archive' (see src/common/constants.py),
+and reports the average item size before and after the migration
+"""
+import local.dev_config  # env variables
+import local.secrets  # env variables
+from thiscovery_lib.dynamodb_utilities import Dynamodb
+
+from src.appointments import AcuityAppointment
+from src.common.constants import ACUITY_INFO_STORAGE_MODES, APPOINTMENTS_TABLE, STACK_NAME
+from src.common.ddb_utilities import get_item_size
+
+
+def compact_appointment_items(storage_mode, dry_run=True):
+    AcuityAppointment.acuity_info_storage_mode = storage_mode
+    ddb_client = Dynamodb(stack_name=STACK_NAME)
+    items = ddb_client.scan(table_name=APPOINTMENTS_TABLE)
+    sizes_before = list()
+    sizes_after = list()
+    for item in items:
+        appointment = AcuityAppointment(appointment_id=item['id'])
+        appointment._load_ddb_item(item)
+        changes = appointment.get_changed_attributes()
+        sizes_before.append(get_item_size(item))
+        sizes_after.append(get_item_size({**item, **changes}))
+        if changes and not dry_run:
+            appointment._write_changes(changes)
+    return sizes_before, sizes_after
+
+
+def print_report(sizes_before, sizes_after):
+    if not sizes_before:
+        print('No items found in Appointments table')
+        return
+    average_before = sum(sizes_before) / len(sizes_before)
+    average_after = sum(sizes_after) / len(sizes_after)
+    print(f'Items processed: {len(sizes_before)}')
+    print(f'Average item size before: {average_before:.0f} bytes (max {max(sizes_before)} bytes)')
+    print(f'Average item size after: {average_after:.0f} bytes (max {max(sizes_after)} bytes)')
+    print(f'Reduction: {100 * (1 - average_after / average_before):.1f}%')
+
+
+def main():
+    storage_mode = input(f"Please enter the target storage mode {ACUITY_INFO_STORAGE_MODES[1:]}:")
+    if storage_mode not in ACUITY_INFO_STORAGE_MODES[1:]:
+        print("Aborted; invalid storage mode")
+        return
+    print_report(*compact_appointment_items(storage_mode, dry_run=True))
+    confirmation = input("\nWould you like to rewrite the items above? (y/n)")
+    if confirmation in ['y', 'Y']:
+        compact_appointment_items(storage_mode, dry_run=False)
+        print("Done")
+    else:
+        print("Aborted")
+
+
+if __name__ == '__main__':
+    main()
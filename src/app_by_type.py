@@ -22,6 +22,21 @@ from http import HTTPStatus
 from thiscovery_lib.dynamodb_utilities import Dynamodb
 
 from common.constants import APPOINTMENTS_TABLE, STACK_NAME
+from common.ddb_utilities import trace_ddb_client
+from common.invocation_utilities import invocation_hooks
+from common.metrics_utilities import metrics
+
+
+def expand_acuity_info_archive(item):
+    """
+    Merges the compressed acuity_info_archive attribute of Appointments items stored in compact_archive mode (which
+    json cannot serialise) back into acuity_info, so that API responses contain the full Acuity payload in all modes
+    """
+    archive = item.pop('acuity_info_archive', None)
+    if (archive is not None) and (item.get('acuity_info') is not None):
+        from common.acuity_utilities import decompress_acuity_info
+        item['acuity_info'] = {**item['acuity_info'], **decompress_acuity_info(archive)}
+    return item
 
 
 def get_appointments_by_type(type_ids, correlation_id=None):
@@ -32,7 +47,7 @@ def get_appointments_by_type(type_ids, correlation_id=None):
     Returns:
         List of appointments matching any of the input type ids
     """
-    ddb_client = Dynamodb(stack_name=STACK_NAME, correlation_id=correlation_id)
+    ddb_client = trace_ddb_client(Dynamodb(stack_name=STACK_NAME, correlation_id=correlation_id))
     items = list()
     for i in type_ids:
         result = ddb_client.query(
@@ -43,11 +58,13 @@ def get_appointments_by_type(type_ids, correlation_id=None):
                 ':type_id': i,
             }
         )
-        items += result
+        items += [expand_acuity_info_archive(x) for x in result]
+    metrics.put_metric('ItemsProcessed', len(items))
     return items
 
 
 @utils.lambda_wrapper
+@invocation_hooks
 @utils.api_error_handler
 def get_appointments_by_type_api(event, context):
     logger = event['logger']
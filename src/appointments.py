@@ -17,24 +17,145 @@
 #
 import datetime
 import json
+import operator
+import random
 import re
 import thiscovery_lib.utilities as utils
 
-from collections import ChainMap
-from dateutil import parser
+from botocore.exceptions import ClientError
 from http import HTTPStatus
-from thiscovery_lib.core_api_utilities import CoreApiClient
-from thiscovery_lib.dynamodb_utilities import Dynamodb
-from thiscovery_lib.emails_api_utilities import EmailsApiClient
 
-from common.acuity_utilities import AcuityClient
-from common.constants import ACUITY_USER_METADATA_INTAKE_FORM_ID, APPOINTMENTS_TABLE, APPOINTMENT_TYPES_TABLE, DEFAULT_TEMPLATES, STACK_NAME
+from common.acuity_utilities import AcuityClient, compress_acuity_info, decompress_acuity_info, split_acuity_info
+from common.cache_utilities import appointment_types_cache, calendars_cache, core_api_cache
+from common.constants import ACUITY_INFO_STORAGE_MODE, ACUITY_STATE_MAX_AGE_HOURS, ACUITY_STATE_VERIFICATION_RATE, \
+    ACUITY_USER_METADATA_INTAKE_FORM_ID, APPOINTMENTS_TABLE, APPOINTMENT_TYPES_TABLE, CALENDARS_TABLE, DEFAULT_TEMPLATES
+from common.ddb_utilities import get_ddb_client
+from common.invocation_utilities import invocation_hooks
+from common.logging_utilities import LazyExtra, add_lazy_extra_filter
+from common.metrics_utilities import metrics
+from common.reminder_cadence_utilities import get_global_cadence, validate_cadence
+from common.reminder_schedule_utilities import ReminderSchedule
+from common.secrets_utilities import get_secret
+from common.tracing_utilities import tracer
+from common.warmup_utilities import get_lambda_handler, prime_acuity_session, prime_appointment_types_cache, \
+    prime_calendars_cache, prime_secrets, should_warm_up, warm_up
+# dateutil and the core and emails API clients are imported where they are used, so that handlers that do not need
+# them start faster (see tests/benchmarks/handler_import_benchmark.py)
+
+CORE_API_TRACED_METHODS = ['get_projects', 'get_user_id_by_email', 'get_userprojects', 'send_transactional_email',
+                           'set_user_task_completed']
+EMAILS_API_TRACED_METHODS = ['send_email']
+
+
+_UNSET = object()
+
+class SlottedItem:
+    """
+    Base class for models backed by a Dynamodb item. Subclasses declare the attributes they serialise in fields;
+    attribute values are read with a getter precomputed per class rather than by introspecting __dict__.
+    Attributes added to items by Dynamodb.put_item (metadata_fields) are serialised only if they have been
+    loaded and any unexpected attributes passed to from_dict are kept in _extra_attributes, so that items
+    survive a load/dump round trip unchanged.
+    """
+    __slots__ = ('_extra_attributes',)
+    fields = ()
+    metadata_fields = ('id', 'type', 'details')
+    excluded_fields = ('created', 'modified')  # attributes that can be loaded but are not serialised by as_dict
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._get_field_values = operator.attrgetter(*cls.fields)
+        cls._known_attributes = frozenset(cls.fields + cls.metadata_fields + cls.excluded_fields)
+
+    def as_dict(self):
+        d = dict(zip(self.fields, self._get_field_values(self)))
+        for f in self.metadata_fields:
+            v = getattr(self, f, _UNSET)
+            if v is not _UNSET:
+                d[f] = v
+        if self._extra_attributes:
+            d.update(self._extra_attributes)
+        return d
+
+    def from_dict(self, item_dict):
+        for k, v in item_dict.items():
+            if k in self._known_attributes:
+                setattr(self, k, v)
+            else:
+                if self._extra_attributes is None:
+                    self._extra_attributes = dict()
+                self._extra_attributes[k] = v
+
+    def lazy_as_dict(self):
+        """
+        Returns:
+            as_dict() output for use in logger extra dicts; only computed if the log record is emitted
+        """
+        return LazyExtra(self.as_dict)
+
 
+def _template_level_items(value, path):
+    if not isinstance(value, dict):
+        raise utils.DetailedValueError(
+            f'Malformed email templates: {"/".join(path) or "templates"} is not a dictionary',
+            details={'path': path, 'value': value}
+        )
+    return value.items()
+
+
+def build_template_table(templates):
+    """
+    Flattens a nested templates dictionary (see DEFAULT_TEMPLATES in common.constants) into a single-level lookup table
 
-class AppointmentType:
+    Args:
+        templates (dict): {recipient_type: {event_type: {medium: {domain: {'name': ..., 'custom_properties': [...]}}}}}
+
+    Returns:
+        Dictionary of templates keyed by (recipient_type, event_type, medium, domain) tuples
+    """
+    table = dict()
+    for recipient_type, events in _template_level_items(templates, ()):
+        for event_type, media in _template_level_items(events, (recipient_type,)):
+            for medium, domains in _template_level_items(media, (recipient_type, event_type)):
+                for domain, template in _template_level_items(domains, (recipient_type, event_type, medium)):
+                    key = (recipient_type, event_type, medium, domain)
+                    if (not isinstance(template, dict)) or (not isinstance(template.get('name'), str)) or \
+                            (not isinstance(template.get('custom_properties', list()), list)):
+                        raise utils.DetailedValueError(
+                            f'Malformed email template {"/".join(key)}; templates must be dictionaries containing '
+                            f'a name string and a custom_properties list',
+                            details={'path': key, 'template': template}
+                        )
+                    table[key] = template
+    return table
+
+
+DEFAULT_TEMPLATE_TABLE = build_template_table(DEFAULT_TEMPLATES)
+
+
+class AppointmentType(SlottedItem):
     """
     Represents an Acuity appointment type with additional attributes
     """
+    fields = (
+        'type_id',
+        'name',
+        'category',
+        'has_link',
+        'send_notifications',
+        'templates',
+        'project_task_id',
+        'reminder_cadence',
+    )
+    __slots__ = fields + SlottedItem.metadata_fields + SlottedItem.excluded_fields + (
+        '_logger',
+        '_correlation_id',
+        '_ddb',
+        '_acuity',
+        '_template_source',
+        '_template_table',
+    )
+
     def __init__(self, ddb_client=None, acuity_client=None, logger=None, correlation_id=None):
         self.type_id = None
         self.name = None
@@ -44,26 +165,54 @@ class AppointmentType:
         self.templates = None
         self.modified = None  # flag used in ddb_load method to check if ddb data was already fetched
         self.project_task_id = None
+        self.reminder_cadence = None  # list of reminder stages; None to use the global cadence
+        self._extra_attributes = None
 
         self._logger = logger
         self._correlation_id = correlation_id
         if logger is None:
             self._logger = utils.get_logger()
-        self._ddb_client = ddb_client
-        if ddb_client is None:
-            self._ddb_client = Dynamodb(stack_name=STACK_NAME)
-        self._acuity_client = acuity_client
-        if acuity_client is None:
-            self._acuity_client = AcuityClient(correlation_id=self._correlation_id)
-
-    def as_dict(self):
-        return {k: v for k, v in self.__dict__.items() if (k[0] != "_") and (k not in ['created', 'modified'])}
-
-    def from_dict(self, type_dict):
-        self.__dict__.update(type_dict)
+        self._ddb = ddb_client
+        self._acuity = acuity_client
+        self._template_source = None
+        self._template_table = None
+
+    @property
+    def _ddb_client(self):
+        if self._ddb is None:
+            self._ddb = get_ddb_client()
+        return self._ddb
+
+    @property
+    def _acuity_client(self):
+        if self._acuity is None:
+            self._acuity = AcuityClient(correlation_id=self._correlation_id)
+        return self._acuity
+
+    def get_template_table(self):
+        """
+        Returns:
+            This type's effective email templates (see build_template_table). A templates dictionary overrides
+            DEFAULT_TEMPLATES per recipient_type; the table is rebuilt only when templates is replaced
+        """
+        if not isinstance(self.templates, dict):
+            return DEFAULT_TEMPLATE_TABLE
+        if self._template_source is not self.templates:
+            self._template_table = build_template_table({**DEFAULT_TEMPLATES, **self.templates})
+            self._template_source = self.templates
+        return self._template_table
+
+    def get_reminder_cadence(self):
+        """
+        Returns:
+            This type's validated reminder stages (see common.reminder_cadence_utilities), furthest first
+        """
+        if self.reminder_cadence:
+            return validate_cadence(self.reminder_cadence)
+        return get_global_cadence()
 
     def ddb_dump(self, update_allowed=False):
-        return self._ddb_client.put_item(
+        result = self._ddb_client.put_item(
             table_name=APPOINTMENT_TYPES_TABLE,
             key=str(self.type_id),
             item_type='acuity-appointment-type',
@@ -71,17 +220,20 @@ class AppointmentType:
             item=self.as_dict(),
             update_allowed=update_allowed
         )
+        appointment_types_cache.invalidate(self.type_id)  # other processes are notified via the table stream
+        return result
+
+    def _get_ddb_item(self):
+        return self._ddb_client.get_item(
+            table_name=APPOINTMENT_TYPES_TABLE,
+            key=str(self.type_id),
+            correlation_id=self._correlation_id
+        )
 
     def ddb_load(self):
         if self.modified is None:
-            item = self._ddb_client.get_item(
-                table_name=APPOINTMENT_TYPES_TABLE,
-                key=str(self.type_id),
-                correlation_id=self._correlation_id
-            )
-            try:
-                self.__dict__.update(item)
-            except TypeError:
+            item = appointment_types_cache.get_item(self.type_id, loader=self._get_ddb_item)
+            if item is None:
                 raise utils.ObjectDoesNotExistError(
                     f'Appointment type {self.type_id} could not be found in Dynamodb',
                     details={
@@ -89,6 +241,8 @@ class AppointmentType:
                         'correlation_id': self._correlation_id,
                     }
                 )
+            self.from_dict(item)
+            self.get_template_table()  # raises DetailedValueError if templates overrides are malformed
 
     def get_appointment_type_id_to_info_map(self):
         """
@@ -109,13 +263,66 @@ class AppointmentType:
             self.category = id_to_info[str(self.type_id)]['category']
 
 
-class AcuityAppointment:
+class WriteConflictError(utils.DetailedValueError):
+    """
+    Raised when a conditional write to an Appointments item fails because another process updated the item first
+    """
+    def __init__(self, message, details, current_item):
+        super().__init__(message, details)
+        self.current_item = current_item
+
+
+class AcuityAppointment(SlottedItem):
     """
     Represents an Acuity appointment
+
+    Writes to existing Appointments items are conditional on the item's version attribute, which is incremented
+    by every write. If another process wrote to the item since this instance last read it, the write is retried
+    on top of the latest item (up to max_write_attempts times) and write_conflicts is incremented.
     """
+    fields = (
+        'appointment_id',
+        'acuity_info',
+        'acuity_synced',
+        'calendar_id',
+        'calendar_name',
+        'link',
+        'participant_email',
+        'participant_user_id',
+        'latest_participant_notification',
+        'appointment_date',
+        'appointment_datetime',
+        'reminder_stage',
+        'anon_project_specific_user_id',
+        'project_id',
+        'project_short_name',
+        'anon_user_task_id',
+        'appointment_type_id',
+        'version',
+    )
+    excluded_fields = SlottedItem.excluded_fields + ('appointment_type',)  # appointment_type is serialised by as_dict
+    __slots__ = fields + SlottedItem.metadata_fields + excluded_fields + (
+        '_logger',
+        '_correlation_id',
+        '_acuity',
+        '_ddb',
+        '_core_api',
+        '_ddb_item',
+        '_acuity_info_archive',
+    )
+    # attributes updated by their own methods (e.g. update_link); ddb_update does not overwrite them unless they were loaded from Dynamodb
+    externally_managed_attributes = ['link', 'latest_participant_notification', 'reminder_stage']
+    # participant identity resolved through the core API (see AppointmentNotifier.persist_resolved_identity); not
+    # known when an Acuity event is processed, so ddb_update does not overwrite stored values with None
+    identity_attributes = ['participant_user_id', 'anon_project_specific_user_id', 'project_id', 'project_short_name']
+    max_write_attempts = 3
+    write_conflicts = 0  # process-wide count of conditional writes that failed due to concurrent updates
+    acuity_info_storage_mode = ACUITY_INFO_STORAGE_MODE  # see common.constants
+
     def __init__(self, appointment_id, logger=None, correlation_id=None):
         self.appointment_id = str(appointment_id)
         self.acuity_info = None
+        self.acuity_synced = None  # time acuity_info was fetched from Acuity
         self.calendar_id = None
         self.calendar_name = None
         self.link = None
@@ -124,47 +331,127 @@ class AcuityAppointment:
         self.appointment_type = AppointmentType()
         self.latest_participant_notification = '0000-00-00 00:00:00+00:00'  # used as GSI sort key, so cannot be None
         self.appointment_date = None
+        self.appointment_datetime = None  # sort key of reminder-stages-index
+        self.reminder_stage = None  # stage of the latest reminder sent (see common.reminder_cadence_utilities)
         self.anon_project_specific_user_id = None
+        self.project_id = None
+        self.project_short_name = None
         self.anon_user_task_id = None
         self.appointment_type_id = None
+        self.version = None  # None if unknown (i.e. item not read from Dynamodb by this instance)
+        self._extra_attributes = None
 
         self._logger = logger
         if self._logger is None:
             self._logger = utils.get_logger()
+        add_lazy_extra_filter(self._logger)
         self._correlation_id = correlation_id
-        self._acuity_client = AcuityClient(correlation_id=self._correlation_id)
-        self._ddb_client = Dynamodb(stack_name=STACK_NAME)
-        self._core_api_client = CoreApiClient(correlation_id=self._correlation_id)
+        self._acuity = None
+        self._ddb = None
+        self._core_api = None
+        self._ddb_item = None  # Dynamodb item as last read or written by this instance; ddb_update diffs against it
+        self._acuity_info_archive = None  # compressed Acuity fields not kept in acuity_info (compact_archive storage mode)
 
     def __repr__(self):
-        return str(self.__dict__)
+        return str(self.as_dict())
+
+    @property
+    def _acuity_client(self):
+        if self._acuity is None:
+            self._acuity = AcuityClient(correlation_id=self._correlation_id)
+        return self._acuity
+
+    @property
+    def _ddb_client(self):
+        if self._ddb is None:
+            self._ddb = get_ddb_client()
+        return self._ddb
+
+    @property
+    def _core_api_client(self):
+        if self._core_api is None:
+            from thiscovery_lib.core_api_utilities import CoreApiClient
+            self._core_api = tracer.trace_methods(
+                CoreApiClient(correlation_id=self._correlation_id), 'core_api', CORE_API_TRACED_METHODS
+            )
+        return self._core_api
 
     def from_dict(self, appointment_dict):
         """Used to quickly load appointments into Dynamodb for testing"""
-        self.__dict__.update(appointment_dict)
+        super().from_dict(appointment_dict)
 
     def as_dict(self):
-        d = {k: v for k, v in self.__dict__.items() if (k[0] != "_") and (k not in ['created', 'modified', 'appointment_type'])}
+        d = super().as_dict()
         d['appointment_type'] = self.appointment_type.as_dict()
         return d
 
+    def as_ddb_item(self):
+        """
+        Returns:
+            as_dict() output, with acuity_info stored according to acuity_info_storage_mode
+        """
+        d = self.as_dict()
+        if d.get('appointment_datetime') is None:  # index key attributes cannot be null
+            d.pop('appointment_datetime', None)
+        if (self.acuity_info_storage_mode == 'full') or (self.acuity_info is None):
+            return d
+        d['acuity_info'], remaining_info = split_acuity_info(self.acuity_info)
+        if self.acuity_info_storage_mode == 'compact_archive':
+            if remaining_info:
+                d['acuity_info_archive'] = compress_acuity_info(remaining_info)
+            elif self._acuity_info_archive is not None:  # acuity_info was loaded from a compact item
+                d['acuity_info_archive'] = self._acuity_info_archive
+        return d
+
+    def expand_acuity_info(self):
+        """
+        Restores the full Acuity payload of an appointment loaded from an item stored in compact_archive mode
+        """
+        if (self.acuity_info is not None) and (self._acuity_info_archive is not None):
+            self.acuity_info = {**self.acuity_info, **decompress_acuity_info(self._acuity_info_archive)}
+        return self.acuity_info
+
+    @classmethod
+    def get_write_conflicts(cls):
+        return cls.write_conflicts
+
     def ddb_dump(self, update_allowed=False):
         self.get_appointment_info_from_acuity()  # populates self.appointment_type.type_id
         self.appointment_type.ddb_load()
-        # self.get_participant_user_id()
-        return self._ddb_client.put_item(
+        self.version = (self.version or 0) + 1
+        item = self.as_ddb_item()
+        result = self._ddb_client.put_item(
             table_name=APPOINTMENTS_TABLE,
             key=self.appointment_id,
             item_type='acuity-appointment',
             item_details=None,
-            item=self.as_dict(),
+            item=item,
             update_allowed=update_allowed
         )
+        self._ddb_item = dict(item)  # later writes (e.g. persist_resolved_identity) diff against the item just stored
+        return result
+
+    def _load_ddb_item(self, item, skip_attributes=()):
+        """
+        Populates this instance from a Dynamodb item
+
+        Args:
+            item (dict): Appointments table item
+            skip_attributes: attributes that should keep their current value
+        """
+        self._ddb_item = dict(item)
+        item = {k: v for k, v in item.items() if k not in skip_attributes}
+        item_app_type = item.pop('appointment_type', None)
+        self._acuity_info_archive = item.pop('acuity_info_archive', self._acuity_info_archive)
+        self.from_dict(item)
+        if item_app_type is not None:
+            self.appointment_type.from_dict(item_app_type)
+        self.version = self._ddb_item.get('version', 0)
 
     def ddb_load(self):
         item = self.get_appointment_item_from_ddb()
         try:
-            item_app_type = item['appointment_type']
+            item['appointment_type']
         except TypeError:
             raise utils.ObjectDoesNotExistError(
                 f'Appointment {self.appointment_id} could not be found in Dynamodb',
@@ -173,9 +460,149 @@ class AcuityAppointment:
                     'correlation_id': self._correlation_id,
                 }
             )
-        del item['appointment_type']
-        self.__dict__.update(item)
-        self.appointment_type.from_dict(item_app_type)
+        self._load_ddb_item(item)
+
+    def _update_ddb_item(self, name_value_pairs, return_values='NONE'):
+        """
+        Sets the attributes in name_value_pairs on the existing Dynamodb item using a single UpdateItem call.
+        Unlike Dynamodb.update_item, the call is conditional on the item already existing, so that a
+        partial item is never created. If self.version is known, the call is also conditional on the stored
+        version matching it; otherwise the stored version is incremented unconditionally.
+
+        Args:
+            name_value_pairs (dict): attributes to set
+            return_values (str): passed on to boto3 as ReturnValues (e.g. 'ALL_OLD')
+
+        Returns:
+            boto3 update_item response
+        """
+        attribute_names = {'#id': 'id', '#modified': 'modified', '#version': 'version'}
+        attribute_values = {':modified': str(utils.now_with_tz())}
+        set_expressions = ['#modified = :modified']
+        for i, (name, value) in enumerate(name_value_pairs.items()):
+            attribute_names[f'#a{i}'] = name
+            attribute_values[f':v{i}'] = value
+            set_expressions.append(f'#a{i} = :v{i}')
+        condition_expression = 'attribute_exists(#id)'
+        if self.version is None:
+            update_expression = f"SET {', '.join(set_expressions)} ADD #version :one"
+            attribute_values[':one'] = 1
+        else:
+            set_expressions.append('#version = :new_version')
+            update_expression = f"SET {', '.join(set_expressions)}"
+            attribute_values[':new_version'] = self.version + 1
+            attribute_values[':expected_version'] = self.version
+            if self.version == 0:  # items created before versioning was introduced
+                condition_expression += ' AND (attribute_not_exists(#version) OR #version = :expected_version)'
+            else:
+                condition_expression += ' AND #version = :expected_version'
+        table = self._ddb_client.get_table(table_name=APPOINTMENTS_TABLE)
+        try:
+            result = table.update_item(
+                Key={'id': self.appointment_id},
+                UpdateExpression=update_expression,
+                ConditionExpression=condition_expression,
+                ExpressionAttributeNames=attribute_names,
+                ExpressionAttributeValues=attribute_values,
+                ReturnValues=return_values,
+            )
+        except ClientError as err:
+            if err.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            error_details = {
+                'appointment': self.as_dict(),
+                'correlation_id': self._correlation_id,
+            }
+            current_item = self.get_appointment_item_from_ddb()
+            if current_item is None:
+                raise utils.ObjectDoesNotExistError(
+                    f'Appointment {self.appointment_id} could not be found in Dynamodb',
+                    details=error_details
+                )
+            raise WriteConflictError(
+                f'Appointment {self.appointment_id} was updated by another process (expected version {self.version}, '
+                f'found {current_item.get("version")})',
+                details=error_details,
+                current_item=current_item,
+            )
+        assert result['ResponseMetadata']['HTTPStatusCode'] == HTTPStatus.OK, \
+            f'Call to ddb table update_item method failed with response {result}'
+        if self.version is not None:
+            self.version += 1
+        if self._ddb_item is not None:
+            self._ddb_item.update(name_value_pairs)
+            self._ddb_item['version'] = self.version
+        return result
+
+    def _write_changes(self, changes, return_values='NONE'):
+        """
+        Writes changes to Dynamodb, retrying on top of the latest stored item if the write conflicts
+        with a concurrent update. Attributes not in changes are refreshed from the stored item before
+        each retry, so that values written by other processes (e.g. link) are never overwritten.
+
+        Args:
+            changes (dict): attributes to set
+            return_values (str): passed on to boto3 as ReturnValues
+
+        Returns:
+            boto3 update_item response
+        """
+        for attempt in range(1, self.max_write_attempts + 1):
+            try:
+                return self._update_ddb_item(changes, return_values=return_values)
+            except WriteConflictError as err:
+                AcuityAppointment.write_conflicts += 1
+                self._logger.info('Conflicting write to appointment item', extra={
+                    'appointment_id': self.appointment_id,
+                    'attempt': attempt,
+                    'changed_attributes': list(changes.keys()),
+                    'correlation_id': self._correlation_id,
+                })
+                if attempt == self.max_write_attempts:
+                    raise
+                self._load_ddb_item(err.current_item, skip_attributes=changes.keys())
+
+    def get_changed_attributes(self):
+        """
+        Returns:
+            Dictionary of attributes that need to be written to Dynamodb. If this instance has a copy of the
+            Dynamodb item (see ddb_load), only attributes that differ from that copy are returned; otherwise,
+            all attributes except externally_managed_attributes and unresolved (None) identity_attributes are returned
+        """
+        new_item = self.as_ddb_item()
+        del new_item['version']
+        if self._ddb_item is None:
+            return {
+                k: v for k, v in new_item.items()
+                if (k not in self.externally_managed_attributes) and not ((k in self.identity_attributes) and (v is None))
+            }
+        return {k: v for k, v in new_item.items() if self._ddb_item.get(k) != v}
+
+    def ddb_update(self):
+        """
+        Diff-based alternative to ddb_dump(update_allowed=True) for appointments that already exist in Dynamodb.
+        Writes only changed attributes in one UpdateItem call and uses ReturnValues=ALL_OLD to load
+        externally_managed_attributes from the stored item, so no separate get_item call is needed.
+
+        Returns:
+            boto3 update_item response; response['Attributes'] contains the item as it was before the update
+        """
+        self.get_appointment_info_from_acuity()  # populates self.appointment_type.type_id
+        self.appointment_type.ddb_load()
+        changes = self.get_changed_attributes()
+        loaded_from_ddb = self._ddb_item is not None
+        result = self._write_changes(changes, return_values='ALL_OLD')
+        original_item = result['Attributes']
+        if not loaded_from_ddb:
+            for k in self.externally_managed_attributes:
+                if k in original_item:
+                    setattr(self, k, original_item[k])
+            for k in self.identity_attributes:
+                if (k not in changes) and (k in original_item):
+                    setattr(self, k, original_item[k])
+            self.version = original_item.get('version', 0) + 1
+        self._ddb_item = {**original_item, **changes, 'version': self.version}
+        return result
 
     def get_appointment_item_from_ddb(self):
         return self._ddb_client.get_item(
@@ -187,46 +614,58 @@ class AcuityAppointment:
         if self.participant_user_id is None:
             if self.participant_email is None:
                 self.get_appointment_info_from_acuity()
-            self.participant_user_id = self._core_api_client.get_user_id_by_email(
+            self.participant_user_id = core_api_cache.get_user_id_by_email(
+                core_api_client=self._core_api_client,
                 email=self.participant_email
             )
         return self.participant_user_id
 
     def update_link(self, link):
         self.link = link
-        result = self._ddb_client.update_item(
-            table_name=APPOINTMENTS_TABLE,
-            key=self.appointment_id,
-            name_value_pairs={
-                'link': self.link
-            }
-        )
-        assert result['ResponseMetadata']['HTTPStatusCode'] == HTTPStatus.OK, \
-            f'Call to ddb client update_item method failed with response {result}'
+        result = self._write_changes({'link': self.link})
         return result['ResponseMetadata']['HTTPStatusCode']
 
+    def get_unsaved_identity_attributes(self):
+        """
+        Returns:
+            Dictionary of identity_attributes resolved since this instance was loaded or stored that differ from
+            the Dynamodb item
+        """
+        ddb_item = self._ddb_item or dict()
+        return {
+            k: getattr(self, k) for k in self.identity_attributes
+            if (getattr(self, k) is not None) and (ddb_item.get(k) != getattr(self, k))
+        }
+
     def update_latest_participant_notification(self):
+        """
+        Also writes identity attributes resolved while notifying the participant, so that storing them does not
+        need a separate UpdateItem call
+        """
         self.latest_participant_notification = str(utils.now_with_tz())
-        result = self._ddb_client.update_item(
-            table_name=APPOINTMENTS_TABLE,
-            key=self.appointment_id,
-            name_value_pairs={
-                'latest_participant_notification': self.latest_participant_notification
-            }
-        )
-        assert result['ResponseMetadata']['HTTPStatusCode'] == HTTPStatus.OK, \
-            f'Call to ddb client update_item method failed with response {result}'
+        result = self._write_changes({
+            **self.get_unsaved_identity_attributes(),
+            'latest_participant_notification': self.latest_participant_notification,
+        })
+        return result['ResponseMetadata']['HTTPStatusCode']
+
+    def update_reminder_stage(self, stage):
+        self.reminder_stage = stage
+        result = self._write_changes({'reminder_stage': self.reminder_stage})
         return result['ResponseMetadata']['HTTPStatusCode']
 
     def get_appointment_info_from_acuity(self, force_refresh=False):
         if (self.acuity_info is None) or (force_refresh is True):
-            self.acuity_info = self._acuity_client.get_appointment_by_id(self.appointment_id)
+            with metrics.timer('AcuityFetchMs'):
+                self.acuity_info = self._acuity_client.get_appointment_by_id(self.appointment_id)
+            self.acuity_synced = str(utils.now_with_tz())
             self.appointment_type.type_id = str(self.acuity_info['appointmentTypeID'])
             self.appointment_type_id = self.appointment_type.type_id
             self.calendar_name = self.acuity_info['calendar']
             self.calendar_id = str(self.acuity_info['calendarID'])
             self.participant_email = self.acuity_info['email']
             self.appointment_date = self.acuity_info['datetime'].split('T')[0]
+            self.appointment_datetime = self.acuity_info['datetime']
             # intake form processing
             for form in self.acuity_info['forms']:
                 if form['id'] == ACUITY_USER_METADATA_INTAKE_FORM_ID:
@@ -237,7 +676,7 @@ class AcuityAppointment:
 
 
 class AppointmentNotifier:
-    calendar_table = 'Calendars'
+    calendar_table = CALENDARS_TABLE
 
     def __init__(self, appointment, logger=None, ddb_client=None, correlation_id=None):
         """
@@ -247,10 +686,14 @@ class AppointmentNotifier:
             correlation_id:
         """
         self.appointment = appointment
-        self.project_id = None
-        self.project_short_name = None
-        self.anon_project_specific_user_id = None
+        self.project_id = appointment.project_id
+        self.project_short_name = appointment.project_short_name
+        self.anon_project_specific_user_id = appointment.anon_project_specific_user_id
         self.interviewer_calendar_ddb_item = None
+        self.appointment_datetime = None
+        self.custom_property_values = dict()
+        self.acuity_info_fresh = False  # set if appointment.acuity_info was just fetched from Acuity (e.g. in bulk)
+        self.force_refresh = False  # set if appointment.acuity_info must be refetched even if stored state is fresh
 
         if self.appointment.participant_email is None:
             self.appointment.get_appointment_info_from_acuity()
@@ -258,10 +701,11 @@ class AppointmentNotifier:
         self.logger = logger
         if logger is None:
             self.logger = utils.get_logger()
+        add_lazy_extra_filter(self.logger)
         self.correlation_id = correlation_id
         self.ddb_client = ddb_client
         if ddb_client is None:
-            self.ddb_client = Dynamodb(stack_name=STACK_NAME)
+            self.ddb_client = get_ddb_client()
 
     def _get_email_template(self, recipient_email, recipient_type, event_type):
         email_domain = 'other'
@@ -271,18 +715,13 @@ class AppointmentNotifier:
         if self.appointment.appointment_type.has_link is True:
             interview_medium = 'web'
 
-        templates = DEFAULT_TEMPLATES
-        if isinstance(self.appointment.appointment_type.templates, dict):
-            templates = ChainMap(self.appointment.appointment_type.templates, DEFAULT_TEMPLATES)
-        return templates[recipient_type][event_type][interview_medium][email_domain]
+        template_table = self.appointment.appointment_type.get_template_table()
+        return template_table[(recipient_type, event_type, interview_medium, email_domain)]
 
     def _get_calendar_ddb_item(self):
         if self.appointment.calendar_id is None:
             self.appointment.get_appointment_info_from_acuity()
-        self.interviewer_calendar_ddb_item = self.ddb_client.get_item(
-            table_name=self.calendar_table,
-            key=self.appointment.calendar_id
-        )
+        self.interviewer_calendar_ddb_item = calendars_cache.get_item(self.appointment.calendar_id)
         if not self.interviewer_calendar_ddb_item:
             raise utils.ObjectDoesNotExistError(
                 f'Calendar {self.appointment.calendar_id} not found in Dynamodb',
@@ -321,21 +760,68 @@ class AppointmentNotifier:
                 }
             )
 
-    def _check_appointment_cancelled(self):
+    def _stored_acuity_state_is_fresh(self):
+        """
+        Returns:
+            True if the appointment's acuity_info was synced by webhook processing less than ACUITY_STATE_MAX_AGE_HOURS
+            ago; cancellations and reschedulings are stored by webhooks, so such state can be trusted
         """
-        Gets latest appointment info from Acuity to ensure appointment is still valid before sending out notification
+        if (not ACUITY_STATE_MAX_AGE_HOURS) or (not self.appointment.acuity_synced) or (self.appointment.acuity_info is None):
+            return False
+        oldest_synced = utils.now_with_tz() - datetime.timedelta(hours=ACUITY_STATE_MAX_AGE_HOURS)
+        return self.appointment.acuity_synced >= str(oldest_synced.astimezone(datetime.timezone.utc))
+
+    @staticmethod
+    def _sample_verification():
+        return random.random() < ACUITY_STATE_VERIFICATION_RATE
+
+    def _verify_stored_acuity_state(self):
+        """
+        Refetches the appointment from Acuity and reports any difference from the stored state (i.e. a missed webhook)
+
+        Returns:
+            True if the stored state was up to date
+        """
+        stored_state = {k: self.appointment.acuity_info.get(k) for k in ['canceled', 'datetime']}
+        self.appointment.get_appointment_info_from_acuity(force_refresh=True)
+        latest_state = {k: self.appointment.acuity_info.get(k) for k in ['canceled', 'datetime']}
+        up_to_date = stored_state == latest_state
+        metrics.put_metric('AcuityStateVerified', 1)
+        if not up_to_date:
+            metrics.put_metric('AcuityStateDrift', 1)
+            self.logger.warning('Stored Acuity state of appointment is out of date', extra={
+                'appointment_id': self.appointment.appointment_id,
+                'stored_state': stored_state,
+                'latest_state': latest_state,
+                'correlation_id': self.correlation_id,
+            })
+        return up_to_date
+
+    def _check_appointment_cancelled(self, event_type=None):
+        """
+        Gets latest appointment info from Acuity to ensure appointment is still valid before sending out notification.
+        Reminders of appointments with fresh stored state (see _stored_acuity_state_is_fresh) skip the Acuity call
+        unless force_refresh is set, except for a sample of them used to verify that the stored state is up to date
 
         Returns:
             True is appointment is cancelled; False if it is not cancelled
         """
+        if self.acuity_info_fresh:
+            return self.appointment.acuity_info['canceled'] is True
+        if (event_type == 'reminder') and (not self.force_refresh) and self._stored_acuity_state_is_fresh():
+            if self._sample_verification():
+                self._verify_stored_acuity_state()
+            else:
+                metrics.put_metric('AcuityStateTrusted', 1)
+            return self.appointment.acuity_info['canceled'] is True
         self.appointment.get_appointment_info_from_acuity(force_refresh=True)
         return self.appointment.acuity_info['canceled'] is True
 
     def _abort_notification_check(self, event_type):
         if not event_type == 'cancellation':
-            if self._check_appointment_cancelled():
+            if self._check_appointment_cancelled(event_type=event_type):
                 self.logger.info('Notification aborted; appointment has been cancelled', extra={
-                    'appointment': self.appointment.as_dict(),
+                    'appointment': self.appointment.lazy_as_dict(),
                     'correlation_id': self.correlation_id
                 })
                 return True
@@ -346,8 +832,8 @@ class AppointmentNotifier:
         for p in project_list:
             for t in p['tasks']:
                 if t['id'] == self.appointment.appointment_type.project_task_id:
-                    self.project_id = p['id']
-                    self.project_short_name = p['short_name']
+                    self.project_id = self.appointment.project_id = p['id']
+                    self.project_short_name = self.appointment.project_short_name = p['short_name']
                     return self.project_short_name
         raise utils.ObjectDoesNotExistError(f'Project task {self.appointment.appointment_type.project_task_id} not found', details={})
 
@@ -362,16 +848,19 @@ class AppointmentNotifier:
             except AssertionError:
                 self.logger.info(f'User {self.appointment.participant_email} does not seem to have a thiscovery account',
                                  extra={
-                                     'appointment': self.appointment.as_dict(),
+                                     'appointment': self.appointment.lazy_as_dict(),
                                      'correlation_id': self.correlation_id,
                                  })
                 return None
         try:
-            user_projects = self.appointment._core_api_client.get_userprojects(self.appointment.participant_user_id)
+            user_projects = core_api_cache.get_userprojects(
+                core_api_client=self.appointment._core_api_client,
+                user_id=self.appointment.participant_user_id
+            )
         except AssertionError:
             self.logger.info(f'Could not get user projects for user_id {self.appointment.participant_user_id}',
                              extra={
-                                 'appointment': self.appointment.as_dict(),
+                                 'appointment': self.appointment.lazy_as_dict(),
                                  'correlation_id': self.correlation_id,
                              })
             return None
@@ -380,60 +869,120 @@ class AppointmentNotifier:
         for up in user_projects:
             if up['project_id'] == self.project_id:
                 self.anon_project_specific_user_id = up['anon_project_specific_user_id']
+                self.appointment.anon_project_specific_user_id = self.anon_project_specific_user_id
                 return self.anon_project_specific_user_id
         self.logger.info(f'anon_project_specific_user_id could not be found for {self.appointment.participant_email}', extra={
-            'appointment': self.appointment.as_dict(),
+            'appointment': self.appointment.lazy_as_dict(),
             'correlation_id': self.correlation_id
         })
 
+    def _get_appointment_datetime(self):
+        if self.appointment_datetime is None:
+            from dateutil import parser
+            self.appointment_datetime = parser.parse(self.appointment.acuity_info['datetime'])
+        return self.appointment_datetime
+
+    # custom property providers; each is called at most once per notifier (see _get_custom_properties)
+    def _provide_anon_project_specific_user_id(self):
+        if self.anon_project_specific_user_id is None:
+            self._get_anon_project_specific_user_id()
+        return self.anon_project_specific_user_id
+
+    def _provide_known_anon_project_specific_user_id(self):
+        return self.anon_project_specific_user_id
+
+    def _provide_appointment_date(self):
+        return f"{self._get_appointment_datetime().strftime('%A %d %B %Y')}"
+
+    def _provide_appointment_duration(self):
+        return f"{self.appointment.acuity_info['duration']} minutes"
+
+    def _provide_appointment_reschedule_url(self):
+        return self.appointment.acuity_info['confirmationPage']
+
+    def _provide_appointment_time(self):
+        return f"{self._get_appointment_datetime().strftime('%H:%M')}"
+
+    def _provide_appointment_type_name(self):
+        return self.appointment.appointment_type.name
+
+    def _provide_interviewer_first_name(self):
+        return self.appointment.acuity_info['calendar'].split()[0]
+
+    def _provide_interview_url(self):
+        if self.appointment.appointment_type.has_link is True:
+            return f'<a href="{self.appointment.link}" style="color:#dd0031" rel="noopener">{self.appointment.link}</a>'
+        return 'We will call you on the phone number provided'
+
+    def _provide_interviewer_url(self):
+        if self.appointment.appointment_type.has_link is True:
+            return self._get_interviewer_myinterview_link()
+        if self.appointment.acuity_info['phone']:
+            return f"Please call participant on {self.appointment.acuity_info['phone']}"
+        return "Participant did not provide a phone number. Please contact them by email to obtain a contact number"
+
+    def _provide_project_short_name(self):
+        if self.project_short_name is None:
+            self._get_project_short_name()
+        return self.project_short_name
+
+    def _provide_user_email(self):
+        return self.appointment.participant_email
+
+    def _provide_user_first_name(self):
+        return self.appointment.acuity_info['firstName']
+
+    def _provide_user_last_name(self):
+        return self.appointment.acuity_info['lastName']
+
+    custom_property_providers = {
+        'anon_project_specific_user_id': _provide_anon_project_specific_user_id,
+        'appointment_date': _provide_appointment_date,
+        'appointment_duration': _provide_appointment_duration,
+        'appointment_reschedule_url': _provide_appointment_reschedule_url,
+        'appointment_time': _provide_appointment_time,
+        'appointment_type_name': _provide_appointment_type_name,
+        'interviewer_first_name': _provide_interviewer_first_name,
+        'interview_url': _provide_interview_url,
+        'interviewer_url': _provide_interviewer_url,
+        'project_short_name': _provide_project_short_name,
+        'user_email': _provide_user_email,
+        'user_first_name': _provide_user_first_name,
+        'user_last_name': _provide_user_last_name,
+    }
+    researcher_only_properties = ['interviewer_url']
+    # providers used for non-researcher templates instead, to avoid core API lookups; their values are not memoised
+    participant_property_providers = {
+        'anon_project_specific_user_id': _provide_known_anon_project_specific_user_id,
+    }
+
     def _get_custom_properties(self, properties_list, template_type):
+        """
+        Computes only the custom properties in properties_list. Values are memoised in self.custom_property_values,
+        so participant and researcher emails sent by this notifier share them
+        """
         self.logger.debug('Properties list and template type', extra={
             'properties_list': properties_list,
             'template_type': template_type,
         })
         if properties_list:
-            if ('project_short_name' in properties_list) and (self.project_short_name is None):
-                self._get_project_short_name()
-            if (template_type == 'researcher') and (self.anon_project_specific_user_id is None):
-                self._get_anon_project_specific_user_id()
-            appointment_datetime = parser.parse(self.appointment.acuity_info['datetime'])
-            properties_map = {
-                'anon_project_specific_user_id': self.anon_project_specific_user_id,
-                'appointment_date': f"{appointment_datetime.strftime('%A %d %B %Y')}",
-                'appointment_duration': f"{self.appointment.acuity_info['duration']} minutes",
-                'appointment_reschedule_url': self.appointment.acuity_info['confirmationPage'],
-                'appointment_time': f"{appointment_datetime.strftime('%H:%M')}",
-                'appointment_type_name': self.appointment.appointment_type.name,
-                'interviewer_first_name': self.appointment.acuity_info['calendar'].split()[0],
-                'interview_url': 'We will call you on the phone number provided',
-                'project_short_name': self.project_short_name,
-                'user_email': self.appointment.participant_email,
-                'user_first_name': self.appointment.acuity_info['firstName'],
-                'user_last_name': self.appointment.acuity_info['lastName'],
-            }
-            if self.appointment.appointment_type.has_link is True:
-                properties_map['interview_url'] = f'<a href="{self.appointment.link}" style="color:#dd0031" ' \
-                                                  f'rel="noopener">{self.appointment.link}</a>'
-
-            if template_type == 'researcher':
-                if self.appointment.appointment_type.has_link is True:
-                    interviewer_url = self._get_interviewer_myinterview_link()
-                else:
-                    if self.appointment.acuity_info['phone']:
-                        interviewer_url = f"Please call participant on {self.appointment.acuity_info['phone']}"
-                    else:
-                        interviewer_url = f"Participant did not provide a phone number. " \
-                                                          f"Please contact them by email to obtain a contact number"
-                properties_map['interviewer_url'] = interviewer_url
-
-            try:
-                return {k: properties_map[k] for k in properties_list}
-            except KeyError:
-                raise utils.DetailedValueError('Custom property name not found in properties_map', details={
-                    'properties_list': properties_list,
-                    'properties_map': properties_map,
-                    'correlation_id': self.correlation_id,
-                })
+            custom_properties = dict()
+            for k in properties_list:
+                provider = self.custom_property_providers.get(k)
+                if (provider is None) or ((k in self.researcher_only_properties) and (template_type != 'researcher')):
+                    raise utils.DetailedValueError('Custom property name not found in properties_map', details={
+                        'properties_list': properties_list,
+                        'property_name': k,
+                        'template_type': template_type,
+                        'correlation_id': self.correlation_id,
+                    })
+                if (template_type != 'researcher') and (k in self.participant_property_providers):
+                    custom_properties[k] = self.participant_property_providers[k](self)
+                    continue
+                if k not in self.custom_property_values:
+                    self.custom_property_values[k] = provider(self)
+                custom_properties[k] = self.custom_property_values[k]
+            return custom_properties
 
     def _notify_email(self, recipient_email, recipient_type, event_type):
         template = self._get_email_template(
@@ -460,7 +1009,7 @@ class AppointmentNotifier:
         )
         if result['statusCode'] != HTTPStatus.NO_CONTENT:
             self.logger.error(f'Failed to notify {self.appointment.participant_email} of interview appointment', extra={
-                'appointment': self.appointment.as_dict(),
+                'appointment': self.appointment.lazy_as_dict(),
                 'event_type': event_type,
                 'correlation_id': self.correlation_id
             })
@@ -482,7 +1031,7 @@ class AppointmentNotifier:
             )
             if r['statusCode'] != HTTPStatus.NO_CONTENT:
                 self.logger.error(f'Failed to notify {researcher_email} of new interview appointment', extra={
-                    'appointment': self.appointment.as_dict()
+                    'appointment': self.appointment.lazy_as_dict()
                 })
             results.append(r)
         return results
@@ -496,16 +1045,44 @@ class AppointmentNotifier:
             researchers_results = [r['statusCode'] for r in researchers_notifications_results]
         except:
             self.logger.error('Failed to notify researchers', extra={
-                'appointment': self.appointment.as_dict(),
+                'appointment': self.appointment.lazy_as_dict(),
                 'correlation_id': self.correlation_id,
             })
+        self.persist_resolved_identity()
         return {
             'participant': participant_result.get('statusCode'),
             'researchers': researchers_results,
         }
 
     def send_reminder(self):
-        return self._notify_participant(event_type='reminder')
+        result = self._notify_participant(event_type='reminder')
+        self.persist_resolved_identity()
+        return result
+
+    def persist_resolved_identity(self):
+        """
+        Writes identity attributes resolved while sending notifications back to the Appointments item, so that
+        later events for this appointment do not resolve them through the core API again. Called after
+        notifications are sent; failures are logged but do not affect notification results. Attributes resolved
+        before a successful participant notification are stored with latest_participant_notification (see
+        AcuityAppointment.update_latest_participant_notification), so this usually makes no Dynamodb call
+
+        Returns:
+            Dictionary of attributes written
+        """
+        changes = self.appointment.get_unsaved_identity_attributes()
+        if changes:
+            try:
+                self.appointment._write_changes(changes)
+            except Exception as err:
+                self.logger.warning('Failed to store resolved participant identity', extra={
+                    'appointment_id': self.appointment.appointment_id,
+                    'changes': changes,
+                    'exception': repr(err),
+                    'correlation_id': self.correlation_id,
+                })
+                return dict()
+        return changes
 
 
 class AcuityEvent:
@@ -514,7 +1091,7 @@ class AcuityEvent:
         self.logger = logger
         if logger is None:
             self.logger = utils.get_logger()
-        self.core_api_client = CoreApiClient(correlation_id=correlation_id)
+        add_lazy_extra_filter(self.logger)
         self.correlation_id = correlation_id
 
         event_pattern = re.compile(
@@ -552,14 +1129,17 @@ class AcuityEvent:
     def __repr__(self):
         return str(self.__dict__)
 
+    @metrics.timer('ThiscoveryTeamNotificationMs')
     def notify_thiscovery_team(self):
         if self.appointment.acuity_info is None:
             self.appointment.get_appointment_info_from_acuity()
         if check_appointment_in_the_past(self.appointment):
             return 'aborted'
         appointment_type_name = self.appointment.appointment_type.name
-        emails_client = EmailsApiClient(self.correlation_id)
-        appointment_management_secret = utils.get_secret('interviews')['appointment-management']
+        from dateutil import parser
+        from thiscovery_lib.emails_api_utilities import EmailsApiClient
+        emails_client = tracer.trace_methods(EmailsApiClient(self.correlation_id), 'emails_api', EMAILS_API_TRACED_METHODS)
+        appointment_management_secret = get_secret('interviews')['appointment-management']
         appointment_manager = appointment_management_secret['manager']
         if utils.running_unit_tests():
             appointment_manager = appointment_management_secret['tester']
@@ -596,6 +1176,7 @@ class AcuityEvent:
                                                       f'Send-email endpoint returned {result}'
         return result['statusCode']
 
+    @metrics.timer('NotificationsMs')
     def _notify_participant_and_researchers(self, event_type):
         if self.appointment.appointment_type.send_notifications is True:
             notifier = AppointmentNotifier(
@@ -605,11 +1186,34 @@ class AcuityEvent:
             )
             return notifier.send_notifications(event_type=event_type)
 
+    def _schedule_reminder(self):
+        """
+        Queues the participant reminder of a booked or rescheduled appointment (see common.reminder_schedule_utilities).
+        Failures are logged but do not affect event processing
+
+        Returns:
+            List of ScheduledReminders items written, or None
+        """
+        try:
+            return ReminderSchedule().schedule(
+                appointment_id=self.appointment.appointment_id,
+                appointment_datetime=self.appointment.acuity_info['datetime'],
+                cadence=self.appointment.appointment_type.get_reminder_cadence(),
+            )
+        except Exception as err:
+            self.logger.warning('Failed to schedule appointment reminder', extra={
+                'appointment_id': self.appointment.appointment_id,
+                'exception': repr(err),
+                'correlation_id': self.correlation_id,
+            })
+
     def _process_booking(self):
-        storing_result = self.appointment.ddb_dump()
+        with metrics.timer('StoreAppointmentMs'):
+            storing_result = self.appointment.ddb_dump()
+        self._schedule_reminder()
         task_completion_result = None
         if self.appointment.anon_user_task_id:
-            task_completion_result = self.core_api_client.set_user_task_completed(anon_user_task_id=self.appointment.anon_user_task_id)['statusCode']
+            task_completion_result = self.appointment._core_api_client.set_user_task_completed(anon_user_task_id=self.appointment.anon_user_task_id)['statusCode']
         thiscovery_team_notification_result = None
         participant_and_researchers_notification_results = None
         if self.appointment.appointment_type.has_link:
@@ -618,23 +1222,32 @@ class AcuityEvent:
             participant_and_researchers_notification_results = self._notify_participant_and_researchers(event_type='booking')
         return storing_result, task_completion_result, thiscovery_team_notification_result, participant_and_researchers_notification_results
 
-    def _get_original_booking(self):
-        original_booking_info = self.appointment.get_appointment_item_from_ddb()
-        self.appointment.link = original_booking_info['link']
-        self.appointment.latest_participant_notification = original_booking_info.get('latest_participant_notification', '0000-00-00 00:00:00+00:00')
-        return original_booking_info
+    def _update_original_booking(self):
+        """
+        Stores latest Acuity info in the existing Dynamodb item
+
+        Returns:
+            Tuple (storing_result, original_booking_info), where storing_result contains the ResponseMetadata of the
+            update (like ddb_dump's) and original_booking_info is the item as it was before the update. The latter is
+            not json-serialisable (Decimal and Binary values), so it is not part of the results returned by process
+        """
+        with metrics.timer('StoreAppointmentMs'):
+            update_result = self.appointment.ddb_update()
+        return {'ResponseMetadata': update_result['ResponseMetadata']}, update_result['Attributes']
 
     def _process_cancellation(self):
-        self._get_original_booking()
-        storing_result = self.appointment.ddb_dump(update_allowed=True)
+        storing_result, _ = self._update_original_booking()
         thiscovery_team_notification_result = None
         participant_and_researchers_notification_results = self._notify_participant_and_researchers(event_type='cancellation')
         task_completion_result = None
         return storing_result, task_completion_result, thiscovery_team_notification_result, participant_and_researchers_notification_results
 
     def _process_rescheduling(self):
-        original_booking_info = self._get_original_booking()
-        storing_result = self.appointment.ddb_dump(update_allowed=True)
+        storing_result, original_booking_info = self._update_original_booking()
+        original_datetime = (original_booking_info.get('acuity_info') or dict()).get('datetime')
+        if original_booking_info.get('reminder_stage') and (original_datetime != self.appointment.acuity_info['datetime']):
+            self.appointment.update_reminder_stage(None)  # reminders restart from the first due stage of the new time
+        self._schedule_reminder()
         thiscovery_team_notification_result = None
         participant_and_researchers_notification_results = None
         if original_booking_info['calendar_id'] == self.appointment.calendar_id:
@@ -648,7 +1261,7 @@ class AcuityEvent:
                         'Appointment rescheduled before interview link was generated. '
                         'Participant will be notified once link is received',
                         extra={
-                            'appointment_dict': self.appointment.as_dict(),
+                            'appointment_dict': self.appointment.lazy_as_dict(),
                             'correlation_id': self.correlation_id,
                         }
                     )
@@ -675,11 +1288,12 @@ class AcuityEvent:
 
 
 def check_appointment_in_the_past(appointment_instance):
+    from dateutil import parser
     two_hours_ago = utils.now_with_tz() - datetime.timedelta(hours=2)
     appointment_datetime = parser.parse(appointment_instance.acuity_info['datetime'])
     if appointment_datetime < two_hours_ago:
         appointment_instance._logger.info('Notification aborted; appointment is in the past', extra={
-            'appointment': appointment_instance.as_dict(),
+            'appointment': appointment_instance.lazy_as_dict(),
             'correlation_id': appointment_instance._correlation_id
         })
         return True
@@ -730,6 +1344,7 @@ def set_interview_url(appointment_id, interview_url, event_type, logger=None, co
 
 
 @utils.lambda_wrapper
+@invocation_hooks
 @utils.api_error_handler
 def interview_appointment_api(event, context):
     """
@@ -747,6 +1362,7 @@ def interview_appointment_api(event, context):
 
 
 @utils.lambda_wrapper
+@invocation_hooks
 @utils.api_error_handler
 def set_interview_url_api(event, context):
     logger = event['logger']
@@ -772,3 +1388,23 @@ def set_interview_url_api(event, context):
         'correlation_id': correlation_id,
     }
     return {"statusCode": HTTPStatus.OK, 'body': json.dumps(response_body)}
+
+
+# warm-up phases of each handler function; only tables the function has a policy for in template.yaml are primed
+WARM_UP_PHASES = {
+    'interview_appointment_api': [
+        ('secrets', prime_secrets),
+        ('acuity_session', prime_acuity_session),
+        ('appointment_types_cache', prime_appointment_types_cache),
+        ('calendars_cache', prime_calendars_cache),
+    ],
+    'set_interview_url_api': [
+        ('secrets', prime_secrets),
+        ('acuity_session', prime_acuity_session),
+        ('calendars_cache', prime_calendars_cache),
+    ],
+}
+
+
+if should_warm_up(__name__):
+    warm_up(WARM_UP_PHASES[get_lambda_handler()[1]])
@@ -18,14 +18,16 @@
 import datetime
 
 import thiscovery_lib.utilities as utils
-from common.constants import APPOINTMENTS_TABLE, STACK_NAME
-from thiscovery_lib.dynamodb_utilities import Dynamodb
+from common.constants import APPOINTMENTS_TABLE
+from common.ddb_utilities import get_ddb_client
+from common.invocation_utilities import invocation_hooks
+from common.metrics_utilities import metrics
 
 
 class AppointmentsCleaner:
 
     def __init__(self, logger=None, correlation_id=None):
-        self.ddb_client = Dynamodb(stack_name=STACK_NAME)
+        self.ddb_client = get_ddb_client()
         self.correlation_id = correlation_id
         self.target_appointment_ids = self.get_appointments_to_be_deleted()
         self.logger = logger
@@ -59,6 +61,7 @@ class AppointmentsCleaner:
                 key=app_id,
             )
             results.append(result['ResponseMetadata']['HTTPStatusCode'])
+        metrics.put_metric('ItemsProcessed', len(results))
         return results
 
         # this is more efficient than the for loop used above but doesn't return anything, so worse for testing
@@ -69,6 +72,7 @@ class AppointmentsCleaner:
 
 
 @utils.lambda_wrapper
+@invocation_hooks
 def delete_old_appointments(event, context):
     cleaner = AppointmentsCleaner(
         logger=event['logger'],
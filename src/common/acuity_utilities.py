@@ -17,13 +17,20 @@
 #
 import datetime
 import functools
+import gzip
+import io
 import json
-import requests
-from pprint import pprint
+import re
+from decimal import Decimal
 from simplejson.errors import JSONDecodeError
 
 import thiscovery_lib.utilities as utils
 
+from common.constants import ACUITY_APPOINTMENTS_PAGE_SIZE, ACUITY_BLOCKS_PAGE_SIZE, ACUITY_INFO_STORED_FIELDS, \
+    ACUITY_USER_METADATA_INTAKE_FORM_ID, AUTOMATED_BLOCK_NOTES
+from common.secrets_utilities import get_secret
+from common.tracing_utilities import tracer
+
 
 def response_handler(func):
     @functools.wraps(func)
@@ -41,17 +48,58 @@ def response_handler(func):
     return wrapper
 
 
+_acuity_session = None
+_acuity_id_re = re.compile(r'/\d+')
+
+
+def _trace_session(session):
+    """
+    Counts every request made by session and, while tracing is enabled, records a tracing span for it, named after
+    the HTTP method and API path (with ids replaced by {id}, so that e.g. all appointment lookups are aggregated)
+    """
+    request = session.request
+
+    @functools.wraps(request)
+    def traced_request(method, url, *args, **kwargs):
+        if not tracer.enabled:
+            tracer.count_call('acuity')
+            return request(method, url, *args, **kwargs)
+        path = _acuity_id_re.sub('/{id}', url.split('/api/v1/')[-1].split('?')[0])
+        with tracer.span('acuity', f'{method.upper()} {path}') as span:
+            response = request(method, url, *args, **kwargs)
+            span.status = response.status_code
+            span.bytes = len(response.content)
+        return response
+
+    session.request = traced_request
+    return session
+
+
+def get_acuity_session():
+    """
+    Returns:
+        Authenticated requests.Session shared by all AcuityClient instances, so that connections to Acuity are pooled
+    """
+    global _acuity_session
+    if _acuity_session is None:
+        import requests  # lazy import; modules that only need the acuity_info helpers below do not load requests
+        acuity_credentials = get_secret('acuity-connection')
+        session = requests.Session()
+        session.auth = (
+            acuity_credentials['user-id'],
+            acuity_credentials['api-key'],
+        )
+        _trace_session(session)
+        _acuity_session = session
+    return _acuity_session
+
+
 class AcuityClient:
     base_url = 'https://acuityscheduling.com/api/v1/'
     strftime_format_str = '%Y-%m-%d %I:%M%p'
 
     def __init__(self, correlation_id=None):
-        acuity_credentials = utils.get_secret('acuity-connection')
-        self.session = requests.Session()
-        self.session.auth = (
-            acuity_credentials['user-id'],
-            acuity_credentials['api-key'],
-        )
+        self.session = get_acuity_session()
         self.logger = utils.get_logger()
         self.calendars = None
         self.correlation_id = correlation_id
@@ -100,23 +148,107 @@ class AcuityClient:
         return self.calendars[calendar_id]
 
     @response_handler
-    def get_blocks(self, calendar_id=None):
-        query_parameters = None
+    def get_blocks(self, calendar_id=None, min_date=None, max_date=None, max_results=None):
+        """
+        Returns:
+            Blocks matching the filters; Acuity returns at most max_results (100 by default), so use
+            get_blocks_between when all blocks in a date range are needed
+        """
+        query_parameters = dict()
         if calendar_id:
-            query_parameters = {
-                'calendarID': int(calendar_id)
-            }
-        return self.session.get(f"{self.base_url}blocks", params=query_parameters)
+            query_parameters['calendarID'] = int(calendar_id)
+        if min_date is not None:
+            query_parameters['minDate'] = _format_date_parameter(min_date)
+        if max_date is not None:
+            query_parameters['maxDate'] = _format_date_parameter(max_date)
+        if max_results is not None:
+            query_parameters['max'] = max_results
+        return self.session.get(f"{self.base_url}blocks", params=query_parameters or None)
+
+    def get_blocks_between(self, min_date, max_date, calendar_id=None, page_size=ACUITY_BLOCKS_PAGE_SIZE):
+        """
+        Lists all blocks from min_date to max_date. The blocks endpoint has no offset parameter, so date ranges
+        that fill a page are split in two and listed again until no page is full
+
+        Args:
+            min_date (datetime.date): first date of the range
+            max_date (datetime.date): last date of the range (inclusive)
+            calendar_id: only blocks of this calendar
+            page_size (int): blocks per call
+
+        Returns:
+            List of blocks, as returned by get_blocks
+        """
+        page = self.get_blocks(calendar_id=calendar_id, min_date=min_date, max_date=max_date, max_results=page_size)
+        if len(page) < page_size:
+            return page
+        if min_date >= max_date:
+            raise utils.DetailedValueError(f'More than {page_size} blocks on {min_date}; get_blocks_between '
+                                           f'page_size must be increased', details={})
+        middle_date = min_date + (max_date - min_date) // 2
+        blocks = dict()  # blocks spanning both halves of the range may be listed twice
+        for first_date, last_date in [(min_date, middle_date), (middle_date + datetime.timedelta(days=1), max_date)]:
+            for block in self.get_blocks_between(first_date, last_date, calendar_id=calendar_id, page_size=page_size):
+                blocks[block['id']] = block
+        return list(blocks.values())
 
     @response_handler
-    def get_appointments(self):
-        return self.session.get(f"{self.base_url}appointments")
+    def _get_appointments_page(self, query_parameters):
+        return self.session.get(f"{self.base_url}appointments", params=query_parameters)
+
+    def get_appointments(self, min_date=None, max_date=None, calendar_id=None, appointment_type_id=None, canceled=False,
+                         page_size=ACUITY_APPOINTMENTS_PAGE_SIZE):
+        """
+        Lists appointments in ascending datetime order, making as many calls as needed to fetch all of them. Acuity
+        has no offset parameter, so each page starts at the datetime of the last appointment of the previous page
+
+        Args:
+            min_date (datetime.date, datetime.datetime or str): only appointments on or after this date
+            max_date (datetime.date, datetime.datetime or str): only appointments on or before this date
+            calendar_id: only appointments of this calendar
+            appointment_type_id: only appointments of this type
+            canceled: False for active appointments only (Acuity's default), True for cancelled appointments only,
+                or None for both
+            page_size (int): appointments per call
+
+        Returns:
+            List of appointment payloads, as returned by get_appointment_by_id
+        """
+        query_parameters = {
+            'max': page_size,
+            'direction': 'ASC',
+        }
+        if max_date is not None:
+            query_parameters['maxDate'] = _format_date_parameter(max_date)
+        if calendar_id is not None:
+            query_parameters['calendarID'] = int(calendar_id)
+        if appointment_type_id is not None:
+            query_parameters['appointmentTypeID'] = int(appointment_type_id)
+        if canceled is None:
+            query_parameters['showall'] = 'true'
+        elif canceled:
+            query_parameters['canceled'] = 'true'
+        page_min_date = None if min_date is None else _format_date_parameter(min_date)
+        appointments = dict()
+        while True:
+            if page_min_date is not None:
+                query_parameters['minDate'] = page_min_date
+            page = self._get_appointments_page(query_parameters)
+            new_appointments = {x['id']: x for x in page if x['id'] not in appointments}
+            appointments.update(new_appointments)
+            if (len(page) < page_size) or (not new_appointments):
+                break
+            if page[-1]['datetime'] == page_min_date:
+                raise utils.DetailedValueError(f'More than {page_size} appointments at {page_min_date}; '
+                                               f'get_appointments page_size must be increased', details={})
+            page_min_date = page[-1]['datetime']
+        return list(appointments.values())
 
     @response_handler
     def get_appointment_by_id(self, appointment_id):
         return self.session.get(f"{self.base_url}appointments/{appointment_id}")
 
-    def post_block(self, calendar_id, start, end, notes="automated block"):
+    def post_block(self, calendar_id, start, end, notes=AUTOMATED_BLOCK_NOTES):
         """
 
         Args:
@@ -171,7 +303,66 @@ class AcuityClient:
             raise utils.DetailedValueError(error_message, details=error_dict)
 
 
+def _format_date_parameter(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def _json_default(obj):
+    if isinstance(obj, Decimal):  # acuity_info loaded from Dynamodb
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f'Object of type {type(obj)} is not JSON serializable')
+
+
+def split_acuity_info(acuity_info):
+    """
+    Splits an Acuity appointment payload into the fields read by this stack and everything else
+
+    Args:
+        acuity_info (dict): Appointment info as returned by AcuityClient.get_appointment_by_id
+
+    Returns:
+        Tuple (compact_info, remaining_info). compact_info contains ACUITY_INFO_STORED_FIELDS and
+        the name/value pairs of the user metadata intake form only
+    """
+    compact_info = {k: v for k, v in acuity_info.items() if k in ACUITY_INFO_STORED_FIELDS}
+    remaining_info = {k: v for k, v in acuity_info.items() if (k not in ACUITY_INFO_STORED_FIELDS) and (k != 'forms')}
+    forms = acuity_info.get('forms') or list()
+    compact_info['forms'] = [
+        {
+            'id': f['id'],
+            'values': [{'name': x.get('name'), 'value': x.get('value')} for x in f['values']],
+        } for f in forms if f['id'] == ACUITY_USER_METADATA_INTAKE_FORM_ID
+    ]
+    if compact_info['forms'] != forms:
+        remaining_info['forms'] = forms
+    return compact_info, remaining_info
+
+
+def compress_acuity_info(acuity_info):
+    """
+    Returns:
+        gzip-compressed JSON representation of acuity_info. The gzip header timestamp is fixed, so that
+        the output is deterministic and can be compared with the value stored in Dynamodb
+    """
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as f:
+        f.write(json.dumps(acuity_info, default=_json_default, sort_keys=True).encode('utf-8'))
+    return buffer.getvalue()
+
+
+def decompress_acuity_info(compressed_info):
+    """
+    Args:
+        compressed_info (bytes or boto3.dynamodb.types.Binary): output of compress_acuity_info
+    """
+    compressed_info = getattr(compressed_info, 'value', compressed_info)
+    return json.loads(gzip.decompress(compressed_info).decode('utf-8'))
+
+
 if __name__ == '__main__':
+    from pprint import pprint
     client = AcuityClient()
     # pprint(client.get_webhooks())
     # client.post_webhooks('appointment.scheduled')
@@ -0,0 +1,178 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+"""
+Planning of Acuity calendar blocks from the block rules of Calendars items.
+
+Rules are dictionaries in the block_rules list attribute of Calendars items. Days are weekday numbers
+(0 = Monday) and all times are in calendar time:
+    {'type': 'weekly', 'start_day': 5, 'start_time': '00:00', 'end_day': 0, 'end_time': '12:00'}
+        recurring window from start_day at start_time to the following end_day at end_time
+    {'type': 'dates', 'dates': ['2030-12-25', '2030-12-26'], 'name': 'Bank holidays'}
+        whole-day blocks on each date (e.g. bank holidays)
+    {'type': 'one_off', 'start': '2030-12-24 13:00', 'end': '2031-01-02 09:00', 'name': 'Office closed'}
+        a single blackout period
+Calendars without block_rules but with block_monday_morning set to True use MONDAY_MORNING_BLOCK_RULES.
+"""
+import datetime
+
+import thiscovery_lib.utilities as utils
+
+from common.constants import MONDAY_MORNING_BLOCK_RULES
+
+
+DATE_FORMAT = '%Y-%m-%d'
+TIME_FORMAT = '%H:%M'
+
+
+def get_calendar_block_rules(calendar_item):
+    """
+    Returns:
+        List of block rules of Calendars item calendar_item (empty if the calendar is not blocked)
+    """
+    rules = calendar_item.get('block_rules')
+    if rules:
+        return rules
+    if calendar_item.get('block_monday_morning') is True:
+        return MONDAY_MORNING_BLOCK_RULES
+    return list()
+
+
+def _parse(value, format_str, rule):
+    try:
+        return datetime.datetime.strptime(value, format_str)
+    except (TypeError, ValueError):
+        raise utils.DetailedValueError(f'Invalid block rule value {value}; expected format {format_str}',
+                                       details={'rule': rule})
+
+
+def _weekly_intervals(rule, horizon_start, horizon_end):
+    start_day, end_day = int(rule['start_day']), int(rule['end_day'])
+    start_time = _parse(rule['start_time'], TIME_FORMAT, rule).time()
+    end_time = _parse(rule['end_time'], TIME_FORMAT, rule).time()
+    days_to_end = (end_day - start_day) % 7
+    if (days_to_end == 0) and (end_time <= start_time):
+        days_to_end = 7
+    d = horizon_start.date() - datetime.timedelta(days=days_to_end + 1)  # windows starting earlier may overlap
+    while d < horizon_end.date():
+        if d.weekday() == start_day:
+            yield (
+                datetime.datetime.combine(d, start_time),
+                datetime.datetime.combine(d + datetime.timedelta(days=days_to_end), end_time),
+            )
+        d += datetime.timedelta(days=1)
+
+
+def _dates_intervals(rule, horizon_start, horizon_end):
+    for date_str in rule['dates']:
+        start = _parse(date_str, DATE_FORMAT, rule)
+        yield start, start + datetime.timedelta(days=1)
+
+
+def _one_off_intervals(rule, horizon_start, horizon_end):
+    format_str = f'{DATE_FORMAT} {TIME_FORMAT}'
+    yield _parse(rule['start'], format_str, rule), _parse(rule['end'], format_str, rule)
+
+
+RULE_TYPES = {
+    'weekly': _weekly_intervals,
+    'dates': _dates_intervals,
+    'one_off': _one_off_intervals,
+}
+
+
+def get_rule_intervals(rule, horizon_start, horizon_end):
+    """
+    Returns:
+        List of (start, end) tuples of naive datetimes blocked by rule that overlap [horizon_start, horizon_end)
+    """
+    try:
+        interval_generator = RULE_TYPES[rule['type']]
+    except KeyError:
+        raise utils.DetailedValueError(f'Invalid block rule type; expected one of {list(RULE_TYPES)}',
+                                       details={'rule': rule})
+    try:
+        intervals = list(interval_generator(rule, horizon_start, horizon_end))
+    except KeyError as err:
+        raise utils.DetailedValueError(f'Block rule is missing {err}', details={'rule': rule})
+    for start, end in intervals:
+        if end <= start:
+            raise utils.DetailedValueError('Block rule ends before it starts', details={'rule': rule})
+    return [(s, e) for s, e in intervals if (s < horizon_end) and (e > horizon_start)]
+
+
+def merge_intervals(intervals):
+    """
+    Merges overlapping or adjacent intervals, so that overlapping rules result in a single Acuity block
+
+    Returns:
+        Sorted list of non-overlapping (start, end) tuples
+    """
+    merged = list()
+    for start, end in sorted(intervals):
+        if merged and (start <= merged[-1][1]):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _as_naive(horizon_datetime):
+    """
+    Returns:
+        horizon_datetime as a naive datetime in UTC, the time rule times are compared with
+    """
+    if horizon_datetime.tzinfo is None:
+        return horizon_datetime
+    return horizon_datetime.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def plan_calendar_blocks(calendar_items, horizon_start, horizon_end):
+    """
+    Computes in one pass the blocks needed by the block rules of calendar_items in the planning horizon. Blocks
+    that started before horizon_start (e.g. a blackout in progress, possibly merged with a later rule) start at
+    horizon_start instead, so that the rest of their coverage is planned; callers skip those already covered by a
+    block in progress (see main.find_covering_block)
+
+    Args:
+        calendar_items (list): Calendars items
+        horizon_start (datetime.datetime): timezone-aware or naive (in UTC)
+        horizon_end (datetime.datetime): timezone-aware or naive (in UTC)
+
+    Returns:
+        List of dicts with calendar_id, calendar_name, start and end (naive datetimes, in calendar time), sorted by
+        calendar and start
+    """
+    horizon_start, horizon_end = _as_naive(horizon_start), _as_naive(horizon_end)
+    clipped_start = horizon_start.replace(second=0, microsecond=0)  # Acuity block times are in minutes
+    blocks = list()
+    for calendar in calendar_items:
+        intervals = list()
+        for rule in get_calendar_block_rules(calendar):
+            try:
+                intervals += get_rule_intervals(rule, horizon_start, horizon_end)
+            except utils.DetailedValueError as err:
+                err.details['calendar_id'] = calendar['id']
+                raise
+        for start, end in merge_intervals(intervals):
+            blocks.append({
+                'calendar_id': calendar['id'],
+                'calendar_name': calendar['label'],
+                'start': max(start, clipped_start),
+                'end': end,
+            })
+    return blocks
@@ -0,0 +1,271 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import time
+
+import thiscovery_lib.utilities as utils
+
+from common.config_version_utilities import get_config_version_store
+from common.constants import APPOINTMENT_TYPES_CACHE_TTL, APPOINTMENT_TYPES_TABLE, CALENDARS_CACHE_TTL, \
+    CALENDARS_TABLE, CONFIG_VERSION_CHECK_INTERVAL, CORE_API_CACHE_TTL, CORE_API_NEGATIVE_CACHE_TTL
+from common.ddb_utilities import get_ddb_client
+from common.metrics_utilities import metrics
+
+
+MISSING = object()  # returned by TtlCache.get for keys that are not cached or have expired
+NO_ACCOUNT = object()  # cached by CoreApiLookupCache for emails without a thiscovery account
+
+
+class TtlCache:
+    """
+    Process-wide cache of values that expire ttl seconds after being set. Keeps hit/miss counts, so that
+    its effectiveness can be logged
+    """
+    def __init__(self, ttl, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = dict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if (entry is not None) and (entry[1] > self._clock()):
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return MISSING
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        self._entries[key] = (value, self._clock() + ttl)
+
+    def get_or_load(self, key, loader):
+        """
+        Returns the cached value of key, calling loader() and caching its result if key is not cached or has expired
+        """
+        value = self.get(key)
+        if value is MISSING:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key=MISSING):
+        """
+        Removes key from the cache, or all keys if key is not specified
+        """
+        if key is MISSING:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else None,
+            'size': len(self._entries),
+        }
+
+
+class VersionedTtlCache(TtlCache):
+    """
+    TtlCache that is also cleared when the version of config_name in the config version store changes. The store
+    is checked at most once every check_interval seconds, so entries can have a long ttl and still reflect edits
+    to the underlying table within check_interval seconds
+    """
+    def __init__(self, ttl, config_name, version_store=None, check_interval=CONFIG_VERSION_CHECK_INTERVAL,
+                 clock=time.monotonic):
+        super().__init__(ttl, clock=clock)
+        self.config_name = config_name
+        self.check_interval = check_interval
+        self._version_store = version_store
+        self._version = None
+        self._next_version_check = 0
+
+    def _check_version(self):
+        now = self._clock()
+        if now < self._next_version_check:
+            return
+        self._next_version_check = now + self.check_interval
+        if self._version_store is None:
+            self._version_store = get_config_version_store()
+        try:
+            version = self._version_store.get_version(self.config_name)
+        except Exception as err:  # fall back to ttl-based expiry
+            utils.get_logger().warning(f'Failed to read {self.config_name} config version: {repr(err)}')
+            return
+        if (self._version is not None) and (version != self._version):
+            self._entries.clear()
+        self._version = version
+
+    def get(self, key):
+        self._check_version()
+        return super().get(key)
+
+
+class CalendarsCache:
+    """
+    Read-through cache of the whole Calendars table, which is small and rarely changes. The table is loaded with a
+    single scan and reloaded when ttl expires, when the Calendars config version changes, when a calendar id is
+    not found (e.g. a newly added calendar) or after invalidate_from_stream_event receives a Calendars stream event
+    """
+    items_key = 'items'
+
+    def __init__(self, ttl=CALENDARS_CACHE_TTL, ddb_client=None, version_store=None, correlation_id=None):
+        self._cache = VersionedTtlCache(ttl, config_name=CALENDARS_TABLE, version_store=version_store)
+        self._ddb = ddb_client
+        self._correlation_id = correlation_id
+
+    @property
+    def _ddb_client(self):
+        if self._ddb is None:
+            self._ddb = get_ddb_client()
+        return self._ddb
+
+    def _scan(self):
+        items = self._ddb_client.scan(CALENDARS_TABLE, correlation_id=self._correlation_id)
+        return {x['id']: x for x in items}
+
+    def _get_id_to_item_map(self):
+        return self._cache.get_or_load(self.items_key, self._scan)
+
+    def get_items(self):
+        return list(self._get_id_to_item_map().values())
+
+    def get_item(self, calendar_id):
+        """
+        Returns:
+            Calendars item of calendar_id, or None if it does not exist
+        """
+        calendar_id = str(calendar_id)
+        item = self._get_id_to_item_map().get(calendar_id)
+        if item is None:
+            self.invalidate()
+            item = self._get_id_to_item_map().get(calendar_id)
+        return item
+
+    def invalidate(self):
+        self._cache.invalidate()
+
+    def invalidate_from_stream_event(self, event):
+        """
+        Invalidates the cache if event (a DynamoDB stream event passed to a Lambda handler) contains records of
+        the Calendars table
+
+        Returns:
+            True if the cache was invalidated; False otherwise
+        """
+        for record in event.get('Records', list()):
+            if f'-{CALENDARS_TABLE}/stream/' in record.get('eventSourceARN', ''):
+                self.invalidate()
+                return True
+        return False
+
+    def stats(self):
+        return self._cache.stats()
+
+
+class AppointmentTypesCache:
+    """
+    Read-through cache of AppointmentTypes items, keyed by type id. Items are cleared when ttl expires or the
+    AppointmentTypes config version changes; AppointmentType.ddb_dump also invalidates the item it writes
+    """
+    def __init__(self, ttl=APPOINTMENT_TYPES_CACHE_TTL, version_store=None):
+        self._cache = VersionedTtlCache(ttl, config_name=APPOINTMENT_TYPES_TABLE, version_store=version_store)
+
+    def get_item(self, type_id, loader):
+        """
+        Args:
+            type_id: appointment type id
+            loader: function returning the AppointmentTypes item of type_id (or None); called on cache misses
+
+        Returns:
+            AppointmentTypes item of type_id, or None if it does not exist (not found results are not cached)
+        """
+        key = str(type_id)
+        item = self._cache.get(key)
+        if item is MISSING:
+            item = loader()
+            if item is not None:
+                self._cache.set(key, item)
+        return item
+
+    def prime(self, items):
+        """
+        Caches AppointmentTypes items (e.g. the output of a table scan), so that later get_item calls are hits
+        """
+        for item in items:
+            self._cache.set(str(item['id']), item)
+
+    def invalidate(self, type_id=MISSING):
+        if type_id is not MISSING:
+            type_id = str(type_id)
+        self._cache.invalidate(type_id)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+class CoreApiLookupCache:
+    """
+    Caches core API lookups of user ids (by email) and user projects (by user id), so that repeat notifications and
+    reminders for the same participant do not call the core API again. Emails without a thiscovery account (core API
+    calls raising AssertionError) are cached for negative_ttl seconds
+    """
+    def __init__(self, ttl=CORE_API_CACHE_TTL, negative_ttl=CORE_API_NEGATIVE_CACHE_TTL):
+        self.negative_ttl = negative_ttl
+        self.user_ids = TtlCache(ttl)
+        self.user_projects = TtlCache(ttl)
+
+    def get_user_id_by_email(self, core_api_client, email):
+        """
+        Raises:
+            AssertionError: if email does not have a thiscovery account, as CoreApiClient.get_user_id_by_email
+        """
+        user_id = self.user_ids.get(email)
+        if user_id is NO_ACCOUNT:
+            raise AssertionError(f'User {email} does not have a thiscovery account (cached core API response)')
+        if user_id is MISSING:
+            try:
+                user_id = core_api_client.get_user_id_by_email(email=email)
+            except AssertionError:
+                self.user_ids.set(email, NO_ACCOUNT, ttl=self.negative_ttl)
+                raise
+            self.user_ids.set(email, user_id)
+        return user_id
+
+    def get_userprojects(self, core_api_client, user_id):
+        return self.user_projects.get_or_load(user_id, lambda: core_api_client.get_userprojects(user_id))
+
+    def stats(self):
+        return {
+            'user_ids': self.user_ids.stats(),
+            'user_projects': self.user_projects.stats(),
+        }
+
+
+calendars_cache = CalendarsCache()
+appointment_types_cache = AppointmentTypesCache()
+core_api_cache = CoreApiLookupCache()
+
+metrics.track_cache('CalendarsCache', calendars_cache)
+metrics.track_cache('AppointmentTypesCache', appointment_types_cache)
+metrics.track_cache('CoreApiUserIdsCache', core_api_cache.user_ids)
+metrics.track_cache('CoreApiUserProjectsCache', core_api_cache.user_projects)
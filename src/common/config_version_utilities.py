@@ -0,0 +1,90 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+"""
+Stores a version number per config table (e.g. Calendars, AppointmentTypes). Versions are incremented by the
+config_streams handler whenever a table changes, so that warm Lambdas can keep long-lived in-memory caches of
+config items and drop them within seconds of an edit (see common.cache_utilities.VersionedTtlCache)
+"""
+import json
+import os
+
+import thiscovery_lib.utilities as utils
+
+from common.constants import CONFIG_VERSION_STORE_PATH, CONFIG_VERSIONS_TABLE
+from common.ddb_utilities import get_ddb_client
+
+
+class DdbConfigVersionStore:
+    """
+    Keeps versions in the ConfigVersions table, one item per config table
+    """
+    def __init__(self, ddb_client=None):
+        self._ddb = ddb_client
+
+    @property
+    def _ddb_client(self):
+        if self._ddb is None:
+            self._ddb = get_ddb_client()
+        return self._ddb
+
+    def get_version(self, config_name):
+        item = self._ddb_client.get_item(table_name=CONFIG_VERSIONS_TABLE, key=config_name)
+        if item is None:
+            return 0
+        return int(item['version'])
+
+    def bump_version(self, config_name):
+        table = self._ddb_client.get_table(table_name=CONFIG_VERSIONS_TABLE)
+        result = table.update_item(
+            Key={'id': config_name},
+            UpdateExpression='SET #modified = :modified ADD #version :one',
+            ExpressionAttributeNames={'#modified': 'modified', '#version': 'version'},
+            ExpressionAttributeValues={':modified': str(utils.now_with_tz()), ':one': 1},
+            ReturnValues='UPDATED_NEW',
+        )
+        return int(result['Attributes']['version'])
+
+
+class FileConfigVersionStore:
+    """
+    Keeps versions in a local json file; used in tests and local runs
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return dict()
+        with open(self.path) as f:
+            return json.load(f)
+
+    def get_version(self, config_name):
+        return self._read().get(config_name, 0)
+
+    def bump_version(self, config_name):
+        versions = self._read()
+        versions[config_name] = versions.get(config_name, 0) + 1
+        with open(self.path, 'w') as f:
+            json.dump(versions, f)
+        return versions[config_name]
+
+
+def get_config_version_store():
+    if CONFIG_VERSION_STORE_PATH:
+        return FileConfigVersionStore(CONFIG_VERSION_STORE_PATH)
+    return DdbConfigVersionStore()
@@ -16,15 +16,113 @@
 #   docs folder of this project.  It is also available www.gnu.org/licenses/
 #
 import copy
+import os
 
 
 STACK_NAME = 'thiscovery-interviews'
 APPOINTMENTS_TABLE = 'Appointments'
 APPOINTMENT_TYPES_TABLE = 'AppointmentTypes'
+CALENDARS_TABLE = 'Calendars'
+CALENDAR_BLOCKS_TABLE = 'CalendarBlocks'
+
+# sparse index of Calendars items with a block_schedule attribute (set only on calendars blocked by CalendarBlocker)
+CALENDARS_BLOCK_SCHEDULE_INDEX = 'block-schedule-index'
+MONDAY_MORNING_BLOCK_SCHEDULE = 'monday_morning'  # calendars with block_monday_morning and no block_rules
+RULES_BLOCK_SCHEDULE = 'rules'  # calendars with block_rules
+BLOCK_SCHEDULES = [MONDAY_MORNING_BLOCK_SCHEDULE, RULES_BLOCK_SCHEDULE]
+CALENDAR_BLOCKS_STATUS_INDEX = 'status-index'
+CONFIG_VERSIONS_TABLE = 'ConfigVersions'
+
+# stages of appointment reminders (e.g. '7d,1d,2h'); overridden per appointment type by the reminder_cadence
+# attribute of AppointmentTypes items (see common.reminder_cadence_utilities)
+REMINDER_CADENCE = os.environ.get('REMINDER_CADENCE', '1d').split(',')
+# sparse index of Appointments items with an appointment_datetime attribute, keyed by appointment_date and projecting
+# the attributes reminder planning needs, so that no appointment item is read to decide which reminders are due
+APPOINTMENTS_REMINDER_STAGES_INDEX = 'reminder-stages-index'
+# reminders queued by due hour when appointments are booked or rescheduled (see common.reminder_schedule_utilities)
+SCHEDULED_REMINDERS_TABLE = 'ScheduledReminders'
+# 'polling' (SendAppointmentReminder queries reminder-stages-index every hour of the working day) or 'scheduled' (SendScheduledReminders
+# sends the reminders in SCHEDULED_REMINDERS_TABLE as they fall due); the table is populated in both modes
+REMINDERS_MODE = os.environ.get('REMINDERS_MODE', 'polling')
+REMINDERS_MODES = ['polling', 'scheduled']
+# minimum time between the booking (or rescheduling) notification and a reminder, and between a reminder and the
+# appointment; reminders of appointments booked at short notice are postponed or, if too close to the appointment, not sent
+REMINDER_MIN_GAP_HOURS = int(os.environ.get('REMINDER_MIN_GAP_HOURS', 8))
+REMINDER_MIN_NOTICE_HOURS = int(os.environ.get('REMINDER_MIN_NOTICE_HOURS', 2))
+REMINDER_CATCH_UP_HOURS = int(os.environ.get('REMINDER_CATCH_UP_HOURS', 6))  # past due-hour buckets re-read by each run
+
+# in-memory caches of config tables; edits are picked up within CONFIG_VERSION_CHECK_INTERVAL via the version store
+# (see common.config_version_utilities), so TTLs (in seconds) can be long
+CALENDARS_CACHE_TTL = int(os.environ.get('CALENDARS_CACHE_TTL', 3600))
+APPOINTMENT_TYPES_CACHE_TTL = int(os.environ.get('APPOINTMENT_TYPES_CACHE_TTL', 3600))
+CONFIG_VERSION_CHECK_INTERVAL = int(os.environ.get('CONFIG_VERSION_CHECK_INTERVAL', 10))
+CONFIG_VERSION_STORE_PATH = os.environ.get('CONFIG_VERSION_STORE_PATH')  # use a local file store (for tests) if set
+
+# notes of Acuity blocks created by CalendarBlocker; blocks with other notes are never deleted when reconciling
+AUTOMATED_BLOCK_NOTES = 'automated block'
+# 'reconcile' (only create missing blocks and delete stale ones) or 'create' (always create blocks)
+BLOCK_CALENDARS_MODE = os.environ.get('BLOCK_CALENDARS_MODE', 'reconcile')
+# block rules (see common.block_rules_utilities) of calendars with block_monday_morning and no block_rules
+MONDAY_MORNING_BLOCK_RULES = [
+    {'type': 'weekly', 'start_day': 5, 'start_time': '00:00', 'end_day': 0, 'end_time': '12:00'},
+]
+BLOCK_PLANNING_HORIZON_DAYS = int(os.environ.get('BLOCK_PLANNING_HORIZON_DAYS', 7))
+# maximum number of concurrent Acuity calls made by CalendarBlocker; requests.Session pools 10 connections per host
+CALENDAR_BLOCKER_MAX_WORKERS = int(os.environ.get('CALENDAR_BLOCKER_MAX_WORKERS', 8))
+
+# process-wide secrets cache (see common.secrets_utilities.SecretsCache); in seconds
+SECRETS_CACHE_TTL = int(os.environ.get('SECRETS_CACHE_TTL', 3600))
+SECRETS_REFRESH_AFTER = int(os.environ.get('SECRETS_REFRESH_AFTER', 900))  # age after which hits trigger a background refresh
+SECRETS_WARM_UP_NAMES = ['acuity-connection', 'interviews', 'sns-topics']
+
+# per-invocation tracing of outbound calls (see common.tracing_utilities); disabled unless TRACING_ENABLED is set
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', '').lower() in ['1', 'true', 'yes']
+TRACING_MAX_SPANS = int(os.environ.get('TRACING_MAX_SPANS', 100))  # individual spans included in the summary log line
+
+# CloudWatch embedded metric format (EMF) metrics, logged once per invocation (see common.metrics_utilities)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ['1', 'true', 'yes']
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'thiscovery-interviews')
+
+# in-memory caches of core API lookups (see common.cache_utilities.CoreApiLookupCache); TTLs in seconds
+CORE_API_CACHE_TTL = int(os.environ.get('CORE_API_CACHE_TTL', 900))
+CORE_API_NEGATIVE_CACHE_TTL = int(os.environ.get('CORE_API_NEGATIVE_CACHE_TTL', 300))  # "no thiscovery account" results
 
 
 ACUITY_USER_METADATA_INTAKE_FORM_ID = 1606751
 
+# reminders use the Acuity state stored by webhook processing (acuity_info and its acuity_synced time) instead of
+# refetching the appointment from Acuity if it was synced less than ACUITY_STATE_MAX_AGE_HOURS ago (0 to always refetch);
+# ACUITY_STATE_VERIFICATION_RATE of those reminders refetch anyway to detect missed webhooks
+ACUITY_STATE_MAX_AGE_HOURS = int(os.environ.get('ACUITY_STATE_MAX_AGE_HOURS', 168))
+ACUITY_STATE_VERIFICATION_RATE = float(os.environ.get('ACUITY_STATE_VERIFICATION_RATE', 0.05))
+# reminder runs list the Acuity appointments (including cancelled ones) of the dates of due reminders in bulk and
+# check reminders against that snapshot, rather than fetching each appointment from Acuity
+REMINDERS_ACUITY_PREFETCH = os.environ.get('REMINDERS_ACUITY_PREFETCH', '').lower() in ['1', 'true', 'yes']
+ACUITY_APPOINTMENTS_PAGE_SIZE = int(os.environ.get('ACUITY_APPOINTMENTS_PAGE_SIZE', 100))  # AcuityClient.get_appointments
+ACUITY_BLOCKS_PAGE_SIZE = int(os.environ.get('ACUITY_BLOCKS_PAGE_SIZE', 100))  # AcuityClient.get_blocks_between
+
+# How the Acuity appointment payload is stored in Appointments items:
+#   'full': entire payload in acuity_info
+#   'compact': only ACUITY_INFO_STORED_FIELDS in acuity_info; everything else discarded
+#   'compact_archive': as 'compact', but everything else is stored gzip-compressed in acuity_info_archive
+ACUITY_INFO_STORAGE_MODE = os.environ.get('ACUITY_INFO_STORAGE_MODE', 'full')
+ACUITY_INFO_STORAGE_MODES = ['full', 'compact', 'compact_archive']
+ACUITY_INFO_STORED_FIELDS = [  # fields of the Acuity payload read by this stack
+    'appointmentTypeID',
+    'calendar',
+    'calendarID',
+    'canceled',
+    'confirmationPage',
+    'datetime',
+    'duration',
+    'email',
+    'endTime',
+    'firstName',
+    'id',
+    'lastName',
+    'phone',
+]
+
 
 COMMON_PROPERTIES = [
     'project_short_name',
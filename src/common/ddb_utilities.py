@@ -0,0 +1,121 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import json
+from decimal import Decimal
+
+import thiscovery_lib.utilities as utils
+
+from thiscovery_lib.dynamodb_utilities import Dynamodb
+
+from common.constants import STACK_NAME
+from common.tracing_utilities import tracer
+
+
+_ddb_client = None
+DDB_TRACED_METHODS = ['delete_item', 'get_item', 'put_item', 'query', 'scan', 'update_item']
+
+
+def _get_table_name(args, kwargs):
+    return kwargs.get('table_name', args[0] if args else None)
+
+
+def trace_ddb_client(ddb_client):
+    """
+    Records a tracing span (targeting the table name) for every data call made by ddb_client
+    """
+    return tracer.trace_methods(ddb_client, 'dynamodb', DDB_TRACED_METHODS, get_target=_get_table_name)
+
+
+def get_ddb_client():
+    """
+    Returns:
+        Dynamodb client shared by all modules in this process, so that its boto3 client and connection pool are
+        created once per Lambda container
+    """
+    global _ddb_client
+    if _ddb_client is None:
+        _ddb_client = trace_ddb_client(Dynamodb(stack_name=STACK_NAME))
+    return _ddb_client
+
+
+def build_ddb_item(key, item_type, item_details, item=None):
+    """
+    Returns:
+        Item with the same attributes that Dynamodb.put_item writes (id, type, details, created, modified), for
+        writing with batch_write_items. Floats are converted to Decimal, as required by boto3
+    """
+    now = str(utils.now_with_tz())
+    ddb_item = {
+        **(item or dict()),
+        'id': str(key),
+        'type': item_type,
+        'details': item_details,
+        'created': now,
+        'modified': now,
+    }
+    return json.loads(json.dumps(ddb_item), parse_float=Decimal)
+
+
+def batch_write_items(ddb_client, table_name, put_items=(), delete_keys=()):
+    """
+    Writes put_items and deletes the items with keys delete_keys using as few BatchWriteItem calls as possible
+    (25 requests per call). Unprocessed items are resent by boto3's batch_writer. Items are written as they are,
+    so new items should be created with build_ddb_item
+
+    Args:
+        ddb_client (Dynamodb): client whose get_table resolves table_name
+        table_name (str):
+        put_items (list): complete items
+        delete_keys (list): ids of items to delete, or key dictionaries of tables with a composite primary key
+    """
+    table = ddb_client.get_table(table_name=table_name)
+    with table.batch_writer() as batch:
+        for item in put_items:
+            batch.put_item(Item=item)
+        for key in delete_keys:
+            batch.delete_item(Key=key if isinstance(key, dict) else {'id': key})
+
+
+def get_attribute_value_size(value):
+    """
+    Approximates the size in bytes of a Dynamodb attribute value, following
+    https://docs.aws.amazon.com/amazondynamodb/latest/developerguide/CapacityUnitCalculations.html
+    """
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, (int, float, Decimal)):
+        significant_digits = len(str(value).lstrip('-').replace('.', '').strip('0')) or 1
+        return (significant_digits + 1) // 2 + 1
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if hasattr(value, 'value'):  # boto3.dynamodb.types.Binary
+        return len(value.value)
+    if isinstance(value, dict):
+        return 3 + sum(len(k.encode('utf-8')) + get_attribute_value_size(v) + 1 for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return 3 + sum(get_attribute_value_size(v) + 1 for v in value)
+    raise TypeError(f'Cannot estimate Dynamodb size of {type(value)}')
+
+
+def get_item_size(item):
+    """
+    Approximates the size in bytes of a Dynamodb item, which determines read/write capacity unit consumption
+    """
+    return sum(len(k.encode('utf-8')) + get_attribute_value_size(v) for k, v in item.items())
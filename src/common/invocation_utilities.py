@@ -0,0 +1,56 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import functools
+
+
+_start_hooks = list()
+_end_hooks = list()
+
+
+def register_invocation_hooks(on_start=None, on_end=None):
+    """
+    Registers functions to be called with the Lambda event and the handler name at the start and end of every
+    invocation of handlers decorated with invocation_hooks. End hooks are called even if the handler raises an exception
+    """
+    if (on_start is not None) and (on_start not in _start_hooks):
+        _start_hooks.append(on_start)
+    if (on_end is not None) and (on_end not in _end_hooks):
+        _end_hooks.append(on_end)
+
+
+def invocation_hooks(func):
+    """
+    Handler decorator that runs registered invocation hooks. Apply it below utils.lambda_wrapper (so that hooks
+    can use event['logger'] and event['correlation_id']) and above utils.api_error_handler (so that end hooks
+    also run for requests that fail), e.g.:
+
+        @utils.lambda_wrapper
+        @invocation_hooks
+        @utils.api_error_handler
+        def handler(event, context):
+    """
+    @functools.wraps(func)
+    def wrapper(event, context):
+        for hook in _start_hooks:
+            hook(event, func.__name__)
+        try:
+            return func(event, context)
+        finally:
+            for hook in _end_hooks:
+                hook(event, func.__name__)
+    return wrapper
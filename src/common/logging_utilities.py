@@ -0,0 +1,65 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import logging
+
+import thiscovery_lib.utilities as utils
+
+
+class LazyExtra:
+    """
+    Wraps a function call whose result is only needed if a log record is actually emitted.
+    Use as a value of the extra dict passed to logger methods, e.g.:
+        logger.debug('Message', extra={'appointment': LazyExtra(appointment.as_dict)})
+    The call is made by LazyExtraFilter, which only runs for records that pass the logger level check, so
+    payloads for suppressed levels (e.g. debug in production) are never built.
+    """
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def resolve(self):
+        return self.func(*self.args)
+
+
+class LazyExtraFilter(logging.Filter):
+    """
+    Replaces LazyExtra values in log records with their result
+    """
+    def filter(self, record):
+        for k, v in record.__dict__.items():
+            if isinstance(v, LazyExtra):
+                record.__dict__[k] = v.resolve()
+        return True
+
+
+lazy_extra_filter = LazyExtraFilter()
+
+
+def add_lazy_extra_filter(logger):
+    """
+    Installs lazy_extra_filter on logger. Safe to call repeatedly, as logging.Logger.addFilter
+    ignores filters that are already installed.
+    """
+    logger.addFilter(lazy_extra_filter)
+    return logger
+
+
+# utils.get_logger returns the same logger every time; this is also the logger utils.lambda_wrapper passes to handlers
+add_lazy_extra_filter(utils.get_logger())
@@ -0,0 +1,168 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import json
+import time
+from contextlib import contextmanager
+
+from common.constants import METRICS_ENABLED, METRICS_NAMESPACE
+from common.invocation_utilities import register_invocation_hooks
+from common.tracing_utilities import tracer
+
+
+EMF_MAX_VALUES = 100  # maximum number of values per metric in an EMF document
+
+
+class MetricsLogger:
+    """
+    Buffers metrics and writes them as a CloudWatch embedded metric format (EMF) log line when flushed, so that
+    CloudWatch extracts them from the logs without any API calls
+    (https://docs.aws.amazon.com/AmazonCloudWatch/latest/monitoring/CloudWatch_Embedded_Metric_Format_Specification.html).
+
+    Metrics put outside an invocation (e.g. init phase timings) are flushed with the next invocation.
+    Collectors are functions called with this logger on flush, to put metrics derived from other modules' state.
+    """
+    def __init__(self, namespace=METRICS_NAMESPACE, emit=print, clock=time.perf_counter):
+        self.namespace = namespace
+        self._emit = emit
+        self._clock = clock
+        self._metrics = dict()  # name: (unit, list of values)
+        self._collectors = list()
+        self._tracked_caches = dict()  # name: (cache, (hits, misses) at the start of the invocation)
+        self.handler_name = None
+        self.correlation_id = None
+        self._start = None
+
+    def put_metric(self, name, value, unit='Count'):
+        self._metrics.setdefault(name, (unit, list()))[1].append(value)
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Puts the duration of the enclosed block (or decorated function) as metric name, in milliseconds
+        """
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.put_metric(name, round((self._clock() - start) * 1000, 2), 'Milliseconds')
+
+    def add_collector(self, collector):
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def track_cache(self, name, cache):
+        """
+        Puts the hit ratio of cache (an object with a stats method returning hits and misses) during each
+        invocation as metric {name}HitRatio. Invocations without lookups put no value
+        """
+        self._tracked_caches[name] = (cache, None)
+
+    @staticmethod
+    def _get_hits_and_misses(cache):
+        stats = cache.stats()
+        return stats['hits'], stats['misses']
+
+    def start_invocation(self, handler_name, correlation_id=None):
+        self.handler_name = handler_name
+        self.correlation_id = correlation_id
+        self._start = self._clock()
+        for name, (cache, _) in self._tracked_caches.items():
+            self._tracked_caches[name] = (cache, self._get_hits_and_misses(cache))
+
+    def _collect(self):
+        if self._start is not None:
+            self.put_metric('Duration', round((self._clock() - self._start) * 1000, 2), 'Milliseconds')
+        for name, (cache, start_stats) in self._tracked_caches.items():
+            start_hits, start_misses = start_stats or (0, 0)
+            hits, misses = self._get_hits_and_misses(cache)
+            lookups = (hits - start_hits) + (misses - start_misses)
+            if lookups:
+                self.put_metric(f'{name}HitRatio', round(100 * (hits - start_hits) / lookups, 2), 'Percent')
+        for collector in self._collectors:
+            collector(self)
+
+    def _documents(self):
+        dimensions = {'Handler': self.handler_name} if self.handler_name else dict()
+        n_documents = max((len(values) - 1) // EMF_MAX_VALUES + 1 for _, values in self._metrics.values())
+        for i in range(n_documents):
+            chunk = {
+                name: (unit, values[i * EMF_MAX_VALUES:(i + 1) * EMF_MAX_VALUES])
+                for name, (unit, values) in self._metrics.items()
+            }
+            chunk = {name: (unit, values) for name, (unit, values) in chunk.items() if values}
+            document = {
+                '_aws': {
+                    'Timestamp': int(time.time() * 1000),
+                    'CloudWatchMetrics': [{
+                        'Namespace': self.namespace,
+                        'Dimensions': [list(dimensions.keys())],
+                        'Metrics': [{'Name': name, 'Unit': unit} for name, (unit, _) in chunk.items()],
+                    }],
+                },
+                **dimensions,
+                'correlation_id': self.correlation_id,
+            }
+            for name, (_, values) in chunk.items():
+                document[name] = values[0] if len(values) == 1 else values
+            yield document
+
+    def flush(self):
+        """
+        Writes buffered metrics as EMF log lines (one per invocation, unless a metric has more than EMF_MAX_VALUES
+        values) and clears the buffer
+        """
+        try:
+            self._collect()
+            if self._metrics:
+                for document in self._documents():
+                    self._emit(json.dumps(document, default=str))
+        finally:
+            self._metrics = dict()
+            self._start = None
+
+
+metrics = MetricsLogger()
+
+
+def _put_outbound_call_metrics(metrics_logger):
+    """
+    Puts {Service}Calls metrics for outbound calls counted by the tracer (see common.tracing_utilities) and, while
+    TRACING_ENABLED is set, {Service}Ms metrics from the spans it records
+    """
+    durations_ms = dict()
+    for s in tracer.spans:
+        durations_ms[s.service] = durations_ms.get(s.service, 0) + s.duration_ms
+    for service, calls in sorted(tracer.call_counts.items()):
+        service_name = ''.join(x.capitalize() for x in service.split('_'))
+        metrics_logger.put_metric(f'{service_name}Calls', calls)
+        if service in durations_ms:
+            metrics_logger.put_metric(f'{service_name}Ms', round(durations_ms[service], 2), 'Milliseconds')
+
+
+def _start_invocation(event, handler_name):
+    metrics.start_invocation(handler_name, event.get('correlation_id'))
+    tracer.reset_call_counts()
+
+
+def _flush(event, handler_name):
+    metrics.flush()
+
+
+if METRICS_ENABLED:
+    metrics.add_collector(_put_outbound_call_metrics)
+    register_invocation_hooks(on_start=_start_invocation, on_end=_flush)
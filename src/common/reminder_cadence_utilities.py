@@ -0,0 +1,160 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+"""
+Planning of multi-stage appointment reminders.
+
+A reminder cadence is a list of stages, each stating how long before an appointment a reminder is sent:
+    '7d', '1d': appointments on the date N days after the day of the reminder run (in UTC)
+    '2h': appointments starting within N hours of the reminder run
+The global cadence (REMINDER_CADENCE) is overridden for an appointment type by the reminder_cadence attribute of
+its AppointmentTypes item. The stage of the latest reminder sent is stored in the reminder_stage attribute of
+Appointments items; an appointment is never sent the same stage twice, nor a stage further from the appointment
+than one it has already received, so stages missed while reminders were not running are skipped rather than sent late.
+"""
+import datetime
+import re
+
+import thiscovery_lib.utilities as utils
+
+from common.constants import REMINDER_CADENCE
+
+
+DATE_FORMAT = '%Y-%m-%d'
+STAGE_PATTERN = re.compile(r'^(?P<value>[1-9]\d*)(?P<unit>[dh])$')
+
+
+def parse_reminder_stage(stage):
+    """
+    Returns:
+        Tuple (value, unit) of stage (e.g. (7, 'd') for '7d')
+    """
+    m = STAGE_PATTERN.match(str(stage))
+    if m is None:
+        raise utils.DetailedValueError(f'Invalid reminder stage {stage}; expected a number of days (e.g. 7d) or '
+                                       f'hours (e.g. 2h)', details={})
+    return int(m.group('value')), m.group('unit')
+
+
+def get_stage_lead_time(stage):
+    value, unit = parse_reminder_stage(stage)
+    if unit == 'd':
+        return datetime.timedelta(days=value)
+    return datetime.timedelta(hours=value)
+
+
+def validate_cadence(cadence):
+    """
+    Returns:
+        Distinct stages of cadence, furthest from the appointment first
+    """
+    if not cadence:
+        raise utils.DetailedValueError('Reminder cadence must contain at least one stage', details={'cadence': cadence})
+    return sorted(set(cadence), key=get_stage_lead_time, reverse=True)
+
+
+def get_global_cadence():
+    return validate_cadence(REMINDER_CADENCE)
+
+
+def _as_utc(now):
+    if now.tzinfo is None:
+        return now.replace(tzinfo=datetime.timezone.utc)
+    return now.astimezone(datetime.timezone.utc)
+
+
+def get_stage_target_dates(stage, now):
+    """
+    Returns:
+        Dates (appointment_date values) of the appointments stage may be due for in a reminder run at now
+    """
+    now = _as_utc(now)
+    value, unit = parse_reminder_stage(stage)
+    if unit == 'd':
+        return [(now + datetime.timedelta(days=value)).strftime(DATE_FORMAT)]
+    end = now + datetime.timedelta(hours=value)
+    days = (end.date() - now.date()).days
+    return [(now + datetime.timedelta(days=d)).strftime(DATE_FORMAT) for d in range(days + 1)]
+
+
+def get_target_dates(stages, now):
+    """
+    Returns:
+        Sorted distinct dates of the appointments any of stages may be due for; each needs one index query
+    """
+    return sorted({d for stage in stages for d in get_stage_target_dates(stage, now)})
+
+
+def is_stage_due(stage, appointment_datetime, now):
+    """
+    Args:
+        stage (str):
+        appointment_datetime (datetime.datetime): timezone-aware
+        now (datetime.datetime): timezone-aware
+    """
+    value, unit = parse_reminder_stage(stage)
+    if unit == 'd':
+        return appointment_datetime.strftime(DATE_FORMAT) in get_stage_target_dates(stage, now)
+    return now < appointment_datetime <= now + datetime.timedelta(hours=value)
+
+
+def get_due_stage(item, cadence, now):
+    """
+    Args:
+        item (dict): Appointments item (or index projection) with appointment_datetime, latest_participant_notification
+            and (optionally) reminder_stage attributes
+        cadence (list): validated cadence of the appointment's type
+        now (datetime.datetime): time of the reminder run
+
+    Returns:
+        Stage of the reminder item is due, or None if no reminder should be sent
+    """
+    now = _as_utc(now)
+    latest_notification = item.get('latest_participant_notification') or '0000-00-00'
+    if latest_notification < '2020':  # appointments that have not received their booking notification yet
+        return None
+    if latest_notification >= now.strftime(DATE_FORMAT):  # an email was already sent today
+        return None
+    appointment_datetime = datetime.datetime.strptime(item['appointment_datetime'], '%Y-%m-%dT%H:%M:%S%z')
+    if appointment_datetime <= now:
+        return None
+    due_stages = [x for x in cadence if is_stage_due(x, appointment_datetime, now)]
+    if not due_stages:
+        return None
+    stage = min(due_stages, key=get_stage_lead_time)
+    reminder_stage = item.get('reminder_stage')
+    if reminder_stage and (get_stage_lead_time(reminder_stage) <= get_stage_lead_time(stage)):
+        return None
+    return stage
+
+
+def plan_reminders(items, get_cadence, now):
+    """
+    Args:
+        items (list): Appointments items (see get_due_stage), with an appointment_type_id attribute
+        get_cadence: function of an appointment type id returning its validated cadence
+        now (datetime.datetime): time of the reminder run
+
+    Returns:
+        Dictionary of due stages, keyed by appointment id
+    """
+    due = dict()
+    for item in items:
+        stage = get_due_stage(item, get_cadence(item.get('appointment_type_id')), now)
+        if stage is not None:
+            due[item['id']] = stage
+    return due
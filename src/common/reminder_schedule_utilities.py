@@ -0,0 +1,189 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+"""
+Event-time scheduling of appointment reminders.
+
+When an appointment is booked or rescheduled, the due time of each stage of its reminder cadence (see
+common.reminder_cadence_utilities) is computed and a ScheduledReminders item is written to the partition of the
+hour (UTC) the reminder falls due in:
+    {'due_hour': '2030-12-23T09', 'reminder_id': '448161724#1d', 'appointment_id': '448161724', 'stage': '1d',
+     'due': '2030-12-23T09:00:00+00:00', 'appointment_datetime': '2030-12-24T09:00:00+0000', 'expires': 1924992000}
+Consumers read only the partitions of the current hour and the preceding REMINDER_CATCH_UP_HOURS hours. Items are
+never updated: an item left behind by a rescheduling is recognised as stale because its appointment_datetime no
+longer matches the appointment's, and items that are never consumed are removed by Dynamodb TTL (expires).
+"""
+import datetime
+
+import thiscovery_lib.utilities as utils
+
+from common.constants import REMINDER_CATCH_UP_HOURS, REMINDER_MIN_GAP_HOURS, REMINDER_MIN_NOTICE_HOURS, \
+    SCHEDULED_REMINDERS_TABLE
+from common.ddb_utilities import batch_write_items, get_ddb_client
+from common.reminder_cadence_utilities import get_global_cadence, get_stage_lead_time, validate_cadence
+
+
+DUE_HOUR_FORMAT = '%Y-%m-%dT%H'
+ACUITY_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S%z'
+
+
+def parse_appointment_datetime(appointment_datetime):
+    """
+    Args:
+        appointment_datetime (str): datetime of an Acuity appointment (e.g. '2030-12-24T09:00:00+0000')
+    """
+    try:
+        return datetime.datetime.strptime(appointment_datetime, ACUITY_DATETIME_FORMAT)
+    except (TypeError, ValueError):
+        raise utils.DetailedValueError(f'Invalid appointment datetime {appointment_datetime}; '
+                                       f'expected format {ACUITY_DATETIME_FORMAT}', details={})
+
+
+def get_due_hour(due):
+    """
+    Returns:
+        Partition key (hour bucket, in UTC) of reminders due at timezone-aware datetime due
+    """
+    return due.astimezone(datetime.timezone.utc).strftime(DUE_HOUR_FORMAT)
+
+
+def get_reminder_due_times(appointment_datetime, now, cadence):
+    """
+    Each stage of cadence (see common.reminder_cadence_utilities) is due its lead time before the appointment. Stages
+    that would then be due less than REMINDER_MIN_GAP_HOURS after now (when the participant is notified of the booking)
+    are dropped, except the stage closest to the appointment, which is postponed so that appointments booked at short
+    notice are still reminded of, unless that leaves less than REMINDER_MIN_NOTICE_HOURS before the appointment
+
+    Returns:
+        List of (stage, due) tuples, where due is a timezone-aware datetime
+    """
+    earliest_due = now + datetime.timedelta(hours=REMINDER_MIN_GAP_HOURS)
+    stages = validate_cadence(cadence)
+    due_times = list()
+    for stage in stages[:-1]:
+        due = appointment_datetime - get_stage_lead_time(stage)
+        if due >= earliest_due:
+            due_times.append((stage, due))
+    closest_stage = stages[-1]
+    due = appointment_datetime - get_stage_lead_time(closest_stage)
+    if due < earliest_due:
+        due = earliest_due
+        if due > appointment_datetime - datetime.timedelta(hours=REMINDER_MIN_NOTICE_HOURS):
+            return due_times
+    due_times.append((closest_stage, due))
+    return due_times
+
+
+def build_scheduled_reminder(appointment_id, appointment_datetime, stage, due):
+    """
+    Args:
+        appointment_id: Acuity appointment id
+        appointment_datetime (str): datetime of the appointment, as stored in acuity_info
+        stage (str): reminder stage (e.g. '1d')
+        due (datetime.datetime): timezone-aware due time of the reminder
+
+    Returns:
+        ScheduledReminders item
+    """
+    expires = parse_appointment_datetime(appointment_datetime) + datetime.timedelta(days=1)
+    return {
+        'due_hour': get_due_hour(due),
+        'reminder_id': f'{appointment_id}#{stage}',
+        'appointment_id': str(appointment_id),
+        'stage': stage,
+        'due': due.astimezone(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'appointment_datetime': appointment_datetime,
+        'expires': int(expires.timestamp()),
+    }
+
+
+def get_reminder_key(reminder):
+    return {'due_hour': reminder['due_hour'], 'reminder_id': reminder['reminder_id']}
+
+
+class ReminderSchedule:
+    """
+    Reads and writes the ScheduledReminders table
+    """
+
+    def __init__(self, ddb_client=None, catch_up_hours=REMINDER_CATCH_UP_HOURS):
+        self.ddb_client = ddb_client
+        if ddb_client is None:
+            self.ddb_client = get_ddb_client()
+        self.catch_up_hours = catch_up_hours
+
+    def schedule(self, appointment_id, appointment_datetime, cadence=None, now=None):
+        """
+        Queues the reminders of an appointment that has just been booked or rescheduled
+
+        Args:
+            appointment_id: Acuity appointment id
+            appointment_datetime (str): datetime of the appointment, as stored in acuity_info
+            cadence (list): reminder stages of the appointment's type; defaults to the global cadence
+            now (datetime.datetime): timezone-aware; defaults to the current time
+
+        Returns:
+            List of ScheduledReminders items written
+        """
+        if now is None:
+            now = utils.now_with_tz()
+        if cadence is None:
+            cadence = get_global_cadence()
+        reminders = [
+            build_scheduled_reminder(appointment_id, appointment_datetime, stage, due)
+            for stage, due in get_reminder_due_times(parse_appointment_datetime(appointment_datetime), now, cadence)
+        ]
+        if reminders:
+            batch_write_items(self.ddb_client, SCHEDULED_REMINDERS_TABLE, put_items=reminders)
+        return reminders
+
+    def get_due_hours(self, now):
+        return [get_due_hour(now - datetime.timedelta(hours=h)) for h in range(self.catch_up_hours, -1, -1)]
+
+    def _query_due_hour(self, due_hour):
+        return self.ddb_client.query(
+            table_name=SCHEDULED_REMINDERS_TABLE,
+            KeyConditionExpression='due_hour = :due_hour',
+            ExpressionAttributeValues={':due_hour': due_hour},
+        )
+
+    def get_due_reminders(self, now=None):
+        """
+        Queries the partitions of the current and the preceding catch_up_hours hours, one at a time because the
+        shared ddb_client (a boto3 resource) is not thread-safe
+
+        Returns:
+            ScheduledReminders items due at or before now, oldest first
+        """
+        if now is None:
+            now = utils.now_with_tz()
+        due_hours = self.get_due_hours(now)
+        partitions = [self._query_due_hour(x) for x in due_hours]
+        now_string = now.astimezone(datetime.timezone.utc).isoformat(timespec='seconds')
+        reminders = [x for partition in partitions for x in partition if x['due'] <= now_string]
+        return sorted(reminders, key=lambda x: x['due'])
+
+    def remove(self, reminders):
+        """
+        Deletes processed ScheduledReminders items
+        """
+        if reminders:
+            batch_write_items(
+                self.ddb_client,
+                SCHEDULED_REMINDERS_TABLE,
+                delete_keys=[get_reminder_key(x) for x in reminders],
+            )
@@ -0,0 +1,129 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import threading
+import time
+
+import thiscovery_lib.utilities as utils
+
+from common.constants import SECRETS_CACHE_TTL, SECRETS_REFRESH_AFTER
+from common.invocation_utilities import register_invocation_hooks
+from common.metrics_utilities import metrics
+
+
+class SecretsCache:
+    """
+    Process-wide cache of Secrets Manager secrets.
+
+    Secrets are served from memory for ttl seconds. Once a secret is older than refresh_after seconds, the next
+    hit returns the cached value and refreshes it in a background thread, so rotated secrets are picked up without
+    requests waiting on Secrets Manager. Lambda freezes background threads between invocations, so a refresh
+    started at the end of an invocation completes in the next one. Secrets Manager calls are counted in calls.
+    """
+    def __init__(self, ttl=SECRETS_CACHE_TTL, refresh_after=SECRETS_REFRESH_AFTER, fetcher=None,
+                 clock=time.monotonic):
+        self.ttl = ttl
+        self.refresh_after = refresh_after
+        self._fetcher = fetcher
+        self._clock = clock
+        self._entries = dict()  # secret_name: (value, fetched_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _fetch(self, secret_name):
+        fetcher = self._fetcher
+        if fetcher is None:
+            fetcher = utils.get_secret
+        value = fetcher(secret_name)
+        with self._lock:
+            self.calls += 1
+            self._entries[secret_name] = (value, self._clock())
+        return value
+
+    def _background_refresh(self, secret_name):
+        try:
+            self._fetch(secret_name)
+        except Exception as err:  # the cached value is still valid until ttl expires
+            utils.get_logger().warning(f'Background refresh of secret {secret_name} failed: {repr(err)}')
+        finally:
+            with self._lock:
+                self._refreshing.discard(secret_name)
+
+    def get(self, secret_name):
+        entry = self._entries.get(secret_name)
+        if entry is None:
+            return self._fetch(secret_name)
+        value, fetched_at = entry
+        age = self._clock() - fetched_at
+        if age >= self.ttl:
+            return self._fetch(secret_name)
+        if age >= self.refresh_after:
+            with self._lock:
+                start_refresh = secret_name not in self._refreshing
+                self._refreshing.add(secret_name)
+            if start_refresh:
+                threading.Thread(target=self._background_refresh, args=(secret_name,), daemon=True).start()
+        return value
+
+    def warm_up(self, secret_names):
+        """
+        Fetches the secrets in secret_names that are not cached yet, one at a time because utils.get_secret creates
+        its boto3 client from the default session, which is not thread-safe
+        """
+        for secret_name in secret_names:
+            if secret_name not in self._entries:
+                self._fetch(secret_name)
+
+    def reset_call_count(self):
+        """
+        Returns:
+            Number of Secrets Manager calls since the previous reset
+        """
+        with self._lock:
+            calls = self.calls
+            self.calls = 0
+        return calls
+
+
+secrets_cache = SecretsCache()
+
+
+def get_secret(secret_name):
+    """
+    Accessor used by all modules in this repo instead of utils.get_secret (see SecretsCache)
+    """
+    return secrets_cache.get(secret_name)
+
+
+def _reset_secrets_call_count(event, handler_name):
+    secrets_cache.reset_call_count()
+
+
+def _log_secrets_call_count(event, handler_name):
+    event['logger'].info('Secrets Manager calls', extra={
+        'secrets_manager_calls': secrets_cache.calls,
+        'correlation_id': event.get('correlation_id'),
+    })
+
+
+def _put_secrets_call_count(metrics_logger):
+    metrics_logger.put_metric('SecretsManagerCalls', secrets_cache.calls)
+
+
+register_invocation_hooks(on_start=_reset_secrets_call_count, on_end=_log_secrets_call_count)
+metrics.add_collector(_put_secrets_call_count)
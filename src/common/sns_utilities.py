@@ -17,11 +17,14 @@
 #
 import thiscovery_lib.utilities as utils
 
+from common.tracing_utilities import traced
+
 
 class SnsClient(utils.BaseClient):
     def __init__(self):
         super().__init__('sns')
 
+    @traced('sns')
     def publish(self, message, topic_arn, **kwargs):
         """
         https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/sns.html#SNS.Client.publish
@@ -0,0 +1,194 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from common.constants import TRACING_ENABLED, TRACING_MAX_SPANS
+from common.invocation_utilities import register_invocation_hooks
+
+
+class Span:
+    __slots__ = ['service', 'operation', 'target', 'duration_ms', 'bytes', 'status']
+
+    def __init__(self, service, operation, target=None):
+        self.service = service
+        self.operation = operation
+        self.target = target
+        self.duration_ms = None
+        self.bytes = None
+        self.status = 'ok'
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__ if getattr(self, k) is not None}
+
+
+def _payload_size(result):
+    """
+    Approximate size in bytes of the value returned by an outbound call
+    """
+    if result is None:
+        return None
+    if isinstance(result, (bytes, bytearray)):
+        return len(result)
+    if isinstance(result, str):
+        return len(result.encode('utf-8'))
+    try:
+        return len(json.dumps(result, default=str))
+    except (TypeError, ValueError):
+        return None
+
+
+def _result_status(result):
+    if isinstance(result, dict) and 'statusCode' in result:  # core and emails API responses
+        return result['statusCode']
+    return 'ok'
+
+
+class Tracer:
+    """
+    Records timing spans of outbound calls (Acuity, Dynamodb, core/emails API, SNS) made during an invocation.
+
+    Outbound calls are always counted by service in call_counts (see common.metrics_utilities). When disabled, that
+    is all wrap and trace_methods add to outbound calls: no spans are recorded and no invocation hooks are registered.
+    """
+    def __init__(self, enabled=TRACING_ENABLED, max_spans=TRACING_MAX_SPANS, clock=time.perf_counter):
+        self.enabled = enabled
+        self.max_spans = max_spans
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.correlation_id = None
+        self.spans = list()
+        self.call_counts = dict()  # service: number of outbound calls since the last reset
+
+    def start_invocation(self, correlation_id=None):
+        self.correlation_id = correlation_id
+        self.spans = list()
+        self.reset_call_counts()
+
+    def count_call(self, service):
+        with self._lock:
+            self.call_counts[service] = self.call_counts.get(service, 0) + 1
+
+    def reset_call_counts(self):
+        with self._lock:
+            self.call_counts = dict()
+
+    @contextmanager
+    def span(self, service, operation, target=None):
+        """
+        Times the enclosed outbound call. The caller may set bytes and status on the yielded span; exceptions
+        are recorded as the span status and re-raised
+        """
+        self.count_call(service)
+        span = Span(service, operation, target)
+        start = self._clock()
+        try:
+            yield span
+        except Exception as err:
+            span.status = type(err).__name__
+            raise
+        finally:
+            span.duration_ms = round((self._clock() - start) * 1000, 2)
+            self.spans.append(span)
+
+    def wrap(self, func, service, operation=None, get_target=None):
+        """
+        Args:
+            func: callable making an outbound call
+            service (str): e.g. 'dynamodb'
+            operation (str): defaults to func.__name__
+            get_target: optional function of (args, kwargs) returning the resource the call targets (e.g. a table name)
+        """
+        if not self.enabled:
+            @functools.wraps(func)
+            def counter(*args, **kwargs):
+                self.count_call(service)
+                return func(*args, **kwargs)
+            return counter
+        if operation is None:
+            operation = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            target = get_target(args, kwargs) if get_target else None
+            with self.span(service, operation, target) as span:
+                result = func(*args, **kwargs)
+                span.bytes = _payload_size(result)
+                span.status = _result_status(result)
+            return result
+        return wrapper
+
+    def trace_methods(self, obj, service, method_names, get_target=None):
+        """
+        Replaces method_names of instance obj with traced versions; names obj does not have are ignored
+
+        Returns:
+            obj
+        """
+        for name in method_names:
+            method = getattr(obj, name, None)
+            if method is not None:
+                setattr(obj, name, self.wrap(method, service, name, get_target))
+        return obj
+
+    def summary(self):
+        by_operation = dict()
+        for s in self.spans:
+            key = f'{s.service}.{s.operation}'
+            stats = by_operation.setdefault(key, {'calls': 0, 'total_ms': 0, 'max_ms': 0, 'bytes': 0, 'errors': 0})
+            stats['calls'] += 1
+            stats['total_ms'] = round(stats['total_ms'] + s.duration_ms, 2)
+            stats['max_ms'] = max(stats['max_ms'], s.duration_ms)
+            stats['bytes'] += s.bytes or 0
+            if not ((s.status == 'ok') or (isinstance(s.status, int) and s.status < 400)):
+                stats['errors'] += 1
+        return {
+            'correlation_id': self.correlation_id,
+            'outbound_calls': len(self.spans),
+            'outbound_ms': round(sum(s.duration_ms for s in self.spans), 2),
+            'by_operation': by_operation,
+            'spans': [s.as_dict() for s in self.spans[:self.max_spans]],
+            'spans_truncated': len(self.spans) > self.max_spans,
+        }
+
+
+tracer = Tracer()
+
+
+def traced(service, operation=None):
+    """
+    Decorator version of tracer.wrap, for functions and methods defined in this repo
+    """
+    def decorator(func):
+        return tracer.wrap(func, service, operation)
+    return decorator
+
+
+def _start_invocation(event, handler_name):
+    tracer.start_invocation(event.get('correlation_id'))
+
+
+def _log_summary(event, handler_name):
+    event['logger'].info('Outbound call trace', extra=tracer.summary())
+
+
+if tracer.enabled:
+    register_invocation_hooks(on_start=_start_invocation, on_end=_log_summary)
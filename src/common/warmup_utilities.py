@@ -0,0 +1,109 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+"""
+Init-phase warm-up of Lambda containers. Handler modules call warm_up at module scope, so that fetching secrets,
+opening connections and loading config caches is done during the Lambda init phase rather than while handling
+the first request after a cold start
+"""
+import os
+import time
+
+import thiscovery_lib.utilities as utils
+
+from common.acuity_utilities import get_acuity_session
+from common.cache_utilities import appointment_types_cache, calendars_cache
+from common.constants import APPOINTMENT_TYPES_TABLE, SECRETS_WARM_UP_NAMES
+from common.ddb_utilities import get_ddb_client
+from common.metrics_utilities import metrics
+from common.secrets_utilities import secrets_cache
+
+
+def get_lambda_handler():
+    """
+    Returns:
+        Tuple (module name, function name) of the handler of the Lambda function running in this container
+    """
+    handler_module, _, handler_function = os.environ.get('_HANDLER', '').rpartition('.')
+    return handler_module, handler_function
+
+
+def should_warm_up(handler_module=None):
+    """
+    Args:
+        handler_module (str): if given, only warm up if the Lambda function's handler is in this module, so that
+            modules imported by other handler modules (e.g. appointments by reminders) do not warm up for them
+
+    Returns:
+        True if running in a Lambda container (as opposed to unit tests or local scripts)
+    """
+    if (handler_module is not None) and (get_lambda_handler()[0] != handler_module):
+        return False
+    return bool(os.environ.get('AWS_LAMBDA_FUNCTION_NAME')) and not utils.running_unit_tests()
+
+
+def prime_secrets():
+    secrets_cache.warm_up(SECRETS_WARM_UP_NAMES)
+
+
+def prime_acuity_session():
+    """
+    Opens a pooled connection to Acuity by calling its cheapest endpoint
+    """
+    session = get_acuity_session()
+    session.get('https://acuityscheduling.com/api/v1/me')
+
+
+def prime_calendars_cache():
+    calendars_cache.get_items()
+
+
+def prime_appointment_types_cache():
+    appointment_types_cache.prime(get_ddb_client().scan(APPOINTMENT_TYPES_TABLE))
+
+
+def warm_up(phases, logger=None):
+    """
+    Runs each phase and logs how long it took. Errors are logged but not raised, as anything that fails here
+    will be retried (and fail properly) while handling requests
+
+    Args:
+        phases (list): (phase_name, function) tuples, run in order
+        logger:
+
+    Returns:
+        Dictionary of phase durations in milliseconds, including a 'total'
+    """
+    if logger is None:
+        logger = utils.get_logger()
+    timings = dict()
+    errors = dict()
+    start = time.perf_counter()
+    for phase_name, phase in phases:
+        phase_start = time.perf_counter()
+        try:
+            phase()
+        except Exception as err:
+            errors[phase_name] = repr(err)
+        timings[phase_name] = round(1000 * (time.perf_counter() - phase_start), 1)
+    timings['total'] = round(1000 * (time.perf_counter() - start), 1)
+    logger.info('Init phase warm-up', extra={
+        'timings_ms': timings,
+        'errors': errors,
+    })
+    metrics.put_metric('InitWarmUpMs', timings['total'], 'Milliseconds')  # flushed with the first invocation
+    return timings
@@ -0,0 +1,87 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import re
+
+import thiscovery_lib.utilities as utils
+from common.config_version_utilities import get_config_version_store
+from common.constants import APPOINTMENT_TYPES_TABLE, CALENDARS_TABLE
+from common.invocation_utilities import invocation_hooks
+from common.metrics_utilities import metrics
+
+
+CONFIG_TABLES = [APPOINTMENT_TYPES_TABLE, CALENDARS_TABLE]
+STREAM_ARN_PATTERN = re.compile(r"table/(?P<table_name>[^/]+)/stream/")
+
+
+def get_changed_config_tables(event):
+    """
+    Args:
+        event: DynamoDB stream event
+
+    Returns:
+        Sorted list of the config tables (see CONFIG_TABLES) that records in event belong to
+    """
+    changed_tables = set()
+    for record in event.get('Records', list()):
+        m = STREAM_ARN_PATTERN.search(record.get('eventSourceARN', ''))
+        if m is None:
+            continue
+        table_name = m.group('table_name').split('-')[-1]  # physical table names are prefixed with the stack name
+        if table_name in CONFIG_TABLES:
+            changed_tables.add(table_name)
+    return sorted(changed_tables)
+
+
+class ConfigStreamConsumer:
+
+    def __init__(self, logger=None, correlation_id=None, version_store=None):
+        self.logger = logger
+        if logger is None:
+            self.logger = utils.get_logger()
+        self.correlation_id = correlation_id
+        self.version_store = version_store
+        if version_store is None:
+            self.version_store = get_config_version_store()
+
+    def process_event(self, event):
+        """
+        Bumps the config version of each table with changes in event, once per batch
+
+        Returns:
+            Dictionary of new versions, keyed by table name
+        """
+        versions = dict()
+        for table_name in get_changed_config_tables(event):
+            versions[table_name] = self.version_store.bump_version(table_name)
+        self.logger.info('Config versions updated', extra={
+            'versions': versions,
+            'records': len(event.get('Records', list())),
+            'correlation_id': self.correlation_id,
+        })
+        metrics.put_metric('ItemsProcessed', len(event.get('Records', list())))
+        return versions
+
+
+@utils.lambda_wrapper
+@invocation_hooks
+def config_stream_handler(event, context):
+    consumer = ConfigStreamConsumer(
+        logger=event['logger'],
+        correlation_id=event['correlation_id'],
+    )
+    return consumer.process_event(event)
@@ -16,142 +16,441 @@
 #   docs folder of this project.  It is also available www.gnu.org/licenses/
 #
 import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
 
 import thiscovery_lib.utilities as utils
 from common.acuity_utilities import AcuityClient
-from thiscovery_lib.dynamodb_utilities import Dynamodb
+from common.block_rules_utilities import get_calendar_block_rules, plan_calendar_blocks
+from common.constants import AUTOMATED_BLOCK_NOTES, BLOCK_CALENDARS_MODE, BLOCK_PLANNING_HORIZON_DAYS, BLOCK_SCHEDULES, \
+    CALENDAR_BLOCKER_MAX_WORKERS, CALENDAR_BLOCKS_STATUS_INDEX, CALENDAR_BLOCKS_TABLE, CALENDARS_BLOCK_SCHEDULE_INDEX, \
+    CALENDARS_TABLE, MONDAY_MORNING_BLOCK_SCHEDULE, RULES_BLOCK_SCHEDULE
+from common.ddb_utilities import batch_write_items, build_ddb_item, get_ddb_client
+from common.invocation_utilities import invocation_hooks
+from common.metrics_utilities import metrics
+from common.secrets_utilities import get_secret
 from common.sns_utilities import SnsClient
+from common.warmup_utilities import prime_acuity_session, prime_secrets, should_warm_up, warm_up
 
 
 STACK_NAME = 'thiscovery-interviews'
 
 
 class CalendarBlocker:
-    def __init__(self, logger, correlation_id):
+    def __init__(self, logger, correlation_id, max_workers=CALENDAR_BLOCKER_MAX_WORKERS):
+        """
+        Args:
+            logger:
+            correlation_id:
+            max_workers (int): maximum number of concurrent Acuity calls; 1 processes calendars one at a time
+        """
         self.logger = logger
         self.correlation_id = correlation_id
-        self.calendars_table = 'Calendars'
-        self.blocks_table = 'CalendarBlocks'
-        self.ddb_client = Dynamodb(stack_name=STACK_NAME)
+        self.max_workers = max_workers
+        self.calendars_table = CALENDARS_TABLE
+        self.blocks_table = CALENDAR_BLOCKS_TABLE
+        self.ddb_client = get_ddb_client()
         self.acuity_client = AcuityClient()
         self.sns_client = SnsClient()
 
     def notify_sns_topic(self, message, subject):
-        topic_arn = utils.get_secret('sns-topics')['interview-notifications-arn']
+        topic_arn = get_secret('sns-topics')['interview-notifications-arn']
         self.sns_client.publish(
             message=message,
             topic_arn=topic_arn,
             Subject=subject,
         )
 
+    def get_target_calendars(self):
+        """
+        Returns:
+            Calendars items with block rules (see common.block_rules_utilities)
+        """
+        calendars = list()
+        for block_schedule in BLOCK_SCHEDULES:
+            calendars += self.ddb_client.query(
+                table_name=self.calendars_table,
+                IndexName=CALENDARS_BLOCK_SCHEDULE_INDEX,
+                KeyConditionExpression='block_schedule = :block_schedule',
+                ExpressionAttributeValues={
+                    ':block_schedule': block_schedule,
+                }
+            )
+        return [x for x in calendars if get_calendar_block_rules(x)]
+
     def get_target_calendar_ids(self):
-        calendars = self.ddb_client.scan(
-            self.calendars_table,
-            'block_monday_morning',
-            [True],
-        )
-        return [(x['id'], x['label']) for x in calendars]
+        return [(x['id'], x['label']) for x in self.get_target_calendars()]
 
-    def block_upcoming_weekend(self, calendar_id):
-        next_monday_date = next_weekday(0)
-        block_end = datetime.datetime.combine(
-            next_monday_date,
-            datetime.time(hour=12, minute=0)
-        )
-        saturday_before_next_monday = next_monday_date - datetime.timedelta(days=2)
-        block_start = datetime.datetime.combine(
-            saturday_before_next_monday,
-            datetime.time(hour=0, minute=0)
+    @staticmethod
+    def get_planning_horizon(now=None):
+        """
+        Returns:
+            Tuple (start, end) of timezone-aware datetimes delimiting the BLOCK_PLANNING_HORIZON_DAYS from now
+        """
+        if now is None:
+            now = utils.now_with_tz()
+        return now, now + datetime.timedelta(days=BLOCK_PLANNING_HORIZON_DAYS)
+
+    def get_desired_blocks(self, horizon_start, horizon_end):
+        """
+        Returns:
+            Blocks planned from the rules of target calendars (see plan_calendar_blocks)
+        """
+        return plan_calendar_blocks(self.get_target_calendars(), horizon_start, horizon_end)
+
+    @staticmethod
+    def build_block_item(block_dict, calendar_name):
+        """
+        Returns:
+            CalendarBlocks item recording Acuity block block_dict
+        """
+        return build_ddb_item(
+            key=block_dict['id'],
+            item_type='calendar-block',
+            item_details=block_dict,
+            item={
+                'status': 'new',
+                'error_message': None,
+                'calendar_name': calendar_name,
+            },
         )
-        return self.acuity_client.post_block(calendar_id, block_start, block_end)
 
     def create_blocks(self):
-        calendars = self.get_target_calendar_ids()
-        self.logger.debug('Calendars to block', extra={'calendars': calendars})
-        created_blocks_ids = list()
-        affected_calendar_names = list()
-        for i, name in calendars:
+        """
+        Creates the blocks planned for target calendars in the planning horizon, making up to max_workers Acuity
+        calls at a time. Planned blocks covered by a block recorded in CalendarBlocks (e.g. a block in progress) are
+        skipped. Creation stops at the first failure: blocks not yet started are skipped and the error is
+        raised once the calls in progress have finished. The CalendarBlocks rows of all blocks created (including
+        those created before a failure, so that clear_blocks can delete them) are written in a single batch at the end
+        """
+        recorded_blocks = [x['details'] for x in self.get_new_block_items() if block_item_has_times(x)]
+        desired_blocks = [
+            b for b in self.get_desired_blocks(*self.get_planning_horizon())
+            if find_covering_block(b, recorded_blocks) is None
+        ]
+        self.logger.debug('Blocks to create', extra={'blocks': desired_blocks})
+        stop = threading.Event()  # set by the first failure, so that blocks not yet started are skipped
+
+        def create_block(block):
+            if stop.is_set():
+                return None
             try:
-                block_dict = self.block_upcoming_weekend(i)
-                created_blocks_ids.append(block_dict['id'])
-                affected_calendar_names.append(name)
-                response = self.ddb_client.put_item(
-                    self.blocks_table,
-                    block_dict['id'],
-                    item_type='calendar-block',
-                    item_details=block_dict,
-                    item={
-                        'status': 'new',
-                        'error_message': None,
-                    },
-                    correlation_id=self.correlation_id
-                )
-                assert response['ResponseMetadata']['HTTPStatusCode'] == HTTPStatus.OK, \
-                    f'Call to Dynamodb client put_item method failed with response: {response}. '
-            except Exception as err:
-                self.logger.error(
-                    f'{repr(err)} {len(created_blocks_ids)} blocks were created before this error occurred. '
-                    f'Created blocks ids: {created_blocks_ids}'
-                )
+                return self.acuity_client.post_block(block['calendar_id'], block['start'], block['end'])
+            except Exception:
+                stop.set()
                 raise
 
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [(executor.submit(create_block, b), b['calendar_name']) for b in desired_blocks]
+        created_blocks = list()  # (block_dict, calendar name) tuples, in desired_blocks order
+        error = None
+        for f, name in futures:
+            if f.exception() is not None:
+                error = error or f.exception()
+            elif f.result() is not None:
+                created_blocks.append((f.result(), name))
+
+        created_blocks_ids = [b['id'] for b, _ in created_blocks]
+        affected_calendar_names = [name for _, name in created_blocks]
+        try:
+            batch_write_items(
+                self.ddb_client,
+                self.blocks_table,
+                put_items=[self.build_block_item(b, name) for b, name in created_blocks],
+            )
+        except Exception as err:
+            error = error or err
+        if error is not None:
+            self.logger.error(
+                f'{repr(error)} {len(created_blocks_ids)} blocks were created before this error occurred. '
+                f'Created blocks ids: {created_blocks_ids}'
+            )
+            raise error
+
         return created_blocks_ids, affected_calendar_names
 
-    def mark_failed_block_deletion(self, item_key, exception):
-        error_message = f'This error happened when trying to delete Acuity calendar block {item_key}: {repr(exception)}'
+    def mark_failed_block_deletion(self, block_item, exception):
+        """
+        Returns:
+            Copy of CalendarBlocks item block_item with status 'error', to be written by delete_blocks
+        """
+        error_message = f'This error happened when trying to delete Acuity calendar block {block_item["id"]}: {repr(exception)}'
         self.logger.error(error_message)
-        self.ddb_client.update_item(
-            self.blocks_table,
-            item_key,
-            name_value_pairs={
-                'status': 'error',
-                'error_message': error_message
+        return {
+            **block_item,
+            'status': 'error',
+            'error_message': error_message,
+            'modified': str(utils.now_with_tz()),
+        }
+
+    def get_block_calendar_name(self, block_item):
+        """
+        Returns:
+            Name of the calendar of CalendarBlocks item block_item. Rows created before calendar_name was stored
+            fall back to fetching calendars from Acuity (once per CalendarBlocker)
+        """
+        calendar_name = block_item.get('calendar_name')
+        if calendar_name is None:
+            calendar_id = block_item['details']['calendarID']
+            try:
+                calendar_name = self.acuity_client.get_calendar_by_id(calendar_id)['name']
+            except Exception as err:  # the block was already deleted, so its row must still be deleted
+                self.logger.error(f'Could not get name of calendar {calendar_id}: {repr(err)}')
+                calendar_name = str(calendar_id)
+        return calendar_name
+
+    def get_new_block_items(self):
+        """
+        Returns:
+            CalendarBlocks items with status 'new' (i.e. blocks to be deleted by clear_blocks)
+        """
+        return self.ddb_client.query(
+            table_name=self.blocks_table,
+            IndexName=CALENDAR_BLOCKS_STATUS_INDEX,
+            KeyConditionExpression='#status = :status',
+            ExpressionAttributeNames={
+                '#status': 'status',  # reserved word
+            },
+            ExpressionAttributeValues={
+                ':status': 'new',
             }
         )
 
+    def _delete_acuity_block(self, item_key):
+        delete_response = self.acuity_client.delete_block(item_key)
+        assert delete_response == HTTPStatus.NO_CONTENT, \
+            f'Call to Acuity client delete_block method failed with response: {delete_response}.'
+
     def delete_blocks(self):
-        blocks = self.ddb_client.scan(
-            self.blocks_table,
-            filter_attr_name='status',
-            filter_attr_values=['new'],
-        )
+        """
+        Deletes Acuity blocks recorded in CalendarBlocks with status 'new' that have ended (blocks in progress or
+        planned further ahead are left for a later run), making up to max_workers Acuity calls at a time. ClearBlocks
+        runs on Mondays at 12:00 UTC, once the default Monday morning blocks (MONDAY_MORNING_BLOCK_RULES) have ended.
+        Failed deletions are marked with status 'error' and do not stop the others. CalendarBlocks rows are deleted
+        (or marked) in a single batch at the end
+        """
+        now = utils.now_with_tz()
+        blocks = [b for b in self.get_new_block_items() if block_item_has_ended(b, now)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [(executor.submit(self._delete_acuity_block, b.get('id')), b) for b in blocks]
         deleted_blocks_ids = list()
         affected_calendar_names = list()
-        for b in blocks:
-            item_key = b.get('id')
-            try:
-                delete_response = self.acuity_client.delete_block(item_key)
-                assert delete_response == HTTPStatus.NO_CONTENT, f'Call to Acuity client delete_block method failed with response: {delete_response}. ' \
-                    f'{len(deleted_blocks_ids)} blocks were deleted before this error occurred. Deleted blocks ids: {deleted_blocks_ids}'
-                deleted_blocks_ids.append(item_key)
-                affected_calendar_names.append(self.acuity_client.get_calendar_by_id(b['details']['calendarID'])['name'])
-                response = self.ddb_client.delete_item(
-                    self.blocks_table,
-                    item_key,
-                    correlation_id=self.correlation_id
-                )
-                assert response['ResponseMetadata']['HTTPStatusCode'] == HTTPStatus.OK, \
-                    f'Call to Dynamodb client delete_item method failed with response: {response}. ' \
-                    f'{len(deleted_blocks_ids)} blocks were deleted before this error occurred. Deleted blocks ids: {deleted_blocks_ids}'
-            except Exception as err:
-                self.mark_failed_block_deletion(item_key, err)
-                continue
-
+        failed_block_items = list()
+        for f, b in futures:
+            err = f.exception()
+            if err is None:
+                affected_calendar_names.append(self.get_block_calendar_name(b))
+                deleted_blocks_ids.append(b['id'])
+            else:
+                failed_block_items.append(self.mark_failed_block_deletion(b, err))
+        batch_write_items(
+            self.ddb_client,
+            self.blocks_table,
+            put_items=failed_block_items,
+            delete_keys=deleted_blocks_ids,
+        )
         return deleted_blocks_ids, affected_calendar_names
 
+    def reconcile_blocks(self):
+        """
+        Idempotent alternative to create_blocks. Lists existing blocks in the planning horizon (and blocks in progress
+        recorded in CalendarBlocks), then creates only the planned blocks that are missing and deletes automated blocks (see AUTOMATED_BLOCK_NOTES) in the planning
+        horizon that are not planned or are duplicates, making up to max_workers Acuity calls at a time. CalendarBlocks rows are written
+        in a single batch at the end, including rows missing for blocks that already existed (e.g. after a partial
+        failure). Failed calls do not stop the others; the first error is raised after rows have been written, so
+        that a retry completes the sync
+
+        Returns:
+            Dictionary of created, deleted and unchanged blocks (plus errors), each a list of dicts with the block id,
+            calendar_id, calendar_name, start and end
+        """
+        horizon_start, horizon_end = self.get_planning_horizon()
+        desired_blocks = self.get_desired_blocks(horizon_start, horizon_end)
+        block_items = {x['id']: x for x in self.get_new_block_items()}
+        min_date = min([horizon_start.date()] + [  # so that blocks in progress cover planned blocks clipped to the horizon
+            parse_acuity_block_time(x['details']['start']).date() for x in block_items.values() if block_item_has_times(x)
+        ])
+        acuity_blocks = self.acuity_client.get_blocks_between(min_date, horizon_end.date())
+        to_create, to_delete, unchanged = plan_block_changes(desired_blocks, acuity_blocks, until=horizon_end)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            create_futures = [
+                (executor.submit(self.acuity_client.post_block, b['calendar_id'], b['start'], b['end']), b)
+                for b in to_create
+            ]
+            delete_futures = [(executor.submit(self._delete_acuity_block, b['id']), b) for b in to_delete]
+
+        diff = {'created': list(), 'deleted': list(), 'unchanged': list(), 'errors': list()}
+        put_items = list()
+        delete_keys = list()
+        first_error = None
+        for f, b in create_futures:
+            if f.exception() is None:
+                block_dict = f.result()
+                put_items.append(self.build_block_item(block_dict, b['calendar_name']))
+                diff['created'].append(_block_summary(block_dict['id'], b['calendar_id'], b['calendar_name'], b['start'], b['end']))
+            else:
+                first_error = first_error or f.exception()
+                diff['errors'].append({**_block_summary(None, b['calendar_id'], b['calendar_name'], b['start'], b['end']),
+                                       'error': repr(f.exception())})
+        for f, b in delete_futures:
+            block_item = block_items.get(str(b['id']), {'details': b})
+            summary = _block_summary(b['id'], b['calendarID'], self.get_block_calendar_name(block_item), b['start'], b['end'])
+            if f.exception() is None:
+                if str(b['id']) in block_items:
+                    delete_keys.append(str(b['id']))
+                diff['deleted'].append(summary)
+            else:
+                first_error = first_error or f.exception()
+                diff['errors'].append({**summary, 'error': repr(f.exception())})
+        for desired, b in unchanged:
+            if str(b['id']) not in block_items:  # a block may cover several planned blocks, but needs a single row
+                put_items.append(self.build_block_item(b, desired['calendar_name']))
+                block_items[str(b['id'])] = put_items[-1]
+            diff['unchanged'].append(
+                _block_summary(b['id'], desired['calendar_id'], desired['calendar_name'], desired['start'], desired['end'])
+            )
+        batch_write_items(self.ddb_client, self.blocks_table, put_items=put_items, delete_keys=delete_keys)
+        self.logger.info('Calendar blocks reconciled', extra={
+            'diff': diff,
+            'correlation_id': self.correlation_id,
+        })
+        if first_error is not None:
+            raise first_error
+        return diff
+
+
+def _block_summary(block_id, calendar_id, calendar_name, start, end):
+    return {
+        'id': block_id,
+        'calendar_id': str(calendar_id),
+        'calendar_name': calendar_name,
+        'start': str(start),
+        'end': str(end),
+    }
 
-def next_weekday(weekday, d=datetime.date.today()):
+
+def block_item_has_ended(block_item, now):
+    """
+    Returns:
+        True if the Acuity block of CalendarBlocks item block_item ended before now (timezone-aware), or if its
+        end is unknown
+    """
+    end = (block_item.get('details') or dict()).get('end')
+    return (end is None) or (parse_acuity_block_time(end) <= now)
+
+
+def block_item_has_times(block_item):
+    details = block_item.get('details') or dict()
+    return bool(details.get('start') and details.get('end'))
+
+
+def parse_acuity_block_time(value):
+    """
+    Args:
+        value (str): start or end of a block as returned by AcuityClient.get_blocks (e.g. '2030-12-25T09:00:00+0000')
+
+    Returns:
+        Timezone-aware datetime, in calendar time
+    """
+    return datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%S%z')
+
+
+def find_covering_block(desired_block, acuity_blocks):
+    """
+    Args:
+        desired_block (dict): block planned by plan_calendar_blocks
+        acuity_blocks (list): blocks as returned by AcuityClient.get_blocks
+
+    Returns:
+        The first of acuity_blocks on the calendar of desired_block that starts no later and ends no earlier than it,
+        or None
+    """
+    for block in acuity_blocks:
+        if str(block['calendarID']) != str(desired_block['calendar_id']):
+            continue
+        start = parse_acuity_block_time(block['start']).replace(tzinfo=None)
+        end = parse_acuity_block_time(block['end']).replace(tzinfo=None)
+        if (start <= desired_block['start']) and (end >= desired_block['end']):
+            return block
+    return None
+
+
+def plan_block_changes(desired_blocks, acuity_blocks, now=None, until=None):
+    """
+    Compares the blocks that should exist with those that do. Only automated blocks (see AUTOMATED_BLOCK_NOTES) are
+    considered, so blocks created manually in Acuity are never deleted. Desired blocks without an exact match are
+    also satisfied by an automated block covering them, such as a block in progress covering a desired block
+    clipped to the start of the planning horizon
+
+    Args:
+        desired_blocks (list): dicts with calendar_id, calendar_name, start and end (naive datetimes, in calendar time)
+        acuity_blocks (list): blocks as returned by AcuityClient.get_blocks
+        now (datetime.datetime): timezone-aware; automated blocks that started before now are left alone (blocks in
+            progress are deleted by clear_blocks)
+        until (datetime.datetime): timezone-aware; if given, automated blocks starting at or after until (i.e. beyond
+            the planning horizon) are left alone
+
+    Returns:
+        Tuple (to_create, to_delete, unchanged). to_create are the desired blocks without a matching Acuity block,
+        to_delete are automated Acuity blocks that are not desired or duplicate a matching block, and unchanged are
+        (desired block, matching Acuity block) tuples
+    """
+    if now is None:
+        now = utils.now_with_tz()
+    desired = {(str(b['calendar_id']), b['start'], b['end']): b for b in desired_blocks}
+    automated_blocks = [x for x in acuity_blocks if x.get('notes') == AUTOMATED_BLOCK_NOTES]
+    matched = dict()
+    unmatched_blocks = list()
+    for block in automated_blocks:
+        start = parse_acuity_block_time(block['start'])
+        end = parse_acuity_block_time(block['end'])
+        key = (str(block['calendarID']), start.replace(tzinfo=None), end.replace(tzinfo=None))
+        if (key in desired) and (key not in matched):
+            matched[key] = block
+        else:
+            unmatched_blocks.append((block, start))
+    for key, desired_block in desired.items():
+        if key not in matched:
+            covering_block = find_covering_block(desired_block, automated_blocks)
+            if covering_block is not None:
+                matched[key] = covering_block
+    matched_ids = {x['id'] for x in matched.values()}
+    to_delete = [
+        block for block, start in unmatched_blocks
+        if (block['id'] not in matched_ids) and (start > now) and ((until is None) or (start < until))
+    ]
+    to_create = [b for k, b in desired.items() if k not in matched]
+    unchanged = [(b, matched[k]) for k, b in desired.items() if k in matched]
+    return to_create, to_delete, unchanged
+
+
+def get_block_schedule(calendar_item):
+    """
+    Returns:
+        Value of the block_schedule attribute of Calendars item calendar_item (the hash key of the sparse
+        CALENDARS_BLOCK_SCHEDULE_INDEX), or None if the calendar is not blocked and the attribute must be absent
+    """
+    if calendar_item.get('block_rules'):
+        return RULES_BLOCK_SCHEDULE
+    if calendar_item.get('block_monday_morning') is True:
+        return MONDAY_MORNING_BLOCK_SCHEDULE
+    return None
+
+
+def next_weekday(weekday, d=None):
     """
     From https://stackoverflow.com/a/6558571
 
     Args:
         weekday (int): 0 = Monday, 1=Tuesday, 2=Wednesday...
-        d (datetime.date): Base date for next weekday calculation
+        d (datetime.date): Base date for next weekday calculation; defaults to today
 
     Returns:
 
     """
+    if d is None:  # evaluated on every call; a default argument would be fixed when warm containers imported this module
+        d = datetime.date.today()
     days_ahead = weekday - d.weekday()
     if days_ahead <= 0:  # Target day already happened this week
         days_ahead += 7
@@ -159,28 +458,43 @@ def next_weekday(weekday, d=datetime.date.today()):
 
 
 @utils.lambda_wrapper
+@invocation_hooks
 def block_calendars(event, context):
     logger = event['logger']
     correlation_id = event['correlation_id']
+    mode = event.get('mode', BLOCK_CALENDARS_MODE)  # scheduled events use BLOCK_CALENDARS_MODE
     calendar_blocker = CalendarBlocker(logger, correlation_id)
     try:
-        blocks_created_ids, affected_calendars = calendar_blocker.create_blocks()
-        logger.info(f'Blocked {len(blocks_created_ids)} calendars for next Monday morning',
+        stale_blocks_message = ''
+        if mode == 'reconcile':
+            diff = calendar_blocker.reconcile_blocks()
+            blocks_created_ids = [x['id'] for x in diff['created']]
+            affected_calendars = list(dict.fromkeys(x['calendar_name'] for x in diff['created'] + diff['unchanged']))
+            if diff['deleted']:
+                stale_blocks_message = f" {len(diff['deleted'])} stale automated blocks were deleted."
+        else:
+            blocks_created_ids, affected_calendars = calendar_blocker.create_blocks()
+            affected_calendars = list(dict.fromkeys(affected_calendars))
+        logger.info(f'Created {len(blocks_created_ids)} calendar blocks',
                     extra={'blocks_created_ids': blocks_created_ids, 'affected_calendars': affected_calendars})
+        metrics.put_metric('ItemsProcessed', len(blocks_created_ids))
         calendar_blocker.notify_sns_topic(
-            message=f"Monday morning (00:00 to 12:00) was just blocked on the following Acuity calendars: {', '.join(affected_calendars)}.",
-            subject=f"[thiscovery-interviews notification] SUCCESS: Monday morning blocked in {len(affected_calendars)} Acuity calendars"
+            message=f"Upcoming blocks (as defined by the block rules in the Calendars table) are in place on the "
+                    f"following Acuity calendars: {', '.join(affected_calendars)}."
+                    f"{stale_blocks_message}",
+            subject=f"[thiscovery-interviews notification] SUCCESS: Upcoming blocks in place in {len(affected_calendars)} Acuity calendars"
         )
     except Exception as err:
         calendar_blocker.notify_sns_topic(
-            message=f"Failed to block Monday morning (00:00 to 12:00) in Acuity calendars. Error message:\n "
+            message=f"Failed to create upcoming blocks in Acuity calendars. Error message:\n "
                     f"{repr(err)}\n\n"
                     f"Please refer to CloudWatch logs for more details.",
-            subject=f"[thiscovery-interviews notification] ERROR: Failed to create Monday morning blocks in calendars"
+            subject=f"[thiscovery-interviews notification] ERROR: Failed to create upcoming blocks in calendars"
         )
 
 
 @utils.lambda_wrapper
+@invocation_hooks
 def clear_blocks(event, context):
     logger = event['logger']
     correlation_id = event['correlation_id']
@@ -189,14 +503,22 @@ def clear_blocks(event, context):
         blocks_deleted, affected_calendars = calendar_blocker.delete_blocks()
         logger.info(f'Deleted {len(blocks_deleted)} calendar blocks from Acuity and Dynamodb',
                     extra={'blocks_deleted': blocks_deleted, 'affected_calendars': affected_calendars})
+        metrics.put_metric('ItemsProcessed', len(blocks_deleted))
         calendar_blocker.notify_sns_topic(
-            message=f"Deleted Monday morning (00:00 to 12:00) blocks on the following Acuity calendars: {', '.join(affected_calendars)}.",
-            subject=f"[thiscovery-interviews notification] SUCCESS: Monday morning block removed from calendars"
+            message=f"Deleted blocks on the following Acuity calendars: {', '.join(dict.fromkeys(affected_calendars))}.",
+            subject=f"[thiscovery-interviews notification] SUCCESS: Blocks removed from calendars"
         )
     except Exception as err:
         calendar_blocker.notify_sns_topic(
-            message=f"Failed to remove Monday morning (00:00 to 12:00) block in Acuity calendars. Error message:\n "
+            message=f"Failed to remove blocks in Acuity calendars. Error message:\n "
                     f"{repr(err)}\n\n"
                     f"Please refer to CloudWatch logs for more details.",
-            subject=f"[thiscovery-interviews notification] ERROR: Failed to delete Monday morning blocks in calendars"
+            subject=f"[thiscovery-interviews notification] ERROR: Failed to delete blocks in calendars"
         )
+
+
+if should_warm_up(__name__):
+    warm_up([
+        ('secrets', prime_secrets),
+        ('acuity_session', prime_acuity_session),
+    ])
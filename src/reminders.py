@@ -17,82 +17,317 @@
 #
 import datetime
 import traceback
+from http import HTTPStatus
 
 import thiscovery_lib.utilities as utils
 from appointments import AcuityAppointment, AppointmentNotifier
-from common.constants import APPOINTMENTS_TABLE, STACK_NAME
-from thiscovery_lib.dynamodb_utilities import Dynamodb
+from common.acuity_utilities import AcuityClient
+from common.cache_utilities import appointment_types_cache, core_api_cache
+from common.constants import APPOINTMENT_TYPES_TABLE, APPOINTMENTS_REMINDER_STAGES_INDEX, APPOINTMENTS_TABLE, \
+    REMINDER_MIN_GAP_HOURS, REMINDERS_ACUITY_PREFETCH, REMINDERS_MODE
+from common.ddb_utilities import get_ddb_client
+from common.invocation_utilities import invocation_hooks
+from common.logging_utilities import add_lazy_extra_filter
+from common.metrics_utilities import metrics
+from common.reminder_cadence_utilities import get_global_cadence, get_stage_lead_time, get_target_dates, \
+    plan_reminders, validate_cadence
+from common.reminder_schedule_utilities import ReminderSchedule
+from common.warmup_utilities import get_lambda_handler, prime_appointment_types_cache, prime_secrets, should_warm_up, \
+    warm_up
 
 
 class RemindersHandler:
     """
-    Send a reminder:
-        - One day before an appointment (appointment_datetime)
-        - Unless an email (notification or reminder) was already sent today (latest_email_datetime)
+    Send a reminder at each stage of the reminder cadence of an appointment's type (see common.reminder_cadence_utilities):
+        - On the date N days before, or within N hours of, an appointment (appointment_datetime)
+        - Unless an email (notification or reminder) was already sent today (latest_participant_notification)
+        - Unless that stage, or one closer to the appointment, was already sent (reminder_stage)
+    Appointments are read from reminder-stages-index with one query per target date of the stages in use, run one at a
+    time (see get_appointments_to_be_reminded). If acuity_prefetch is set, the Acuity state of appointments is listed
+    in bulk per date (see get_acuity_snapshot), rather than fetched appointment by appointment when reminders are sent
     """
 
-    def __init__(self, logger=None, correlation_id=None):
-        self.ddb_client = Dynamodb(stack_name=STACK_NAME)
+    def __init__(self, logger=None, correlation_id=None, acuity_prefetch=REMINDERS_ACUITY_PREFETCH):
+        self.ddb_client = get_ddb_client()
         self.correlation_id = correlation_id
-        self.target_appointment_ids = self.get_appointments_to_be_reminded()
         self.logger = logger
         if logger is None:
             self.logger = utils.get_logger()
+        add_lazy_extra_filter(self.logger)
+        self.due_stages = dict()  # stage of the reminder due, keyed by appointment id
+        self.appointment_dates = dict()  # appointment_date of appointments with a reminder due, keyed by appointment id
+        self.acuity_prefetch = acuity_prefetch
+        self._acuity_snapshot = None
+        self.target_appointment_ids = self.get_appointments_to_be_reminded()
+
+    def get_reminder_cadences(self):
+        """
+        Returns:
+            Dictionary of validated reminder cadences of appointment types that override the global cadence, keyed
+            by type id. Invalid overrides are logged and ignored
+        """
+        items = self.ddb_client.scan(APPOINTMENT_TYPES_TABLE)
+        appointment_types_cache.prime(items)
+        cadences = dict()
+        for item in items:
+            if not item.get('reminder_cadence'):
+                continue
+            try:
+                cadences[str(item['id'])] = validate_cadence(item['reminder_cadence'])
+            except utils.DetailedValueError as err:
+                self.logger.error('Invalid reminder cadence; global cadence used instead', extra={
+                    'appointment_type_id': item['id'],
+                    'reminder_cadence': item['reminder_cadence'],
+                    'exception': repr(err),
+                    'correlation_id': self.correlation_id,
+                })
+        return cadences
+
+    def _query_target_date(self, date_string):
+        return self.ddb_client.query(
+            table_name=APPOINTMENTS_TABLE,
+            IndexName=APPOINTMENTS_REMINDER_STAGES_INDEX,
+            KeyConditionExpression='appointment_date = :date',
+            ExpressionAttributeValues={':date': date_string},
+        )
 
     def get_appointments_to_be_reminded(self, now=None):
         if now is None:
             now = utils.now_with_tz()
-        date_format = '%Y-%m-%d'
-        tomorrow = now + datetime.timedelta(days=1)
-        today_string = now.strftime(date_format)
-        tomorrow_string = tomorrow.strftime(date_format)
-        result = self.ddb_client.query(
-            table_name=APPOINTMENTS_TABLE,
-            IndexName="reminders-index",
-            KeyConditionExpression='appointment_date = :date '
-                                   'AND latest_participant_notification '
-                                   'BETWEEN :t1 AND :t2',
-            ExpressionAttributeValues={
-                ':date': tomorrow_string,
-                ':t1': '2020-00-00',  # excludes 0000-00-00 appointments only because those will not have received the initial booking notification yet
-                ':t2': today_string,
-            }
+        global_cadence = get_global_cadence()
+        cadences = self.get_reminder_cadences()
+        target_dates = get_target_dates(set(global_cadence).union(*cadences.values()), now)
+        # one query at a time: the shared ddb_client (a boto3 resource) is not thread-safe, and creating a boto3 session
+        # and client per thread costs more than the few queries (one per target date) it would run concurrently
+        items = [x for date_string in target_dates for x in self._query_target_date(date_string)]
+        self.due_stages = plan_reminders(items, lambda type_id: cadences.get(str(type_id), global_cadence), now)
+        self.appointment_dates = {x['id']: x['appointment_date'] for x in items if x['id'] in self.due_stages}
+        self._acuity_snapshot = None
+        return list(self.due_stages)
+
+    def get_acuity_snapshot(self):
+        """
+        Lists the Acuity appointments (including cancelled ones) of every date with a reminder due, with one
+        (paginated) get_appointments call per date
+
+        Returns:
+            Dictionary of Acuity appointment payloads, keyed by appointment id
+        """
+        if self._acuity_snapshot is None:
+            acuity_client = AcuityClient(correlation_id=self.correlation_id)
+            snapshot = dict()
+            for date_string in sorted(set(self.appointment_dates.values())):
+                for x in acuity_client.get_appointments(min_date=date_string, max_date=date_string, canceled=None):
+                    snapshot[str(x['id'])] = x
+            self._acuity_snapshot = snapshot
+        return self._acuity_snapshot
+
+    def apply_acuity_snapshot(self, appointment):
+        """
+        Replaces the stored acuity_info of appointment with its state in the Acuity snapshot
+
+        Returns:
+            True if the snapshot contains appointment. Appointments it does not contain (e.g. rescheduled to another
+            date without a webhook being processed) must be fetched individually when the reminder is sent (see
+            send_reminder's force_refresh), as their stored state cannot be trusted
+        """
+        acuity_info = self.get_acuity_snapshot().get(appointment.appointment_id)
+        if acuity_info is None:
+            return False
+        stored_datetime = (appointment.acuity_info or dict()).get('datetime')
+        if stored_datetime != acuity_info['datetime']:
+            metrics.put_metric('AcuityStateDrift', 1)
+            self.logger.warning('Stored Acuity state of appointment is out of date', extra={
+                'appointment_id': appointment.appointment_id,
+                'stored_datetime': stored_datetime,
+                'latest_datetime': acuity_info['datetime'],
+                'correlation_id': self.correlation_id,
+            })
+        appointment.acuity_info = acuity_info
+        appointment.acuity_synced = str(utils.now_with_tz())
+        return True
+
+    def load_appointment(self, app_id):
+        appointment = AcuityAppointment(
+            appointment_id=app_id,
+            logger=self.logger,
+            correlation_id=self.correlation_id
+        )
+        appointment.ddb_load()
+        return appointment
+
+    def send_reminder(self, appointment, stage=None, acuity_info_fresh=False, force_refresh=False):
+        """
+        Args:
+            appointment (AcuityAppointment):
+            stage (str): reminder stage, recorded in the Appointments item once the reminder is sent
+            acuity_info_fresh (bool): appointment.acuity_info was just fetched from Acuity, so cancellation is not
+                checked again
+            force_refresh (bool): appointment.acuity_info is fetched from Acuity before the reminder is sent, even if
+                the stored state is fresh (see AppointmentNotifier._check_appointment_cancelled)
+
+        Returns:
+            Status code of the reminder email, 'aborted' if the appointment was cancelled or is in the past, or None
+            if sending failed with an exception
+        """
+        notifier = AppointmentNotifier(
+            appointment=appointment,
+            logger=self.logger,
+            correlation_id=self.correlation_id
         )
-        return [x['id'] for x in result]
+        notifier.acuity_info_fresh = acuity_info_fresh
+        notifier.force_refresh = force_refresh
+        try:
+            result = notifier.send_reminder().get('statusCode')
+        except:
+            self.logger.error('AppointmentNotifier.send_reminder raised an exception', extra={
+                'appointment': appointment.lazy_as_dict(),
+                'correlation_id': self.correlation_id,
+                'traceback': traceback.format_exc(),
+            })
+            return None
+        if (result == HTTPStatus.NO_CONTENT) and (stage is not None):
+            try:
+                appointment.update_reminder_stage(stage)
+            except Exception as err:
+                self.logger.warning('Failed to store reminder stage', extra={
+                    'appointment_id': appointment.appointment_id,
+                    'stage': stage,
+                    'exception': repr(err),
+                    'correlation_id': self.correlation_id,
+                })
+        return result
+
+    def log_results(self, results):
+        self.logger.info('Core API cache stats', extra={
+            'core_api_cache': core_api_cache.stats(),
+            'correlation_id': self.correlation_id,
+        })
+        metrics.put_metric('ItemsProcessed', len(results))
+        metrics.put_metric('RemindersFailed', len([x for x in results if reminder_failed(x[0])]))
 
     def send_reminders(self):
         results = list()
         for app_id in self.target_appointment_ids:
-            appointment = AcuityAppointment(
-                appointment_id=app_id,
-                logger=self.logger,
-                correlation_id=self.correlation_id
-            )
-            appointment.ddb_load()
-            notifier = AppointmentNotifier(
-                appointment=appointment,
-                logger=self.logger,
-                correlation_id=self.correlation_id
+            appointment = self.load_appointment(app_id)
+            acuity_info_fresh = force_refresh = False
+            if self.acuity_prefetch:
+                acuity_info_fresh = self.apply_acuity_snapshot(appointment)
+                force_refresh = not acuity_info_fresh  # missing from its date's listing, e.g. after a missed reschedule
+            results.append(
+                (self.send_reminder(appointment, self.due_stages.get(app_id), acuity_info_fresh, force_refresh), app_id)
             )
+        self.log_results(results)
+        return results
+
+
+class ScheduledRemindersHandler(RemindersHandler):
+    """
+    Sends the reminders queued in the ScheduledReminders table (see common.reminder_schedule_utilities) that are due,
+    instead of querying reminder-stages-index. Processed reminders are removed from the table; failed ones are kept and
+    retried by later runs until they fall out of the catch-up window
+    """
+
+    def __init__(self, logger=None, correlation_id=None, now=None, reminder_schedule=None):
+        self.now = now
+        if now is None:
+            self.now = utils.now_with_tz()
+        self.reminder_schedule = reminder_schedule
+        if reminder_schedule is None:
+            self.reminder_schedule = ReminderSchedule()
+        self.due_reminders = self.reminder_schedule.get_due_reminders(now=self.now)
+        # due reminders are spread over many dates, so their Acuity state is not prefetched
+        super().__init__(logger=logger, correlation_id=correlation_id, acuity_prefetch=False)
+
+    def get_appointments_to_be_reminded(self, now=None):
+        return [x['appointment_id'] for x in self.due_reminders]
+
+    def get_skip_reason(self, reminder, appointment):
+        """
+        Returns:
+            Reason why reminder should be discarded without being sent, or None if it should be sent
+        """
+        if (appointment.acuity_info or dict()).get('datetime') != reminder['appointment_datetime']:
+            return 'appointment rescheduled'  # the new appointment time has its own ScheduledReminders item
+        if (appointment.acuity_info or dict()).get('canceled') is True:
+            return 'appointment cancelled'
+        if appointment.reminder_stage and \
+                (get_stage_lead_time(appointment.reminder_stage) <= get_stage_lead_time(reminder['stage'])):
+            return 'stage already sent'
+        min_notification_time = self.now - datetime.timedelta(hours=REMINDER_MIN_GAP_HOURS)
+        if appointment.latest_participant_notification > str(min_notification_time.astimezone(datetime.timezone.utc)):
+            return 'participant recently notified'
+        return None
+
+    def send_reminders(self):
+        results = list()
+        processed = list()
+        for reminder in self.due_reminders:
+            app_id = reminder['appointment_id']
             try:
-                reminder_result = notifier.send_reminder().get('statusCode')
-            except:
-                self.logger.error('AppointmentNotifier.send_reminder raised an exception', extra={
-                    'appointment': appointment.as_dict(),
+                appointment = self.load_appointment(app_id)
+            except utils.ObjectDoesNotExistError:
+                appointment = None
+            skip_reason = 'appointment not found' if appointment is None else self.get_skip_reason(reminder, appointment)
+            if skip_reason is not None:
+                self.logger.info('Scheduled reminder discarded', extra={
+                    'reminder': reminder,
+                    'reason': skip_reason,
                     'correlation_id': self.correlation_id,
-                    'traceback': traceback.format_exc(),
                 })
-                reminder_result = None
+                processed.append(reminder)
+                continue
+            reminder_result = self.send_reminder(appointment, reminder['stage'])
             results.append(
                 (reminder_result, app_id)
             )
+            if not reminder_failed(reminder_result):
+                processed.append(reminder)
+        self.reminder_schedule.remove(processed)
+        self.log_results(results)
         return results
 
 
+def reminder_failed(reminder_result):
+    return reminder_result not in [HTTPStatus.NO_CONTENT, 'aborted']
+
+
 @utils.lambda_wrapper
+@invocation_hooks
 def interview_reminder_handler(event, context):
+    if REMINDERS_MODE != 'polling':
+        return list()
     handler = RemindersHandler(
         logger=event['logger'],
         correlation_id=event['correlation_id'],
     )
     return handler.send_reminders()
+
+
+@utils.lambda_wrapper
+@invocation_hooks
+def scheduled_reminders_handler(event, context):
+    if REMINDERS_MODE != 'scheduled':
+        return list()
+    handler = ScheduledRemindersHandler(
+        logger=event['logger'],
+        correlation_id=event['correlation_id'],
+    )
+    return handler.send_reminders()
+
+
+# warm-up phases of each handler function; the function not used in REMINDERS_MODE returns straight away, so it is
+# not warmed up, and Acuity connections are not primed because reminders usually trust the stored Acuity state
+WARM_UP_PHASES = {
+    'interview_reminder_handler': [
+        ('secrets', prime_secrets),
+        ('appointment_types_cache', prime_appointment_types_cache),
+    ] if REMINDERS_MODE == 'polling' else list(),
+    'scheduled_reminders_handler': [
+        ('secrets', prime_secrets),
+    ] if REMINDERS_MODE == 'scheduled' else list(),
+}
+
+
+if should_warm_up(__name__) and WARM_UP_PHASES.get(get_lambda_handler()[1]):
+    warm_up(WARM_UP_PHASES[get_lambda_handler()[1]])
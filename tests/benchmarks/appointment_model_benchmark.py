@@ -0,0 +1,131 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+"""
+Micro-benchmark of the appointment model used in bulk paths (reminders, backfills, appointments-by-type).
+Compares the slotted AcuityAppointment with an equivalent __dict__-based model (the previous implementation)
+for memory per instance, as_dict CPU time and the cost of a logger.debug call that is suppressed by the
+logger level.
+
+Usage (from the repository root):
+    python -m tests.benchmarks.appointment_model_benchmark
+"""
+import copy
+import logging
+import timeit
+import tracemalloc
+
+import src.appointments as app
+from tests.test_data import appointments as test_appointments
+
+
+N_APPOINTMENTS = 1000
+N_CALLS = 10000
+
+
+class DictAppointmentType:
+    def __init__(self):
+        self.type_id = None
+        self.name = None
+        self.category = None
+        self.has_link = None
+        self.send_notifications = None
+        self.templates = None
+        self.modified = None
+        self.project_task_id = None
+
+    def as_dict(self):
+        return {k: v for k, v in self.__dict__.items() if (k[0] != "_") and (k not in ['created', 'modified'])}
+
+    def from_dict(self, type_dict):
+        self.__dict__.update(type_dict)
+
+
+class DictAppointment:
+    def __init__(self, appointment_id):
+        self.appointment_id = str(appointment_id)
+        self.acuity_info = None
+        self.calendar_id = None
+        self.calendar_name = None
+        self.link = None
+        self.participant_email = None
+        self.participant_user_id = None
+        self.appointment_type = DictAppointmentType()
+        self.latest_participant_notification = '0000-00-00 00:00:00+00:00'
+        self.appointment_date = None
+        self.anon_project_specific_user_id = None
+        self.anon_user_task_id = None
+        self.appointment_type_id = None
+        self.version = None
+        self._logger = None
+        self._correlation_id = None
+        self._ddb_item = None
+        self._acuity_info_archive = None
+
+    def from_dict(self, appointment_dict):
+        self.__dict__.update(appointment_dict)
+
+    def as_dict(self):
+        d = {k: v for k, v in self.__dict__.items() if (k[0] != "_") and (k not in ['created', 'modified', 'appointment_type'])}
+        d['appointment_type'] = self.appointment_type.as_dict()
+        return d
+
+
+def load(appointment_class, item):
+    item = copy.copy(item)
+    type_item = item.pop('appointment_type')
+    appointment = appointment_class(item['appointment_id'])
+    appointment.from_dict(item)
+    appointment.appointment_type.from_dict(type_item)
+    return appointment
+
+
+def measure_memory(appointment_class, item):
+    tracemalloc.start()
+    snapshot_start = tracemalloc.take_snapshot()
+    appointments = [load(appointment_class, item) for _ in range(N_APPOINTMENTS)]
+    snapshot_end = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(x.size_diff for x in snapshot_end.compare_to(snapshot_start, 'filename'))
+    del appointments
+    return allocated / N_APPOINTMENTS
+
+
+def main():
+    item = {k: v for k, v in test_appointments['appointment1'].items()}
+    logger = logging.getLogger('appointment_model_benchmark')
+    logger.setLevel(logging.INFO)
+    app.add_lazy_extra_filter(logger)
+    slotted = load(app.AcuityAppointment, item)
+    legacy = load(DictAppointment, item)
+
+    results = [
+        ('bytes allocated per loaded appointment', measure_memory(DictAppointment, item), measure_memory(app.AcuityAppointment, item)),
+        ('as_dict (us per call)',
+         1e6 * timeit.timeit(legacy.as_dict, number=N_CALLS) / N_CALLS,
+         1e6 * timeit.timeit(slotted.as_dict, number=N_CALLS) / N_CALLS),
+        ('suppressed logger.debug with appointment extra (us per call)',
+         1e6 * timeit.timeit(lambda: logger.debug('Benchmark', extra={'appointment': legacy.as_dict()}), number=N_CALLS) / N_CALLS,
+         1e6 * timeit.timeit(lambda: logger.debug('Benchmark', extra={'appointment': slotted.lazy_as_dict()}), number=N_CALLS) / N_CALLS),
+    ]
+    print(f"{'':<60}{'__dict__ model':>16}{'slotted model':>16}")
+    for label, legacy_result, slotted_result in results:
+        print(f"{label:<60}{legacy_result:>16.2f}{slotted_result:>16.2f}")
+
+
+if __name__ == '__main__':
+    main()
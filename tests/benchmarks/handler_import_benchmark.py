@@ -0,0 +1,153 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+"""
+Cold-start import benchmark for the Lambda handlers declared in template.yaml.
+Each handler module is imported in a fresh interpreter with `python -X importtime`, from the src folder (the
+CodeUri of all functions), and the cumulative import time of the module is reported as the median of N_RUNS runs.
+IMPORT_BUDGETS_MS, DEFERRED_IMPORTS and DEFERRED_SRC_IMPORTS are enforced by tests/unit_tests/test_handler_imports.py.
+
+Usage (from the repository root):
+    python -m tests.benchmarks.handler_import_benchmark
+"""
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+
+BASE_FOLDER = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..')  # thiscovery-interviews/
+SRC_FOLDER = os.path.join(BASE_FOLDER, 'src')
+TEMPLATE_PATH = os.path.join(BASE_FOLDER, 'template.yaml')
+N_RUNS = 5
+
+# cumulative import time budgets (milliseconds) of handler modules: the medians measured with boto3 1.43 (about 225 ms of
+# each, since thiscovery_lib loads boto3) plus a 50% margin
+IMPORT_BUDGETS_MS = {
+    'app_by_type': 400,
+    'appointments': 450,
+    'clean': 400,
+    'config_streams': 400,
+    'main': 450,
+    'reminders': 450,
+}
+
+# modules that must not be loaded when a handler module is imported; they are imported where they are used
+API_CLIENT_MODULES = ['thiscovery_lib.core_api_utilities', 'thiscovery_lib.emails_api_utilities']
+DEFERRED_IMPORTS = {
+    'app_by_type': [*API_CLIENT_MODULES, 'appointments', 'common.acuity_utilities'],
+    'appointments': API_CLIENT_MODULES,
+    'clean': [*API_CLIENT_MODULES, 'appointments', 'common.acuity_utilities'],
+    'config_streams': [*API_CLIENT_MODULES, 'appointments', 'common.acuity_utilities'],
+    'main': [*API_CLIENT_MODULES, 'appointments'],
+    'reminders': API_CLIENT_MODULES,
+}
+
+# modules that code in src must only import where they are used. Dependencies may still load them (botocore loads
+# dateutil.parser), so the imports made by modules in src are checked rather than the modules loaded
+DEFERRED_SRC_IMPORTS = ['dateutil.parser', 'requests']
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(?P<self>\d+)\s+\|\s+(?P<cumulative>\d+)\s+\|\s*(?P<module>\S+)\s*$")
+
+
+def get_handler_modules(template_path=TEMPLATE_PATH):
+    """
+    Returns:
+        Sorted list of the modules containing the Handler of each function in template_path
+    """
+    with open(template_path) as f:
+        handlers = re.findall(r"^\s+Handler:\s*(\S+)\s*$", f.read(), flags=re.MULTILINE)
+    return sorted({h.rsplit('.', 1)[0] for h in handlers})
+
+
+def measure_import(module_name):
+    """
+    Imports module_name in a fresh interpreter
+
+    Returns:
+        Tuple (cumulative import time of module_name in microseconds, list of names of all modules loaded)
+    """
+    code = f"import json, sys; import {module_name}; print(json.dumps(sorted(sys.modules)))"
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [SRC_FOLDER, os.environ.get('PYTHONPATH')]))}
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=SRC_FOLDER,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    import_time = None
+    for line in result.stderr.splitlines():
+        m = IMPORTTIME_LINE.match(line)
+        if m and (m.group('module') == module_name):
+            import_time = int(m.group('cumulative'))
+    loaded_modules = json.loads(result.stdout.splitlines()[-1])
+    return import_time, loaded_modules
+
+
+def get_src_imports(module_name):
+    """
+    Imports module_name in a fresh interpreter, recording the import statements executed by modules in SRC_FOLDER
+
+    Returns:
+        Sorted list of the names imported by modules in SRC_FOLDER while module_name was imported ('from a import b'
+        is recorded as both a and a.b)
+    """
+    code = (
+        "import builtins, json, os\n"
+        f"src_folder = {os.path.realpath(SRC_FOLDER)!r}\n"
+        "imported_names = set()\n"
+        "builtin_import = builtins.__import__\n"
+        "def recording_import(name, globals=None, locals=None, fromlist=(), level=0):\n"
+        "    if (level == 0) and os.path.realpath((globals or dict()).get('__file__') or '').startswith(src_folder):\n"
+        "        imported_names.update([name] + [f'{name}.{x}' for x in fromlist or ()])\n"
+        "    return builtin_import(name, globals, locals, fromlist, level)\n"
+        "builtins.__import__ = recording_import\n"
+        f"import {module_name}\n"
+        "print(json.dumps(sorted(imported_names)))\n"
+    )
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [SRC_FOLDER, os.environ.get('PYTHONPATH')]))}
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=SRC_FOLDER,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main():
+    print(f"{'handler module':<20}{'median (ms)':>14}{'budget (ms)':>14}{'modules loaded':>16}")
+    for module_name in get_handler_modules():
+        import_times = list()
+        loaded_modules = list()
+        for _ in range(N_RUNS):
+            import_time, loaded_modules = measure_import(module_name)
+            import_times.append(import_time / 1000)
+        budget = IMPORT_BUDGETS_MS.get(module_name, float('nan'))
+        print(f"{module_name:<20}{statistics.median(import_times):>14.1f}{budget:>14.0f}{len(loaded_modules):>16}")
+
+
+if __name__ == '__main__':
+    main()
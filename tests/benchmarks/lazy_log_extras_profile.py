@@ -0,0 +1,143 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+"""
+Profiles the cost of building appointment log extras while processing Acuity webhooks.
+Runs the booking, rescheduling and cancellation paths of AcuityEvent.process with all external calls (Dynamodb,
+Acuity, core and emails APIs, secrets) replaced by in-memory fakes, at the INFO level used in production, and
+compares lazy log extras (AcuityAppointment.lazy_as_dict) with eagerly built ones (AcuityAppointment.as_dict).
+Reports CPU time per webhook and the number of as_dict calls made to build log extras.
+
+Usage (from the repository root):
+    python -m tests.benchmarks.lazy_log_extras_profile
+"""
+import copy
+import logging
+import time
+from unittest import mock
+
+import src.appointments as app
+from tests.test_data import appointments as test_appointments
+
+
+N_WEBHOOKS = 2000
+ACUITY_EVENTS = {
+    'booking': 'action=appointment.scheduled&id=399682887&calendarID=4038206&appointmentTypeID=14792299',
+    'rescheduling': 'action=appointment.rescheduled&id=399682887&calendarID=4038206&appointmentTypeID=14792299',
+    'cancellation': 'action=appointment.canceled&id=399682887&calendarID=4038206&appointmentTypeID=14792299',
+}
+
+
+class AsDictCounter:
+    def __init__(self):
+        self.calls = 0
+        as_dict = app.AcuityAppointment.as_dict
+
+        def counting_as_dict(appointment):
+            self.calls += 1
+            return as_dict(appointment)
+
+        self.as_dict = counting_as_dict
+
+
+def fake_appointment_type_ddb_load(appointment_type):
+    appointment_type.from_dict(copy.copy(test_appointments['appointment1']['appointment_type']))
+
+
+def fake_get_appointment_info_from_acuity(appointment, force_refresh=False):
+    appointment.acuity_info = copy.deepcopy(test_appointments['appointment1']['acuity_info'])
+    appointment.calendar_id = str(appointment.acuity_info['calendarID'])
+    appointment.calendar_name = appointment.acuity_info['calendar']
+    appointment.participant_email = appointment.acuity_info['email']
+    appointment.appointment_type.type_id = str(appointment.acuity_info['appointmentTypeID'])
+    return appointment.acuity_info
+
+
+def fake_ddb_dump(appointment, update_allowed=False):
+    appointment.get_appointment_info_from_acuity()
+    return {'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+
+def fake_ddb_update(appointment):
+    appointment.get_appointment_info_from_acuity()
+    return {'Attributes': {k: v for k, v in test_appointments['appointment1'].items()}}
+
+
+def fake_get_secret(name):
+    return {
+        'appointment-management': {
+            'manager': 'manager@email.co.uk',
+            'tester': 'tester@email.co.uk',
+            'notification-email-source': 'source@email.co.uk',
+        }
+    }
+
+
+def eager_as_dict(item):
+    return item.as_dict()
+
+
+def run(logger, eager):
+    counter = AsDictCounter()
+    emails_client = mock.MagicMock()
+    emails_client.return_value.send_email.return_value = {'statusCode': 200}
+    patches = [
+        mock.patch('thiscovery_lib.core_api_utilities.CoreApiClient', mock.MagicMock()),
+        mock.patch('thiscovery_lib.emails_api_utilities.EmailsApiClient', emails_client),
+        mock.patch.object(app.utils, 'get_secret', fake_get_secret),
+        mock.patch.object(app.AppointmentType, 'ddb_load', fake_appointment_type_ddb_load),
+        mock.patch.object(app.AcuityAppointment, 'get_appointment_info_from_acuity', fake_get_appointment_info_from_acuity),
+        mock.patch.object(app.AcuityAppointment, 'ddb_dump', fake_ddb_dump),
+        mock.patch.object(app.AcuityAppointment, 'ddb_update', fake_ddb_update),
+        mock.patch.object(app.AcuityAppointment, 'as_dict', counter.as_dict),
+        mock.patch.object(app.AppointmentNotifier, 'send_notifications', return_value=None),
+    ]
+    if eager:
+        patches.append(mock.patch.object(app.SlottedItem, 'lazy_as_dict', eager_as_dict))
+    for p in patches:
+        p.start()
+    try:
+        results = dict()
+        for label, acuity_event in ACUITY_EVENTS.items():
+            counter.calls = 0
+            start = time.process_time()
+            for _ in range(N_WEBHOOKS):
+                app.AcuityEvent(acuity_event, logger=logger).process()
+            elapsed = time.process_time() - start
+            results[label] = (1e6 * elapsed / N_WEBHOOKS, counter.calls / N_WEBHOOKS)
+        return results
+    finally:
+        for p in reversed(patches):
+            p.stop()
+
+
+def main():
+    logger = logging.getLogger('lazy_log_extras_profile')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    eager_results = run(logger, eager=True)
+    lazy_results = run(logger, eager=False)
+    print(f"{'webhook':<16}{'eager (us)':>14}{'lazy (us)':>14}{'eager as_dict':>16}{'lazy as_dict':>16}")
+    for label in ACUITY_EVENTS:
+        eager_time, eager_calls = eager_results[label]
+        lazy_time, lazy_calls = lazy_results[label]
+        print(f"{label:<16}{eager_time:>14.1f}{lazy_time:>14.1f}{eager_calls:>16.1f}{lazy_calls:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
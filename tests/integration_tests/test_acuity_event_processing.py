@@ -664,3 +664,21 @@ class TestAcuityEventProcessing(test_tools.BaseTestCase, test_utils.DdbMixin):
             expected_notifications=list(),
             event_type='rescheduled',
         )
+
+    def test_09_process_cancellation_ok(self):
+        self.common_routine(
+            appointment_id=td['dev_appointment_id'],
+            calendar_id=td['calendar_id'],
+            appointment_type_id=td['dev_appointment_type_id'],
+        )
+        result = self.common_routine(
+            appointment_id=td['dev_appointment_id'],
+            calendar_id=td['calendar_id'],
+            appointment_type_id=td['dev_appointment_type_id'],
+            event_type='canceled',
+        )
+        result_body = json.loads(result['body'])
+        self.assertEqual(['ResponseMetadata'], list(result_body[0].keys()))  # original item is not returned
+        self.assertEqual(HTTPStatus.OK, result_body[0]['ResponseMetadata']['HTTPStatusCode'])
+        self.assertIsNone(result_body[1])
+        self.assertIsNone(result_body[2])
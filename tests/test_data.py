@@ -91,6 +91,7 @@ appointments = {
         "participant_user_id": None,
         "latest_participant_notification": "0000-00-00 00:00:00+00:00",
         "appointment_date": "2020-06-30",
+        "appointment_datetime": "2020-06-30T10:15:00+0100",
         "appointment_type": {
             "type_id": "14792299",
             "name": "Test appointment",
@@ -153,6 +154,7 @@ appointments = {
         "participant_user_id": None,
         "latest_participant_notification": "2020-09-25 06:10:10+00:00",
         "appointment_date": "2020-09-28",
+        "appointment_datetime": "2020-09-28T13:00:00+0100",
         "appointment_type": {
             "type_id": "14649911",
             "name": "Development appointment",
@@ -215,6 +217,7 @@ appointments = {
         "participant_user_id": None,
         "latest_participant_notification": "2020-10-01 05:13:40+00:00",
         "appointment_date": "2020-10-02",
+        "appointment_datetime": "2020-10-02T13:15:00+0100",
         "appointment_type": {
             "type_id": "17271544",
             "name": "Development appointment - no link",
@@ -277,6 +280,7 @@ appointments = {
         "participant_user_id": None,
         "latest_participant_notification": "0000-00-00 00:00:00+00:00",
         "appointment_date": "2020-10-01",
+        "appointment_datetime": "2020-10-01T14:15:00+0100",
         "appointment_type": {
             "type_id": "17271544",
             "name": "Development appointment - no link",
@@ -339,6 +343,7 @@ appointments = {
         "participant_user_id": None,
         "latest_participant_notification": "0000-00-00 00:00:00+00:00",
         "appointment_date": "2020-10-15",
+        "appointment_datetime": "2020-10-15T11:00:00+0100",
         "appointment_type": {
             "type_id": "17271544",
             "name": "Development appointment - no link",
@@ -401,6 +406,7 @@ appointments = {
         "participant_user_id": None,
         "latest_participant_notification": "0000-00-00 00:00:00+00:00",
         "appointment_date": "2020-09-28",
+        "appointment_datetime": "2020-09-28T10:30:00+0100",
         "appointment_type": {
             "type_id": "17268193",
             "name": "Test appointment - no notifications",
@@ -162,6 +162,7 @@ class AppointmentsTestCase(test_utils.BaseTestCase):
             ],
             "id": "4038206",
             "label": "André",
+            "block_schedule": "monday_morning",
         }
         calendar2 = copy.deepcopy(calendar1)
         calendar2['id'] = "3887437"
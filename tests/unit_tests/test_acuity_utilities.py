@@ -23,7 +23,9 @@ from http import HTTPStatus
 
 import thiscovery_lib.utilities as utils
 import thiscovery_dev_tools.testing_tools as test_utils
-from src.common.acuity_utilities import AcuityClient
+from src.common.acuity_utilities import AcuityClient, compress_acuity_info, decompress_acuity_info, split_acuity_info
+from src.common.constants import ACUITY_USER_METADATA_INTAKE_FORM_ID
+from tests.test_data import appointments
 
 
 class TestAcuityClient(test_utils.BaseTestCase):
@@ -81,3 +83,95 @@ class TestAcuityClient(test_utils.BaseTestCase):
         # delete test
         delete_response = self.acuity_client.delete_block(block_id)
         self.assertEqual(HTTPStatus.NO_CONTENT, delete_response)
+
+
+class TestAcuityInfoStorage(test_utils.BaseTestCase):
+    acuity_info = {
+        **appointments['appointment1']['acuity_info'],
+        'forms': [
+            {
+                'id': ACUITY_USER_METADATA_INTAKE_FORM_ID,
+                'name': 'User metadata',
+                'values': [
+                    {'fieldID': 8861964, 'id': 1, 'name': 'anon_user_task_id', 'value': 'f1b3aa4a-b9bb-4e3b-8d1b-0f6b5a3d8b8d'},
+                ],
+            },
+            {
+                'id': 123,
+                'name': 'Other form',
+                'values': [],
+            },
+        ],
+    }
+
+    def test_split_acuity_info_ok(self):
+        compact_info, remaining_info = split_acuity_info(self.acuity_info)
+        self.assertEqual('2020-06-30T10:15:00+0100', compact_info['datetime'])
+        self.assertNotIn('formsText', compact_info)
+        self.assertIn('formsText', remaining_info)
+        self.assertEqual(
+            [{'id': ACUITY_USER_METADATA_INTAKE_FORM_ID, 'values': [{'name': 'anon_user_task_id', 'value': 'f1b3aa4a-b9bb-4e3b-8d1b-0f6b5a3d8b8d'}]}],
+            compact_info['forms']
+        )
+        self.assertEqual(self.acuity_info['forms'], remaining_info['forms'])
+        self.assertEqual(set(self.acuity_info.keys()), set(compact_info.keys()) | set(remaining_info.keys()))
+
+    def test_compress_acuity_info_is_deterministic_and_reversible(self):
+        _, remaining_info = split_acuity_info(self.acuity_info)
+        compressed = compress_acuity_info(remaining_info)
+        self.assertEqual(compressed, compress_acuity_info(remaining_info))
+        self.assertEqual(remaining_info, decompress_acuity_info(compressed))
+
+
+class FakeResponse:
+
+    def __init__(self, payload):
+        self.ok = True
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class FakeAppointmentsSession:
+    """
+    Lists appointments with Acuity's filtering and ordering semantics
+    """
+
+    def __init__(self, appointments):
+        self.appointments = sorted(appointments, key=lambda x: x['datetime'])
+        self.calls = list()
+
+    def get(self, url, params=None):
+        self.calls.append(dict(params))
+        result = [
+            x for x in self.appointments
+            if (x['datetime'] >= params.get('minDate', '')) and (x['datetime'][:10] <= params.get('maxDate', '9999'))
+            and ((params.get('showall') == 'true') or (x['canceled'] is (params.get('canceled') == 'true')))
+            and (x['calendarID'] == params.get('calendarID', x['calendarID']))
+        ]
+        return FakeResponse(result[:params['max']])
+
+
+class TestGetAppointments(test_utils.BaseTestCase):
+
+    def setUp(self):
+        self.session = FakeAppointmentsSession([
+            {'id': i, 'datetime': f'2030-12-{day}T{hour}:00:00+0000', 'canceled': i % 4 == 0, 'calendarID': 1 + i % 2}
+            for i, (day, hour) in enumerate([(d, h) for d in [20, 21, 22] for h in [10, 11, 12, 13]])
+        ])
+        self.client = AcuityClient.__new__(AcuityClient)
+        self.client.session = self.session
+
+    def test_01_paginated_listing_returns_all_appointments_once(self):
+        result = self.client.get_appointments(min_date='2030-12-20', max_date='2030-12-21', canceled=None, page_size=3)
+        self.assertEqual(list(range(8)), [x['id'] for x in result])
+        self.assertEqual(4, len(self.session.calls))
+        self.assertEqual('2030-12-20T12:00:00+0000', self.session.calls[1]['minDate'])
+
+    def test_02_filters(self):
+        result = self.client.get_appointments(min_date=datetime.date(2030, 12, 21), max_date='2030-12-21', calendar_id=1)
+        self.assertEqual([6], [x['id'] for x in result])  # 4 is cancelled
+        result = self.client.get_appointments(max_date='2030-12-21', canceled=True)
+        self.assertEqual([0, 4], [x['id'] for x in result])
+        self.assertEqual({'max': 100, 'direction': 'ASC', 'maxDate': '2030-12-21', 'canceled': 'true'}, self.session.calls[-1])
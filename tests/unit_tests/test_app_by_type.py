@@ -23,6 +23,7 @@ from http import HTTPStatus
 from pprint import pprint
 
 import app_by_type as abt
+from common.acuity_utilities import compress_acuity_info, split_acuity_info
 from local.dev_config import DELETE_TEST_DATA
 from test_data import td
 from testing_utilities import DdbMixin
@@ -57,3 +58,23 @@ class TestAppByType(test_utils.BaseTestCase, DdbMixin):
         self.assertEqual(HTTPStatus.OK, result['statusCode'])
         appointments = json.loads(result['body'])['appointments']
         self.assertEqual(3, len(appointments))
+
+    def test_02_archived_acuity_info_expanded(self):
+        acuity_info = {
+            'id': 399682887,
+            'appointmentTypeID': td['dev_appointment_no_link_type_id'],
+            'datetime': '2030-12-21T09:00:00+0000',
+            'canceled': False,
+            'location': 'https://meet.example.com/interview',
+            'notes': 'Participant asked for a call back',
+            'forms': [],
+        }
+        compact_info, remaining_info = split_acuity_info(acuity_info)
+        item = {
+            'id': '399682887',
+            'acuity_info': compact_info,
+            'acuity_info_archive': compress_acuity_info(remaining_info),
+        }
+        expanded_item = abt.expand_acuity_info_archive(item)
+        self.assertNotIn('acuity_info_archive', expanded_item)
+        self.assertEqual(acuity_info, json.loads(json.dumps(expanded_item))['acuity_info'])
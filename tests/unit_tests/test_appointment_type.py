@@ -19,6 +19,8 @@ import copy
 from http import HTTPStatus
 
 import appointments as app
+from common.constants import DEFAULT_TEMPLATES
+from thiscovery_lib import utilities as utils
 from testing_utilities import AppointmentsTestCase
 
 
@@ -79,6 +81,7 @@ class TestAppointmentType(AppointmentsTestCase):
             'has_link': None,
             'name': 'Development appointment',
             'project_task_id': None,
+            'reminder_cadence': None,
             'send_notifications': None,
             'templates': None,
             'type_id': '14649911',
@@ -100,8 +103,39 @@ class TestAppointmentType(AppointmentsTestCase):
             'has_link': True,
             'name': 'Development appointment',
             'project_task_id': self.test_data['project_task_id'],
+            'reminder_cadence': None,
             'send_notifications': None,
             'templates': 'test_template',
             'type_id': '14649911',
         }
-        self.assertDictEqual(expected_result, at.as_dict())
\ No newline at end of file
+        self.assertDictEqual(expected_result, at.as_dict())
+
+    def test_06_get_template_table_override_ok(self):
+        at = copy.copy(self.at)
+        researcher_templates = {
+            'booking': {
+                'web': {
+                    'other': {
+                        'name': 'custom_booked_researcher',
+                        'custom_properties': ['user_first_name'],
+                    },
+                },
+            },
+        }
+        at.templates = {'researcher': researcher_templates}
+        table = at.get_template_table()
+        self.assertEqual('custom_booked_researcher', table[('researcher', 'booking', 'web', 'other')]['name'])
+        self.assertEqual(
+            DEFAULT_TEMPLATES['participant']['booking']['web']['nhs'],
+            table[('participant', 'booking', 'web', 'nhs')]
+        )
+        # overrides replace the whole recipient_type entry of DEFAULT_TEMPLATES
+        self.assertNotIn(('researcher', 'cancellation', 'web', 'other'), table)
+        self.assertIs(table, at.get_template_table())
+
+    def test_07_get_template_table_malformed_override(self):
+        at = copy.copy(self.at)
+        at.templates = {'participant': {'booking': {'web': {'nhs': 'interview_booked_web_nhs_participant'}}}}
+        with self.assertRaises(utils.DetailedValueError) as context:
+            at.get_template_table()
+        self.assertEqual(('participant', 'booking', 'web', 'nhs'), context.exception.details['path'])
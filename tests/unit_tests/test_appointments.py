@@ -71,3 +71,115 @@ class TestAcuityAppointment(AppointmentsTestCase):
         err = context.exception
         err_msg = err.args[0]
         self.assertEqual(f'Appointment {non_existent_id} could not be found in Dynamodb', err_msg)
+
+    def test_07_ddb_update_preserves_link_and_returns_original_item(self):
+        aa1 = copy.copy(self.aa1)
+        aa1.ddb_dump()
+        test_link = 'www.thiscovery.org'
+        aa1.update_link(test_link)
+        aa = app.AcuityAppointment(
+            appointment_id=self.test_data['test_appointment_id'],
+            logger=self.logger,
+        )
+        result = aa.ddb_update()
+        self.assertEqual(HTTPStatus.OK, result['ResponseMetadata']['HTTPStatusCode'])
+        self.assertEqual(test_link, result['Attributes']['link'])
+        self.assertEqual(test_link, aa.link)
+        self.assertEqual(test_link, aa.get_appointment_item_from_ddb()['link'])
+        self.clear_appointments_table()
+
+    def test_08_ddb_update_only_writes_changed_attributes(self):
+        aa1 = copy.copy(self.aa1)
+        aa1.ddb_dump()
+        aa = app.AcuityAppointment(
+            appointment_id=self.test_data['test_appointment_id'],
+            logger=self.logger,
+        )
+        aa.ddb_load()
+        self.assertEqual(dict(), aa.get_changed_attributes())
+        aa.calendar_name = 'Test calendar'
+        self.assertEqual({'calendar_name': 'Test calendar'}, aa.get_changed_attributes())
+        self.clear_appointments_table()
+
+    def test_09_ddb_update_non_existent_appointment_id(self):
+        aa = app.AcuityAppointment(
+            appointment_id=self.test_data['test_appointment_id'],
+            logger=self.logger,
+        )
+        with self.assertRaises(utils.ObjectDoesNotExistError):
+            aa.ddb_update()
+
+    def test_10_concurrent_writes_do_not_overwrite_link(self):
+        aa1 = copy.copy(self.aa1)
+        aa1.ddb_dump(update_allowed=True)
+        first = app.AcuityAppointment(appointment_id=self.test_data['test_appointment_id'], logger=self.logger)
+        first.ddb_load()
+        second = app.AcuityAppointment(appointment_id=self.test_data['test_appointment_id'], logger=self.logger)
+        second.ddb_load()
+        conflicts_before = app.AcuityAppointment.get_write_conflicts()
+        test_link = 'www.thiscovery.org'
+        self.assertEqual(HTTPStatus.OK, first.update_link(test_link))
+        self.assertEqual(HTTPStatus.OK, second.update_latest_participant_notification())
+        self.assertEqual(conflicts_before + 1, app.AcuityAppointment.get_write_conflicts())
+        self.assertEqual(test_link, second.link)
+        item = second.get_appointment_item_from_ddb()
+        self.assertEqual(test_link, item['link'])
+        self.assertEqual(second.latest_participant_notification, item['latest_participant_notification'])
+        self.assertEqual(second.version, item['version'])
+        self.clear_appointments_table()
+
+    def test_11_from_dict_and_as_dict_round_trip(self):
+        aa = app.AcuityAppointment(appointment_id=self.test_data['test_appointment_id'])
+        item = {
+            'appointment_id': str(self.test_data['test_appointment_id']),
+            'link': 'www.thiscovery.org',
+            'type': 'acuity-appointment',
+            'attribute_added_by_a_later_release': 'value',
+        }
+        aa.from_dict(item)
+        result = aa.as_dict()
+        for k, v in item.items():
+            self.assertEqual(v, result[k])
+        with self.assertRaises(AttributeError):
+            aa.__dict__
+
+    def test_12_lazy_as_dict_ok(self):
+        aa = app.AcuityAppointment(appointment_id=self.test_data['test_appointment_id'])
+        lazy_dict = aa.lazy_as_dict()
+        aa.link = 'www.thiscovery.org'
+        self.assertEqual(aa.as_dict(), lazy_dict.resolve())
+
+    def test_13_ddb_update_preserves_persisted_identity(self):
+        aa1 = copy.copy(self.aa1)
+        aa1.ddb_dump(update_allowed=True)
+        notifier = app.AppointmentNotifier(appointment=aa1, logger=self.logger)
+        notifier.project_short_name = aa1.project_short_name = 'PSFU-05-pub-act'
+        aa1.participant_user_id = self.test_data['participant_user_id']
+        self.assertEqual(
+            {'participant_user_id': self.test_data['participant_user_id'], 'project_short_name': 'PSFU-05-pub-act'},
+            notifier.persist_resolved_identity()
+        )
+        aa = app.AcuityAppointment(
+            appointment_id=self.test_data['test_appointment_id'],
+            logger=self.logger,
+        )
+        aa.ddb_update()
+        self.assertEqual(self.test_data['participant_user_id'], aa.participant_user_id)
+        self.assertEqual('PSFU-05-pub-act', aa.project_short_name)
+        item = aa.get_appointment_item_from_ddb()
+        self.assertEqual(self.test_data['participant_user_id'], item['participant_user_id'])
+        self.assertEqual('PSFU-05-pub-act', item['project_short_name'])
+        self.clear_appointments_table()
+
+    def test_14_identity_stored_with_participant_notification(self):
+        aa1 = copy.copy(self.aa1)
+        aa1.ddb_dump(update_allowed=True)
+        self.assertEqual(dict(), aa1.get_unsaved_identity_attributes())
+        aa1.participant_user_id = self.test_data['participant_user_id']
+        self.assertEqual(HTTPStatus.OK, aa1.update_latest_participant_notification())
+        notifier = app.AppointmentNotifier(appointment=aa1, logger=self.logger)
+        self.assertEqual(dict(), notifier.persist_resolved_identity())
+        item = aa1.get_appointment_item_from_ddb()
+        self.assertEqual(self.test_data['participant_user_id'], item['participant_user_id'])
+        self.assertEqual(aa1.version, item['version'])
+        self.clear_appointments_table()
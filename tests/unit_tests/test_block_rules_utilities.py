@@ -0,0 +1,116 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import local.dev_config  # sets environment variables
+import local.secrets  # sets environment variables
+
+import datetime
+from datetime import datetime as dt
+
+import thiscovery_lib.utilities as utils
+import thiscovery_dev_tools.testing_tools as test_utils
+from src.common.block_rules_utilities import get_calendar_block_rules, get_rule_intervals, merge_intervals, \
+    plan_calendar_blocks
+
+
+HORIZON = (dt(2030, 12, 20, 15, 0), dt(2031, 1, 3, 15, 0))  # two weeks from a Friday afternoon
+
+
+class TestBlockRules(test_utils.BaseTestCase):
+
+    def test_01_monday_morning_calendars_use_default_rules(self):
+        self.assertEqual(1, len(get_calendar_block_rules({'id': '1', 'block_monday_morning': True})))
+        self.assertEqual([], get_calendar_block_rules({'id': '1', 'block_monday_morning': False}))
+        rules = [{'type': 'dates', 'dates': ['2030-12-25']}]
+        self.assertEqual(rules, get_calendar_block_rules({'id': '1', 'block_monday_morning': True, 'block_rules': rules}))
+
+    def test_02_weekly_rule(self):
+        rule = {'type': 'weekly', 'start_day': 5, 'start_time': '00:00', 'end_day': 0, 'end_time': '12:00'}
+        self.assertEqual([
+            (dt(2030, 12, 21, 0, 0), dt(2030, 12, 23, 12, 0)),
+            (dt(2030, 12, 28, 0, 0), dt(2030, 12, 30, 12, 0)),
+        ], get_rule_intervals(rule, *HORIZON))
+
+    def test_03_weekly_rule_spanning_horizon_start(self):
+        rule = {'type': 'weekly', 'start_day': 4, 'start_time': '12:00', 'end_day': 4, 'end_time': '12:00'}  # a week
+        self.assertEqual([
+            (dt(2030, 12, 20, 12, 0), dt(2030, 12, 27, 12, 0)),  # in progress at the start of the horizon
+            (dt(2030, 12, 27, 12, 0), dt(2031, 1, 3, 12, 0)),
+        ], get_rule_intervals(rule, *HORIZON))
+
+    def test_04_dates_and_one_off_rules(self):
+        self.assertEqual(
+            [(dt(2030, 12, 25), dt(2030, 12, 26))],
+            get_rule_intervals({'type': 'dates', 'dates': ['2030-12-25', '2031-04-18']}, *HORIZON)
+        )
+        self.assertEqual(
+            [(dt(2030, 12, 24, 13, 0), dt(2031, 1, 2, 9, 0))],
+            get_rule_intervals({'type': 'one_off', 'start': '2030-12-24 13:00', 'end': '2031-01-02 09:00'}, *HORIZON)
+        )
+
+    def test_05_invalid_rules(self):
+        for rule in [
+            {'type': 'monthly'},
+            {'type': 'dates'},
+            {'type': 'dates', 'dates': ['25/12/2030']},
+            {'type': 'one_off', 'start': '2030-12-24 13:00', 'end': '2030-12-24 09:00'},
+        ]:
+            with self.assertRaises(utils.DetailedValueError):
+                get_rule_intervals(rule, *HORIZON)
+
+    def test_06_merge_intervals(self):
+        self.assertEqual([
+            (dt(2030, 12, 21), dt(2030, 12, 27)),
+            (dt(2030, 12, 28), dt(2030, 12, 29)),
+        ], merge_intervals([
+            (dt(2030, 12, 28), dt(2030, 12, 29)),
+            (dt(2030, 12, 23), dt(2030, 12, 26)),
+            (dt(2030, 12, 21), dt(2030, 12, 23)),  # adjacent
+            (dt(2030, 12, 24), dt(2030, 12, 27)),  # overlapping
+        ]))
+
+    def test_07_plan_calendar_blocks(self):
+        calendars = [
+            {
+                'id': '1',
+                'label': 'Calendar 1',
+                'block_rules': [
+                    {'type': 'weekly', 'start_day': 5, 'start_time': '00:00', 'end_day': 0, 'end_time': '12:00'},
+                    {'type': 'dates', 'dates': ['2030-12-25', '2030-12-26'], 'name': 'Bank holidays'},
+                    {'type': 'one_off', 'start': '2030-12-30 12:00', 'end': '2030-12-31 00:00'},
+                ],
+            },
+            {'id': '2', 'label': 'Calendar 2', 'block_monday_morning': True},
+            {'id': '3', 'label': 'Calendar 3', 'block_monday_morning': False},
+        ]
+        self.assertEqual([
+            {'calendar_id': '1', 'calendar_name': 'Calendar 1', 'start': dt(2030, 12, 21), 'end': dt(2030, 12, 23, 12)},
+            {'calendar_id': '1', 'calendar_name': 'Calendar 1', 'start': dt(2030, 12, 25), 'end': dt(2030, 12, 27)},
+            {'calendar_id': '1', 'calendar_name': 'Calendar 1', 'start': dt(2030, 12, 28), 'end': dt(2030, 12, 31)},
+            {'calendar_id': '2', 'calendar_name': 'Calendar 2', 'start': dt(2030, 12, 21), 'end': dt(2030, 12, 23, 12)},
+            {'calendar_id': '2', 'calendar_name': 'Calendar 2', 'start': dt(2030, 12, 28), 'end': dt(2030, 12, 30, 12)},
+        ], plan_calendar_blocks(calendars, *HORIZON))
+
+    def test_08_blocks_in_progress_are_clipped_to_the_horizon(self):
+        calendars = [{'id': '1', 'label': 'Calendar 1', 'block_rules': [
+            {'type': 'one_off', 'start': '2030-12-20 09:00', 'end': '2030-12-20 18:00'},
+        ]}]
+        self.assertEqual([
+            {'calendar_id': '1', 'calendar_name': 'Calendar 1', 'start': dt(2030, 12, 20, 15), 'end': dt(2030, 12, 20, 18)},
+        ], plan_calendar_blocks(calendars, *HORIZON))
+        aware_horizon = [x.replace(second=30, tzinfo=datetime.timezone.utc) for x in HORIZON]
+        self.assertEqual(dt(2030, 12, 20, 15), plan_calendar_blocks(calendars, *aware_horizon)[0]['start'])
@@ -0,0 +1,153 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import local.dev_config  # sets environment variables
+import local.secrets  # sets environment variables
+
+import os
+import tempfile
+
+import thiscovery_dev_tools.testing_tools as test_utils
+from src.common.cache_utilities import AppointmentTypesCache, CalendarsCache, CoreApiLookupCache, MISSING, TtlCache, \
+    VersionedTtlCache
+from src.common.config_version_utilities import FileConfigVersionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTtlCache(test_utils.BaseTestCase):
+
+    def test_get_or_load_and_expiry_ok(self):
+        clock = FakeClock()
+        cache = TtlCache(ttl=10, clock=clock)
+        loads = list()
+
+        def loader():
+            loads.append(clock.now)
+            return 'value'
+
+        self.assertEqual('value', cache.get_or_load('key', loader))
+        clock.now = 9
+        self.assertEqual('value', cache.get_or_load('key', loader))
+        clock.now = 10
+        self.assertEqual('value', cache.get_or_load('key', loader))
+        self.assertEqual([0, 10], loads)
+        self.assertEqual({'hits': 1, 'misses': 2, 'hit_ratio': 1 / 3, 'size': 1}, cache.stats())
+
+    def test_cached_none_is_a_hit(self):
+        cache = TtlCache(ttl=10, clock=FakeClock())
+        cache.set('key', None)
+        self.assertIsNone(cache.get('key'))
+        cache.invalidate('key')
+        self.assertIs(MISSING, cache.get('key'))
+
+
+class TestVersionedTtlCache(test_utils.BaseTestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.version_store = FileConfigVersionStore(os.path.join(self.tmp_dir.name, 'config_versions.json'))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_cleared_when_config_version_changes(self):
+        clock = FakeClock()
+        cache = VersionedTtlCache(
+            ttl=3600,
+            config_name='Calendars',
+            version_store=self.version_store,
+            check_interval=10,
+            clock=clock,
+        )
+        cache.set('key', 'value')
+        self.assertEqual('value', cache.get('key'))
+        self.version_store.bump_version('Calendars')
+        clock.now = 9  # version is not checked again until check_interval has elapsed
+        self.assertEqual('value', cache.get('key'))
+        clock.now = 10
+        self.assertIs(MISSING, cache.get('key'))
+
+    def test_appointment_types_cache_invalidate_ok(self):
+        cache = AppointmentTypesCache(version_store=self.version_store)
+        loads = list()
+
+        def loader():
+            loads.append(1)
+            return {'id': '14792299'}
+
+        cache.get_item(14792299, loader)
+        cache.get_item('14792299', loader)
+        self.assertEqual(1, len(loads))
+        cache.invalidate(14792299)
+        cache.get_item('14792299', loader)
+        self.assertEqual(2, len(loads))
+        self.assertIsNone(cache.get_item('1', lambda: None))
+
+    def test_calendars_cache_invalidate_from_stream_event(self):
+        cache = CalendarsCache(ddb_client='unused', version_store=self.version_store)
+        cache._cache.set(cache.items_key, {'4038206': {'id': '4038206'}})
+        blocks_event = {'Records': [{
+            'eventSourceARN': 'arn:aws:dynamodb:eu-west-1:123456789012:table/thiscovery-interviews-dev-CalendarBlocks/stream/2020-01-01T00:00:00.000'
+        }]}
+        self.assertFalse(cache.invalidate_from_stream_event(blocks_event))
+        self.assertEqual([{'id': '4038206'}], cache.get_items())
+        calendars_event = {'Records': [{
+            'eventSourceARN': 'arn:aws:dynamodb:eu-west-1:123456789012:table/thiscovery-interviews-dev-Calendars/stream/2020-01-01T00:00:00.000'
+        }]}
+        self.assertTrue(cache.invalidate_from_stream_event(calendars_event))
+        self.assertIs(MISSING, cache._cache.get(cache.items_key))
+
+
+class FakeCoreApiClient:
+    def __init__(self):
+        self.calls = list()
+
+    def get_user_id_by_email(self, email):
+        self.calls.append(('get_user_id_by_email', email))
+        assert email == 'clive@email.co.uk', f'User {email} not found'
+        return 'd1070e81-557e-40eb-a7ba-b951ddb7ebdc'
+
+    def get_userprojects(self, user_id):
+        self.calls.append(('get_userprojects', user_id))
+        return [{'project_id': '5907275b-6d75-4ec0-ada8-5854b44fb955'}]
+
+
+class TestCoreApiLookupCache(test_utils.BaseTestCase):
+
+    def test_repeat_lookups_do_not_call_core_api(self):
+        client = FakeCoreApiClient()
+        cache = CoreApiLookupCache()
+        for _ in range(3):
+            user_id = cache.get_user_id_by_email(client, 'clive@email.co.uk')
+            cache.get_userprojects(client, user_id)
+        self.assertEqual(2, len(client.calls))
+        self.assertEqual(2 / 3, cache.stats()['user_ids']['hit_ratio'])
+
+    def test_no_account_is_cached(self):
+        client = FakeCoreApiClient()
+        cache = CoreApiLookupCache()
+        for _ in range(2):
+            with self.assertRaises(AssertionError):
+                cache.get_user_id_by_email(client, 'bob@email.com')
+        self.assertEqual([('get_user_id_by_email', 'bob@email.com')], client.calls)
@@ -0,0 +1,48 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import local.dev_config  # sets environment variables
+import local.secrets  # sets environment variables
+import os
+import tempfile
+
+import thiscovery_dev_tools.testing_tools as test_utils
+from src.common.config_version_utilities import FileConfigVersionStore
+from src.config_streams import ConfigStreamConsumer, get_changed_config_tables
+
+
+def stream_record(table_name):
+    return {
+        'eventName': 'MODIFY',
+        'eventSourceARN': f'arn:aws:dynamodb:eu-west-1:123456789012:table/thiscovery-interviews-dev-{table_name}'
+                          f'/stream/2020-01-01T00:00:00.000',
+    }
+
+
+class TestConfigStreams(test_utils.BaseTestCase):
+
+    def test_get_changed_config_tables_ok(self):
+        event = {'Records': [stream_record('Calendars'), stream_record('CalendarBlocks'), stream_record('Calendars')]}
+        self.assertEqual(['Calendars'], get_changed_config_tables(event))
+
+    def test_process_event_bumps_versions_once_per_batch(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            version_store = FileConfigVersionStore(os.path.join(tmp_dir, 'config_versions.json'))
+            consumer = ConfigStreamConsumer(version_store=version_store)
+            event = {'Records': [stream_record('AppointmentTypes'), stream_record('AppointmentTypes'), stream_record('Calendars')]}
+            self.assertEqual({'AppointmentTypes': 1, 'Calendars': 1}, consumer.process_event(event))
+            self.assertEqual({'AppointmentTypes': 2, 'Calendars': 2}, consumer.process_event(event))
@@ -0,0 +1,36 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import local.dev_config  # sets environment variables
+import local.secrets  # sets environment variables
+from decimal import Decimal
+
+import thiscovery_dev_tools.testing_tools as test_utils
+from src.common.ddb_utilities import get_item_size
+
+
+class TestDdbUtilities(test_utils.BaseTestCase):
+
+    def test_get_item_size_ok(self):
+        item = {
+            'id': '399682887',  # 2 + 9
+            'canceled': False,  # 8 + 1
+            'duration': Decimal('30'),  # 8 + 2
+            'link': None,  # 4 + 1
+            'details': {'name': 'André'},  # 7 + 3 + (4 + 6 + 1)
+        }
+        self.assertEqual(56, get_item_size(item))
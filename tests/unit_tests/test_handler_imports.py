@@ -0,0 +1,43 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import local.dev_config  # sets environment variables
+import local.secrets  # sets environment variables
+
+import thiscovery_dev_tools.testing_tools as test_utils
+from tests.benchmarks.handler_import_benchmark import DEFERRED_IMPORTS, DEFERRED_SRC_IMPORTS, IMPORT_BUDGETS_MS, \
+    get_handler_modules, get_src_imports, measure_import
+
+
+class TestHandlerImports(test_utils.BaseTestCase):
+
+    def test_handler_modules_have_import_budgets(self):
+        self.assertCountEqual(IMPORT_BUDGETS_MS.keys(), get_handler_modules())
+
+    def test_handler_imports_within_budget(self):
+        for module_name in get_handler_modules():
+            with self.subTest(handler_module=module_name):
+                measurements = [measure_import(module_name) for _ in range(3)]
+                import_time_ms = min(x[0] for x in measurements) / 1000
+                self.assertLess(import_time_ms, IMPORT_BUDGETS_MS[module_name])
+                loaded_modules = set(measurements[0][1])
+                self.assertEqual(set(), loaded_modules.intersection(DEFERRED_IMPORTS[module_name]))
+
+    def test_handler_modules_defer_imports(self):
+        for module_name in get_handler_modules():
+            with self.subTest(handler_module=module_name):
+                self.assertEqual(set(), set(get_src_imports(module_name)).intersection(DEFERRED_SRC_IMPORTS))
@@ -0,0 +1,65 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import local.dev_config  # sets environment variables
+import local.secrets  # sets environment variables
+import logging
+
+import thiscovery_dev_tools.testing_tools as test_utils
+from src.common.logging_utilities import LazyExtra, add_lazy_extra_filter
+
+
+class RecordCollector(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = list()
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestLazyExtra(test_utils.BaseTestCase):
+
+    def setUp(self):
+        self.calls = list()
+        self.collector = RecordCollector()
+        self.test_logger = logging.getLogger('test_lazy_extra')
+        self.test_logger.propagate = False
+        self.test_logger.setLevel(logging.INFO)
+        self.test_logger.addHandler(self.collector)
+        add_lazy_extra_filter(self.test_logger)
+
+    def tearDown(self):
+        self.test_logger.removeHandler(self.collector)
+
+    def build_payload(self, value):
+        self.calls.append(value)
+        return {'value': value}
+
+    def test_lazy_extra_not_resolved_for_suppressed_level(self):
+        self.test_logger.debug('Suppressed', extra={'payload': LazyExtra(self.build_payload, 1)})
+        self.assertEqual(list(), self.calls)
+        self.assertEqual(list(), self.collector.records)
+
+    def test_lazy_extra_resolved_for_emitted_record(self):
+        self.test_logger.info('Emitted', extra={'payload': LazyExtra(self.build_payload, 2)})
+        self.assertEqual([2], self.calls)
+        self.assertEqual({'value': 2}, self.collector.records[0].payload)
+
+    def test_add_lazy_extra_filter_is_idempotent(self):
+        add_lazy_extra_filter(self.test_logger)
+        self.assertEqual(1, len(self.test_logger.filters))
@@ -18,8 +18,11 @@
 import local.dev_config  # sets environment variables
 import local.secrets  # sets environment variables
 import datetime
+import functools
+import threading
 
 from http import HTTPStatus
+from unittest.mock import patch
 
 import src.main as m
 import thiscovery_lib.utilities as utils
@@ -42,6 +45,14 @@ class TestMain(test_utils.BaseTestCase):
         saturday_after_xmas = m.next_weekday(5, d=test_date)
         self.assertEqual(expected_saturday_after_xmas, saturday_after_xmas)
 
+    def test_get_block_schedule(self):
+        self.assertEqual('monday_morning', m.get_block_schedule({'id': '1', 'block_monday_morning': True}))
+        self.assertIsNone(m.get_block_schedule({'id': '1', 'block_monday_morning': False}))
+        self.assertIsNone(m.get_block_schedule({'id': '1'}))
+        self.assertEqual('rules', m.get_block_schedule({'id': '1', 'block_monday_morning': False, 'block_rules': [
+            {'type': 'dates', 'dates': ['2030-12-25']},
+        ]}))
+
 
 class TestCalendarBlocker(test_utils.BaseTestCase):
     test_calendar = {
@@ -79,3 +90,264 @@ class TestCalendarBlocker(test_utils.BaseTestCase):
             (str(self.test_calendar['id']), self.test_calendar['name']),
             result
         )
+
+
+class FakeBatchWriter:
+    def __init__(self, table):
+        self.table = table
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def put_item(self, Item):
+        self.table.put_items.append(Item)
+
+    def delete_item(self, Key):
+        self.table.delete_keys.append(Key['id'])
+
+
+class FakeBlocksTable:
+    def __init__(self):
+        self.put_items = list()
+        self.delete_keys = list()
+
+    def batch_writer(self):
+        return FakeBatchWriter(self)
+
+
+class FakeDdbClient:
+    def __init__(self, blocks=None):
+        self.blocks = blocks or list()
+        self.table = FakeBlocksTable()
+
+    def get_table(self, table_name):
+        return self.table
+
+    def query(self, table_name, IndexName, KeyConditionExpression, ExpressionAttributeValues,
+              ExpressionAttributeNames=None):
+        assert (table_name, IndexName) == ('CalendarBlocks', 'status-index')
+        items = {x['id']: x for x in self.blocks + self.table.put_items if x['id'] not in self.table.delete_keys}
+        return [x for x in items.values() if x['status'] == ExpressionAttributeValues[':status']]
+
+
+def acuity_block(block_id, calendar_id, start, end, notes='automated block'):
+    return {
+        'id': block_id,
+        'calendarID': int(calendar_id),
+        'start': start.strftime('%Y-%m-%dT%H:%M:%S+0000'),
+        'end': end.strftime('%Y-%m-%dT%H:%M:%S+0000'),
+        'notes': notes,
+    }
+
+
+class FakeAcuityClient:
+    def __init__(self, failing_ids=(), blocks=None):
+        self.failing_ids = failing_ids
+        self.blocks = blocks or list()
+        self.calls = list()
+        self.lock = threading.Lock()
+
+    def post_block(self, calendar_id, start, end):
+        with self.lock:
+            self.calls.append(calendar_id)
+        if calendar_id in self.failing_ids:
+            raise utils.DetailedValueError('Deliberate error', details={})
+        block = acuity_block(int(calendar_id) * 10, calendar_id, start, end)
+        with self.lock:
+            self.blocks.append(block)
+        return block
+
+    def delete_block(self, block_id):
+        with self.lock:
+            self.calls.append(block_id)
+        if block_id in self.failing_ids:
+            raise utils.DetailedValueError('Deliberate error', details={})
+        with self.lock:
+            self.blocks = [x for x in self.blocks if x['id'] != block_id]
+        return HTTPStatus.NO_CONTENT
+
+    def get_blocks(self, calendar_id=None, min_date=None, max_date=None, max_results=100):
+        """
+        Like Acuity, returns at most max_results blocks
+        """
+        with self.lock:
+            self.calls.append(f'get_blocks {min_date} {max_date}')
+        return [
+            x for x in self.blocks if str(min_date) <= x['start'][:10] <= str(max_date)
+        ][:max_results]
+
+    get_blocks_between = functools.partialmethod(AcuityClient.get_blocks_between, page_size=4)
+
+    def get_calendar_by_id(self, calendar_id):
+        with self.lock:
+            self.calls.append(f'get_calendar_by_id {calendar_id}')
+        return {'name': f'Calendar {calendar_id}'}
+
+
+def get_blocker(acuity_client, ddb_client, max_workers):
+    with patch.object(m, 'AcuityClient', return_value=acuity_client), \
+            patch.object(m, 'get_ddb_client', return_value=ddb_client), \
+            patch.object(m, 'SnsClient'):
+        blocker = m.CalendarBlocker(utils.get_logger(), correlation_id=None, max_workers=max_workers)
+    blocker.get_target_calendars = lambda: [
+        {'id': str(i), 'label': f'Calendar {i}', 'block_monday_morning': True} for i in [1, 2, 3]
+    ]
+    blocker.get_planning_horizon = lambda: (  # a Friday afternoon, when BlockCalendars runs
+        datetime.datetime(2030, 12, 27, 15, 0, tzinfo=datetime.timezone.utc),
+        datetime.datetime(2031, 1, 3, 15, 0, tzinfo=datetime.timezone.utc),
+    )
+    return blocker
+
+
+class TestCalendarBlockerConcurrency(test_utils.BaseTestCase):
+
+    def get_blocker(self, acuity_client, ddb_client, max_workers):
+        return get_blocker(acuity_client, ddb_client, max_workers)
+
+    def test_create_blocks_writes_rows_in_one_batch(self):
+        ddb_client = FakeDdbClient()
+        blocker = self.get_blocker(FakeAcuityClient(), ddb_client, max_workers=3)
+        self.assertEqual(([10, 20, 30], ['Calendar 1', 'Calendar 2', 'Calendar 3']), blocker.create_blocks())
+        self.assertEqual(['10', '20', '30'], [x['id'] for x in ddb_client.table.put_items])
+        self.assertEqual(['Calendar 1', 'Calendar 2', 'Calendar 3'], [x['calendar_name'] for x in ddb_client.table.put_items])
+        self.assertEqual({'new'}, {x['status'] for x in ddb_client.table.put_items})
+        self.assertEqual('calendar-block', ddb_client.table.put_items[0]['type'])
+
+    def test_create_blocks_stops_at_first_failure(self):
+        ddb_client = FakeDdbClient()
+        acuity_client = FakeAcuityClient(failing_ids=['2'])
+        blocker = self.get_blocker(acuity_client, ddb_client, max_workers=1)
+        with self.assertRaises(utils.DetailedValueError):
+            blocker.create_blocks()
+        self.assertEqual(['1', '2'], acuity_client.calls)
+        self.assertEqual(['10'], [x['id'] for x in ddb_client.table.put_items])  # so that clear_blocks deletes it
+
+    def test_delete_blocks_marks_failures_and_continues(self):
+        blocks = [{'id': x, 'status': 'new', 'details': {'calendarID': x}} for x in ['1', '2', '3']]
+        blocks.append({'id': '4', 'status': 'error', 'details': {'calendarID': '4'}})
+        ddb_client = FakeDdbClient(blocks=blocks)
+        acuity_client = FakeAcuityClient(failing_ids=['2'])
+        blocker = self.get_blocker(acuity_client, ddb_client, max_workers=2)
+        self.assertEqual((['1', '3'], ['Calendar 1', 'Calendar 3']), blocker.delete_blocks())
+        self.assertCountEqual(['1', '2', '3', 'get_calendar_by_id 1', 'get_calendar_by_id 3'], acuity_client.calls)
+        self.assertEqual(['1', '3'], ddb_client.table.delete_keys)
+        self.assertEqual(['2'], [x['id'] for x in ddb_client.table.put_items])
+        self.assertEqual('error', ddb_client.table.put_items[0]['status'])
+
+    def test_delete_blocks_uses_stored_calendar_names(self):
+        blocks = [
+            {'id': '1', 'status': 'new', 'details': {'calendarID': '1'}, 'calendar_name': 'André'},
+            {'id': '2', 'status': 'new', 'details': {'calendarID': '2'}},  # created before calendar_name was stored
+        ]
+        ddb_client = FakeDdbClient(blocks=blocks)
+        acuity_client = FakeAcuityClient()
+        blocker = self.get_blocker(acuity_client, ddb_client, max_workers=2)
+        self.assertEqual((['1', '2'], ['André', 'Calendar 2']), blocker.delete_blocks())
+        self.assertCountEqual(['1', '2', 'get_calendar_by_id 2'], acuity_client.calls)
+
+    def test_delete_blocks_releases_monday_morning_blocks_and_leaves_blocks_in_progress(self):
+        now = datetime.datetime(2030, 12, 30, 12, 0, tzinfo=datetime.timezone.utc)  # when ClearBlocks runs
+        blocks = [
+            {'id': '1', 'status': 'new', 'details': {'calendarID': '1', 'end': '2030-12-30T12:00:00+0000'}},
+            {'id': '2', 'status': 'new', 'details': {'calendarID': '2', 'end': '2031-01-02T00:00:00+0000'}},  # blackout
+        ]
+        ddb_client = FakeDdbClient(blocks=blocks)
+        acuity_client = FakeAcuityClient()
+        blocker = self.get_blocker(acuity_client, ddb_client, max_workers=2)
+        with patch.object(m.utils, 'now_with_tz', return_value=now):
+            self.assertEqual((['1'], ['Calendar 1']), blocker.delete_blocks())
+        self.assertEqual(['1'], ddb_client.table.delete_keys)
+
+    def test_create_blocks_skips_blocks_covered_by_blocks_in_progress(self):
+        blocks = [{'id': '7', 'status': 'new', 'details': {
+            'calendarID': 1, 'start': '2030-12-27T09:00:00+0000', 'end': '2031-01-02T12:00:00+0000',
+        }}]
+        ddb_client = FakeDdbClient(blocks=blocks)
+        acuity_client = FakeAcuityClient()
+        blocker = self.get_blocker(acuity_client, ddb_client, max_workers=3)
+        self.assertEqual(([20, 30], ['Calendar 2', 'Calendar 3']), blocker.create_blocks())
+        self.assertCountEqual(['2', '3'], acuity_client.calls)
+
+
+class TestReconcileBlocks(test_utils.BaseTestCase):
+    window = (datetime.datetime(2030, 12, 28, 0, 0), datetime.datetime(2030, 12, 30, 12, 0))
+    now = datetime.datetime(2030, 12, 27, 15, 0, tzinfo=datetime.timezone.utc)
+
+    def get_blocker(self, acuity_client, ddb_client, max_workers):
+        return get_blocker(acuity_client, ddb_client, max_workers)
+
+    def test_plan_block_changes(self):
+        start, end = self.window
+        desired = [
+            {'calendar_id': '1', 'calendar_name': 'Calendar 1', 'start': start, 'end': end},
+            {'calendar_id': '2', 'calendar_name': 'Calendar 2', 'start': start, 'end': end},
+        ]
+        blocks = [
+            acuity_block(10, 1, start, end),
+            acuity_block(11, 1, start, end),  # duplicate
+            acuity_block(20, 2, start, end, notes='Xmas break'),  # manual blocks are ignored
+            acuity_block(30, 3, start, end),  # calendar no longer blocked
+            acuity_block(31, 3, start - datetime.timedelta(days=7), end - datetime.timedelta(days=7)),  # in the past
+        ]
+        to_create, to_delete, unchanged = m.plan_block_changes(desired, blocks, now=self.now)
+        self.assertEqual([desired[1]], to_create)
+        self.assertEqual([11, 30], [x['id'] for x in to_delete])
+        self.assertEqual([(desired[0], blocks[0])], unchanged)
+
+    def test_reconcile_is_idempotent(self):
+        start, end = self.window
+        ddb_client = FakeDdbClient()
+        acuity_client = FakeAcuityClient(blocks=[
+            acuity_block(10, 1, start, end),  # created by a previous run that failed before writing its row
+            acuity_block(11, 1, start, end),
+        ])
+        blocker = self.get_blocker(acuity_client, ddb_client, max_workers=3)
+        diff = blocker.reconcile_blocks()
+        self.assertEqual([20, 30], [x['id'] for x in diff['created']])
+        self.assertEqual([11], [x['id'] for x in diff['deleted']])
+        self.assertEqual([10], [x['id'] for x in diff['unchanged']])
+        self.assertEqual([], diff['errors'])
+        self.assertCountEqual(['10', '20', '30'], [x['id'] for x in blocker.get_new_block_items()])
+
+        acuity_client.calls = list()
+        diff = blocker.reconcile_blocks()
+        self.assertEqual([], diff['created'] + diff['deleted'])
+        self.assertEqual([10, 20, 30], [x['id'] for x in diff['unchanged']])
+        self.assertEqual([], [x for x in acuity_client.calls if not x.startswith('get_blocks')])
+
+    def test_reconcile_lists_blocks_beyond_a_partial_page(self):
+        start, end = self.window
+        stale_start = datetime.datetime(2031, 1, 1, 9, 0)
+        acuity_client = FakeAcuityClient(blocks=[
+            acuity_block(10, 1, start, end),
+            acuity_block(20, 2, start, end),
+            acuity_block(30, 3, start, end),
+            acuity_block(31, 3, stale_start, stale_start + datetime.timedelta(hours=2)),
+            acuity_block(32, 3, stale_start + datetime.timedelta(hours=3), stale_start + datetime.timedelta(hours=4)),
+        ])
+        self.assertEqual(4, len(acuity_client.get_blocks(min_date='2030-12-27', max_date='2031-01-03', max_results=4)))
+        blocker = self.get_blocker(acuity_client, FakeDdbClient(), max_workers=3)
+        with patch.object(m.utils, 'now_with_tz', return_value=self.now):
+            diff = blocker.reconcile_blocks()
+        self.assertEqual([], diff['created'])
+        self.assertEqual([31, 32], [x['id'] for x in diff['deleted']])
+        self.assertEqual([10, 20, 30], [x['id'] for x in diff['unchanged']])
+
+    def test_reconcile_keeps_blocks_in_progress(self):
+        blackout_start = datetime.datetime(2030, 12, 27, 9, 0)  # before the planning horizon
+        blackout_end = datetime.datetime(2030, 12, 30, 12, 0)
+        blackout = acuity_block(10, 1, blackout_start, blackout_end)
+        ddb_client = FakeDdbClient(blocks=[{'id': '10', 'status': 'new', 'details': blackout}])
+        acuity_client = FakeAcuityClient(blocks=[blackout])
+        blocker = self.get_blocker(acuity_client, ddb_client, max_workers=3)
+        blocker.get_target_calendars = lambda: [{'id': '1', 'label': 'Calendar 1', 'block_rules': [
+            {'type': 'one_off', 'start': '2030-12-27 09:00', 'end': '2030-12-30 12:00'},
+        ]}]
+        with patch.object(m.utils, 'now_with_tz', return_value=self.now):
+            diff = blocker.reconcile_blocks()
+        self.assertEqual([], diff['created'] + diff['deleted'])
+        self.assertEqual([10], [x['id'] for x in diff['unchanged']])
+        self.assertEqual([], ddb_client.table.put_items)
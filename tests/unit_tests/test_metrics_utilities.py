@@ -0,0 +1,124 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import local.dev_config  # sets environment variables
+import local.secrets  # sets environment variables
+
+import json
+from unittest.mock import patch
+
+import thiscovery_dev_tools.testing_tools as test_utils
+import src.common.metrics_utilities as mu
+from src.common.cache_utilities import TtlCache
+from src.common.metrics_utilities import EMF_MAX_VALUES, MetricsLogger
+from src.common.tracing_utilities import Tracer
+
+
+class FakeClock:
+    def __init__(self, step):
+        self.now = 0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+class TestMetricsLogger(test_utils.BaseTestCase):
+
+    def setUp(self):
+        self.lines = list()
+        self.metrics = MetricsLogger(namespace='test-namespace', emit=self.lines.append, clock=FakeClock(step=0.5))
+
+    def get_documents(self):
+        return [json.loads(x) for x in self.lines]
+
+    def test_01_flush_writes_one_emf_document_per_invocation(self):
+        self.metrics.start_invocation('test_handler', correlation_id='test-correlation-id')
+        self.metrics.put_metric('ItemsProcessed', 3)
+        with self.metrics.timer('NotificationsMs'):
+            pass
+        with self.metrics.timer('NotificationsMs'):
+            pass
+        self.metrics.flush()
+        self.assertEqual(1, len(self.lines))
+        document = self.get_documents()[0]
+        self.assertEqual(
+            {
+                'Namespace': 'test-namespace',
+                'Dimensions': [['Handler']],
+                'Metrics': [
+                    {'Name': 'ItemsProcessed', 'Unit': 'Count'},
+                    {'Name': 'NotificationsMs', 'Unit': 'Milliseconds'},
+                    {'Name': 'Duration', 'Unit': 'Milliseconds'},
+                ],
+            },
+            document['_aws']['CloudWatchMetrics'][0]
+        )
+        self.assertEqual('test_handler', document['Handler'])
+        self.assertEqual('test-correlation-id', document['correlation_id'])
+        self.assertEqual(3, document['ItemsProcessed'])
+        self.assertEqual([500.0, 500.0], document['NotificationsMs'])
+        self.assertEqual(2500.0, document['Duration'])
+
+        self.metrics.flush()  # buffer was cleared
+        self.assertEqual(1, len(self.lines))
+
+    def test_02_metrics_put_before_invocation_are_flushed_with_it(self):
+        self.metrics.put_metric('InitWarmUpMs', 120, 'Milliseconds')
+        self.metrics.start_invocation('test_handler')
+        self.metrics.flush()
+        self.assertEqual(120, self.get_documents()[0]['InitWarmUpMs'])
+
+    def test_03_cache_hit_ratio_is_per_invocation(self):
+        cache = TtlCache(ttl=60)
+        self.metrics.track_cache('TestCache', cache)
+        cache.get('a')
+        cache.set('a', 1)
+        self.metrics.start_invocation('test_handler')
+        for _ in range(3):
+            cache.get('a')
+        cache.get('b')
+        self.metrics.flush()
+        self.assertEqual(75.0, self.get_documents()[0]['TestCacheHitRatio'])
+
+        self.metrics.start_invocation('test_handler')
+        self.metrics.flush()
+        self.assertNotIn('TestCacheHitRatio', self.get_documents()[1])
+
+    def test_04_collectors_and_value_limit(self):
+        self.metrics.add_collector(lambda m: m.put_metric('CollectedCount', 7))
+        for i in range(EMF_MAX_VALUES + 1):
+            self.metrics.put_metric('StoreAppointmentMs', i, 'Milliseconds')
+        self.metrics.flush()
+        documents = self.get_documents()
+        self.assertEqual(2, len(documents))
+        self.assertEqual(EMF_MAX_VALUES, len(documents[0]['StoreAppointmentMs']))
+        self.assertEqual(7, documents[0]['CollectedCount'])
+        self.assertEqual(EMF_MAX_VALUES, documents[1]['StoreAppointmentMs'])
+        self.assertEqual(['StoreAppointmentMs'], [x['Name'] for x in documents[1]['_aws']['CloudWatchMetrics'][0]['Metrics']])
+
+    def test_05_outbound_calls_counted_without_tracing(self):
+        tracer = Tracer(enabled=False)
+        for _ in range(2):
+            tracer.wrap(lambda: None, 'core_api', 'get_projects')()
+        with patch.object(mu, 'tracer', tracer):
+            mu._put_outbound_call_metrics(self.metrics)
+        self.metrics.flush()
+        document = self.get_documents()[0]
+        self.assertEqual(2, document['CoreApiCalls'])
+        self.assertNotIn('CoreApiMs', document)
@@ -16,8 +16,11 @@
 #   docs folder of this project.  It is also available www.gnu.org/licenses/
 #
 import copy
+import datetime
+from unittest.mock import patch
 
 import appointments as app
+import thiscovery_dev_tools.testing_tools as test_tools
 from common.constants import DEFAULT_TEMPLATES, INTERVIEWER_BOOKING_RESCHEDULING
 from testing_utilities import AppointmentsTestCase
 from thiscovery_lib import utilities as utils
@@ -176,4 +179,94 @@ class TestAppointmentNotifier(AppointmentsTestCase):
                 'user_last_name': 'Cresswell'
             },
             result
-        )
\ No newline at end of file
+        )
+
+    def test_14_get_custom_properties_computes_requested_properties_only(self):
+        an = app.AppointmentNotifier(
+            appointment=self.aa1,
+            logger=self.logger,
+            ddb_client=self.aa1._ddb_client,
+        )
+        result = an._get_custom_properties(
+            properties_list=['user_first_name'],
+            template_type='participant',
+        )
+        self.assertDictEqual({'user_first_name': 'Clive'}, result)
+        self.assertIsNone(an.appointment_datetime)
+        self.assertIsNone(an.interviewer_calendar_ddb_item)
+        self.assertIsNone(an.project_short_name)
+
+    def test_15_get_custom_properties_interviewer_url_researcher_only(self):
+        with self.assertRaises(utils.DetailedValueError):
+            self.an._get_custom_properties(
+                properties_list=['interviewer_url'],
+                template_type='participant',
+            )
+
+    def test_16_get_custom_properties_participant_anon_id_not_looked_up(self):
+        an = app.AppointmentNotifier(
+            appointment=self.aa1,
+            logger=self.logger,
+            ddb_client=self.aa1._ddb_client,
+        )
+        an.anon_project_specific_user_id = None
+        with patch.object(an, '_get_anon_project_specific_user_id') as lookup:
+            result = an._get_custom_properties(
+                properties_list=['anon_project_specific_user_id'],
+                template_type='participant',
+            )
+        self.assertDictEqual({'anon_project_specific_user_id': None}, result)
+        lookup.assert_not_called()
+
+
+class FakeAcuityAppointment(app.AcuityAppointment):
+    __slots__ = ('acuity_fetches', 'latest_acuity_info')
+
+    def get_appointment_info_from_acuity(self, force_refresh=False):
+        if (self.acuity_info is None) or force_refresh:
+            self.acuity_fetches += 1
+            self.acuity_info = dict(self.latest_acuity_info)
+            self.acuity_synced = str(utils.now_with_tz())
+        return self.acuity_info
+
+
+class TestStoredAcuityState(test_tools.BaseTestCase):
+
+    def get_notifier(self, synced_hours_ago, stored_canceled=False, latest_canceled=False, verify=False):
+        appointment = FakeAcuityAppointment(appointment_id='1001')
+        appointment.participant_email = 'clive@email.co.uk'
+        appointment.acuity_fetches = 0
+        appointment.acuity_info = {'canceled': stored_canceled, 'datetime': '2030-12-21T09:00:00+0000'}
+        appointment.latest_acuity_info = {'canceled': latest_canceled, 'datetime': '2030-12-21T09:00:00+0000'}
+        synced = utils.now_with_tz() - datetime.timedelta(hours=synced_hours_ago)
+        appointment.acuity_synced = str(synced.astimezone(datetime.timezone.utc))
+        notifier = app.AppointmentNotifier(appointment=appointment, ddb_client=object())
+        notifier._sample_verification = lambda: verify
+        return notifier
+
+    def test_01_reminders_trust_fresh_stored_state(self):
+        notifier = self.get_notifier(synced_hours_ago=1, stored_canceled=True)
+        self.assertTrue(notifier._check_appointment_cancelled(event_type='reminder'))
+        self.assertEqual(0, notifier.appointment.acuity_fetches)
+
+    def test_02_stale_stored_state_and_other_notifications_are_refetched(self):
+        notifier = self.get_notifier(synced_hours_ago=app.ACUITY_STATE_MAX_AGE_HOURS + 1, latest_canceled=True)
+        self.assertTrue(notifier._check_appointment_cancelled(event_type='reminder'))
+        self.assertEqual(1, notifier.appointment.acuity_fetches)
+
+        notifier = self.get_notifier(synced_hours_ago=1, latest_canceled=True)
+        self.assertTrue(notifier._check_appointment_cancelled(event_type='booking'))
+        self.assertEqual(1, notifier.appointment.acuity_fetches)
+
+    def test_03_sampled_verification_uses_latest_state(self):
+        notifier = self.get_notifier(synced_hours_ago=1, latest_canceled=True, verify=True)
+        self.assertTrue(notifier._check_appointment_cancelled(event_type='reminder'))
+        self.assertEqual(1, notifier.appointment.acuity_fetches)
+        notifier = self.get_notifier(synced_hours_ago=1, verify=True)
+        self.assertTrue(notifier._verify_stored_acuity_state())
+
+    def test_04_forced_refresh_ignores_fresh_stored_state(self):
+        notifier = self.get_notifier(synced_hours_ago=1, latest_canceled=True)
+        notifier.force_refresh = True
+        self.assertTrue(notifier._check_appointment_cancelled(event_type='reminder'))
+        self.assertEqual(1, notifier.appointment.acuity_fetches)
@@ -0,0 +1,90 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import local.dev_config  # sets environment variables
+import local.secrets  # sets environment variables
+
+import datetime
+
+import thiscovery_lib.utilities as utils
+import thiscovery_dev_tools.testing_tools as test_utils
+from src.common.reminder_cadence_utilities import get_due_stage, get_target_dates, plan_reminders, validate_cadence
+
+
+NOW = datetime.datetime(2030, 12, 20, 9, 0, tzinfo=datetime.timezone.utc)
+CADENCE = ['7d', '1d', '2h']
+
+
+def index_item(appointment_id, appointment_datetime, reminder_stage=None, appointment_type_id='1',
+               latest_participant_notification='2030-12-01 10:00:00+00:00'):
+    item = {
+        'id': appointment_id,
+        'appointment_date': appointment_datetime.split('T')[0],
+        'appointment_datetime': appointment_datetime,
+        'appointment_type_id': appointment_type_id,
+        'latest_participant_notification': latest_participant_notification,
+    }
+    if reminder_stage is not None:
+        item['reminder_stage'] = reminder_stage
+    return item
+
+
+class TestReminderCadence(test_utils.BaseTestCase):
+
+    def test_01_validate_cadence(self):
+        self.assertEqual(['7d', '36h', '1d', '2h'], validate_cadence(['2h', '1d', '7d', '36h', '1d']))
+        for invalid_cadence in [[], ['1w'], ['0d'], ['2']]:
+            with self.subTest(cadence=invalid_cadence):
+                with self.assertRaises(utils.DetailedValueError):
+                    validate_cadence(invalid_cadence)
+
+    def test_02_one_target_date_per_distinct_date(self):
+        self.assertEqual(['2030-12-20', '2030-12-21', '2030-12-27'], get_target_dates(CADENCE + ['1d', '3h'], NOW))
+        late_run = datetime.datetime(2030, 12, 20, 23, 0, tzinfo=datetime.timezone.utc)
+        self.assertEqual(['2030-12-20', '2030-12-21'], get_target_dates(['2h'], late_run))
+
+    def test_03_due_stage(self):
+        for item, expected_stage in [
+            (index_item('1', '2030-12-27T15:00:00+0000'), '7d'),
+            (index_item('2', '2030-12-21T15:00:00+0000'), '1d'),
+            (index_item('3', '2030-12-20T10:30:00+0000', reminder_stage='1d'), '2h'),
+            (index_item('4', '2030-12-20T15:00:00+0000', reminder_stage='1d'), None),  # 2h stage not due yet
+            (index_item('5', '2030-12-21T15:00:00+0000', reminder_stage='1d'), None),  # stage already sent
+            (index_item('6', '2030-12-20T10:30:00+0000', reminder_stage='2h'), None),
+            (index_item('7', '2030-12-20T08:30:00+0000'), None),  # in the past
+            (index_item('8', '2030-12-21T15:00:00+0000', latest_participant_notification='0000-00-00 00:00:00+00:00'), None),
+            (index_item('9', '2030-12-21T15:00:00+0000', latest_participant_notification='2030-12-20 07:00:00+00:00'), None),
+        ]:
+            with self.subTest(appointment_id=item['id']):
+                self.assertEqual(expected_stage, get_due_stage(item, CADENCE, NOW))
+
+    def test_04_closest_due_stage_sent_and_missed_stages_skipped(self):
+        item = index_item('1', '2030-12-21T10:00:00+0000')  # 7d stage missed
+        self.assertEqual('1d', get_due_stage(item, CADENCE, NOW))
+        self.assertIsNone(get_due_stage(index_item('2', '2030-12-21T10:00:00+0000', reminder_stage='2h'), CADENCE, NOW))
+
+    def test_05_plan_reminders_uses_appointment_type_cadence(self):
+        cadences = {'2': ['2h']}
+        items = [
+            index_item('1', '2030-12-21T15:00:00+0000', appointment_type_id='1'),
+            index_item('2', '2030-12-21T15:00:00+0000', appointment_type_id='2'),
+            index_item('3', '2030-12-20T10:00:00+0000', appointment_type_id='2'),
+        ]
+        self.assertEqual(
+            {'1': '1d', '3': '2h'},
+            plan_reminders(items, lambda type_id: cadences.get(type_id, ['1d']), NOW)
+        )
@@ -0,0 +1,134 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import local.dev_config  # sets environment variables
+import local.secrets  # sets environment variables
+
+import datetime
+
+import thiscovery_dev_tools.testing_tools as test_utils
+from src.common.reminder_schedule_utilities import ReminderSchedule, get_due_hour, get_reminder_due_times, \
+    parse_appointment_datetime
+
+
+UTC = datetime.timezone.utc
+NOW = datetime.datetime(2030, 12, 20, 9, 30, tzinfo=UTC)
+
+
+class FakeTable:
+
+    def __init__(self, ddb_client):
+        self.ddb_client = ddb_client
+
+    def put_item(self, Item):
+        self.ddb_client.items[(Item['due_hour'], Item['reminder_id'])] = Item
+
+    def batch_writer(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def delete_item(self, Key):
+        del self.ddb_client.items[(Key['due_hour'], Key['reminder_id'])]
+
+
+class FakeDdbClient:
+
+    def __init__(self):
+        self.items = dict()
+        self.queried_due_hours = list()
+
+    def get_table(self, table_name):
+        return FakeTable(self)
+
+    def query(self, table_name, KeyConditionExpression, ExpressionAttributeValues):
+        due_hour = ExpressionAttributeValues[':due_hour']
+        self.queried_due_hours.append(due_hour)
+        return [v for k, v in self.items.items() if k[0] == due_hour]
+
+
+class TestReminderDueTime(test_utils.BaseTestCase):
+
+    def test_01_due_hour_is_utc(self):
+        self.assertEqual('2030-06-20T08', get_due_hour(parse_appointment_datetime('2030-06-20T09:15:00+0100')))
+
+    def test_02_reminders_due_lead_time_before_appointment(self):
+        appointment = datetime.datetime(2030, 12, 30, 14, 0, tzinfo=UTC)
+        self.assertEqual([
+            ('7d', datetime.datetime(2030, 12, 23, 14, 0, tzinfo=UTC)),
+            ('1d', datetime.datetime(2030, 12, 29, 14, 0, tzinfo=UTC)),
+            ('2h', datetime.datetime(2030, 12, 30, 12, 0, tzinfo=UTC)),
+        ], get_reminder_due_times(appointment, NOW, ['2h', '1d', '7d']))
+
+    def test_03_short_notice_stages_dropped_and_closest_postponed(self):
+        appointment = datetime.datetime(2030, 12, 21, 9, 0, tzinfo=UTC)  # booked the previous morning
+        self.assertEqual(
+            [('1d', datetime.datetime(2030, 12, 20, 17, 30, tzinfo=UTC))],
+            get_reminder_due_times(appointment, NOW, ['7d', '1d'])
+        )
+        self.assertEqual(
+            [('2h', datetime.datetime(2030, 12, 21, 7, 0, tzinfo=UTC))],
+            get_reminder_due_times(appointment, NOW, ['7d', '1d', '2h'])
+        )
+
+    def test_04_no_reminder_close_to_appointment(self):
+        appointment = datetime.datetime(2030, 12, 20, 14, 0, tzinfo=UTC)
+        self.assertEqual([], get_reminder_due_times(appointment, NOW, ['1d']))
+
+
+class TestReminderSchedule(test_utils.BaseTestCase):
+
+    def setUp(self):
+        self.ddb_client = FakeDdbClient()
+        self.schedule = ReminderSchedule(ddb_client=self.ddb_client, catch_up_hours=2)
+
+    def test_01_schedule_writes_item_to_due_hour_partition(self):
+        reminders = self.schedule.schedule('1001', '2030-12-23T14:00:00+0000', cadence=['1d'], now=NOW)
+        self.assertEqual([{
+            'due_hour': '2030-12-22T14',
+            'reminder_id': '1001#1d',
+            'appointment_id': '1001',
+            'stage': '1d',
+            'due': '2030-12-22T14:00:00+00:00',
+            'appointment_datetime': '2030-12-23T14:00:00+0000',
+            'expires': int(datetime.datetime(2030, 12, 24, 14, 0, tzinfo=UTC).timestamp()),
+        }], reminders)
+        self.assertEqual(reminders, list(self.ddb_client.items.values()))
+
+    def test_02_schedule_skips_appointments_without_reminder(self):
+        self.assertEqual([], self.schedule.schedule('1001', '2030-12-20T10:00:00+0000', cadence=['1d'], now=NOW))
+        self.assertEqual(dict(), self.ddb_client.items)
+
+    def test_03_get_due_reminders_reads_catch_up_window_only(self):
+        for app_id, app_datetime in [
+            ('1001', '2030-12-21T07:00:00+0000'),  # due 2030-12-20T07:00, within the catch-up window
+            ('1002', '2030-12-21T09:10:00+0000'),  # due 2030-12-20T09:10
+            ('1003', '2030-12-21T09:45:00+0000'),  # due later in the current hour
+            ('1004', '2030-12-21T06:00:00+0000'),  # due before the catch-up window
+        ]:
+            self.schedule.schedule(app_id, app_datetime, cadence=['1d'], now=NOW - datetime.timedelta(days=3))
+        due_reminders = self.schedule.get_due_reminders(now=NOW)
+        self.assertEqual(['1001', '1002'], [x['appointment_id'] for x in due_reminders])
+        self.assertCountEqual(['2030-12-20T07', '2030-12-20T08', '2030-12-20T09'], self.ddb_client.queried_due_hours)
+
+        self.schedule.remove(due_reminders)
+        self.assertEqual([], self.schedule.get_due_reminders(now=NOW))
+        self.assertEqual(2, len(self.ddb_client.items))
@@ -164,3 +164,119 @@ class RemindersTestCase(test_tools.BaseTestCase, test_utils.DdbMixin):
         self.assertEqual(list(), response['Payload'])
         self.assertNotIn('FunctionError', response.keys())
 
+
+class FakeReminderSchedule:
+
+    def __init__(self, due_reminders):
+        self.due_reminders = due_reminders
+        self.removed = list()
+
+    def get_due_reminders(self, now=None):
+        return list(self.due_reminders)
+
+    def remove(self, reminders):
+        self.removed.extend(reminders)
+
+
+class FakeAppointment:
+
+    def __init__(self, appointment_datetime, canceled=False, latest_participant_notification='0000-00-00 00:00:00+00:00',
+                 reminder_stage=None):
+        self.acuity_info = {'datetime': appointment_datetime, 'canceled': canceled}
+        self.latest_participant_notification = latest_participant_notification
+        self.reminder_stage = reminder_stage
+
+
+class ScheduledRemindersTestCase(test_tools.BaseTestCase):
+    now = datetime.datetime(2030, 12, 20, 9, 30, tzinfo=datetime.timezone.utc)
+
+    def get_handler(self, due_reminders, appointments, send_results):
+        handler = rem.ScheduledRemindersHandler(
+            now=self.now,
+            reminder_schedule=FakeReminderSchedule(due_reminders),
+        )
+        handler.ddb_client = None
+        handler.load_appointment = lambda app_id: appointments[app_id]
+        handler.send_reminder = lambda appointment, stage: send_results.pop(0)
+        return handler
+
+    def test_send_scheduled_reminders(self):
+        due_reminders = [
+            {'appointment_id': x, 'appointment_datetime': '2030-12-21T09:00:00+0000', 'stage': '1d'}
+            for x in ['1001', '1002', '1003', '1004', '1005', '1006']
+        ]
+        appointments = {
+            '1001': FakeAppointment('2030-12-21T09:00:00+0000'),
+            '1002': FakeAppointment('2030-12-21T09:00:00+0000'),
+            '1003': FakeAppointment('2030-12-22T09:00:00+0000'),
+            '1004': FakeAppointment('2030-12-21T09:00:00+0000', canceled=True),
+            '1005': FakeAppointment('2030-12-21T09:00:00+0000',
+                                    latest_participant_notification='2030-12-20 08:30:00.000000+00:00'),
+            '1006': FakeAppointment('2030-12-21T09:00:00+0000', reminder_stage='1d'),  # stage already sent
+        }
+        handler = self.get_handler(due_reminders, appointments, [HTTPStatus.NO_CONTENT, HTTPStatus.BAD_REQUEST])
+        self.assertEqual(['1001', '1002', '1003', '1004', '1005', '1006'], handler.target_appointment_ids)
+        result = handler.send_reminders()
+        self.assertEqual([(HTTPStatus.NO_CONTENT, '1001'), (HTTPStatus.BAD_REQUEST, '1002')], result)
+        self.assertEqual(
+            ['1001', '1003', '1004', '1005', '1006'],
+            [x['appointment_id'] for x in handler.reminder_schedule.removed]
+        )
+
+
+class FakeAcuityClient:
+
+    def __init__(self, correlation_id=None):
+        self.listed_dates = list()
+
+    def get_appointments(self, min_date=None, max_date=None, canceled=False):
+        self.listed_dates.append((min_date, max_date, canceled))
+        return [
+            {'id': 1001, 'datetime': '2030-12-21T09:00:00+0000', 'canceled': False},
+            {'id': 1002, 'datetime': '2030-12-21T11:00:00+0000', 'canceled': True},
+        ]
+
+
+class AcuitySnapshotTestCase(test_tools.BaseTestCase):
+
+    def test_apply_acuity_snapshot(self):
+        acuity_client = FakeAcuityClient()
+        original_acuity_client = rem.AcuityClient
+        rem.AcuityClient = lambda correlation_id: acuity_client
+        try:
+            handler = rem.RemindersHandler(acuity_prefetch=True)
+            handler.appointment_dates = {'1001': '2030-12-21', '1002': '2030-12-21', '1003': '2030-12-21'}
+            appointments = dict()
+            for app_id in ['1001', '1002', '1003']:
+                appointments[app_id] = FakeAppointment('2030-12-21T09:00:00+0000')
+                appointments[app_id].appointment_id = app_id
+            self.assertTrue(handler.apply_acuity_snapshot(appointments['1001']))
+            self.assertTrue(handler.apply_acuity_snapshot(appointments['1002']))  # rescheduled and cancelled
+            self.assertFalse(handler.apply_acuity_snapshot(appointments['1003']))  # moved to another date
+        finally:
+            rem.AcuityClient = original_acuity_client
+        self.assertEqual([('2030-12-21', '2030-12-21', None)], acuity_client.listed_dates)
+        self.assertTrue(appointments['1002'].acuity_info['canceled'])
+        self.assertEqual('2030-12-21T11:00:00+0000', appointments['1002'].acuity_info['datetime'])
+
+    def test_appointments_missing_from_snapshot_are_refetched(self):
+        acuity_client = FakeAcuityClient()
+        original_acuity_client = rem.AcuityClient
+        rem.AcuityClient = lambda correlation_id: acuity_client
+        try:
+            handler = rem.RemindersHandler(acuity_prefetch=True)
+            handler.target_appointment_ids = ['1001', '1003']
+            handler.appointment_dates = {'1001': '2030-12-21', '1003': '2030-12-21'}
+            appointments = dict()
+            for app_id in handler.target_appointment_ids:
+                appointments[app_id] = FakeAppointment('2030-12-21T09:00:00+0000')
+                appointments[app_id].appointment_id = app_id
+            handler.load_appointment = lambda app_id: appointments[app_id]
+            sent = list()
+            handler.send_reminder = lambda appointment, stage, acuity_info_fresh, force_refresh: sent.append(
+                (appointment.appointment_id, acuity_info_fresh, force_refresh)
+            )
+            handler.send_reminders()
+        finally:
+            rem.AcuityClient = original_acuity_client
+        self.assertEqual([('1001', True, False), ('1003', False, True)], sent)  # 1003 was moved to another date
@@ -0,0 +1,108 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import local.dev_config  # sets environment variables
+import local.secrets  # sets environment variables
+
+import threading
+
+import thiscovery_dev_tools.testing_tools as test_utils
+from src.common.invocation_utilities import invocation_hooks, register_invocation_hooks
+from src.common.secrets_utilities import SecretsCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeSecretsManager:
+    def __init__(self):
+        self.calls = list()
+        self.version = 1
+        self.lock = threading.Lock()
+
+    def __call__(self, secret_name):
+        with self.lock:
+            self.calls.append(secret_name)
+        return {'name': secret_name, 'version': self.version}
+
+
+class TestSecretsCache(test_utils.BaseTestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.fetcher = FakeSecretsManager()
+        self.cache = SecretsCache(ttl=100, refresh_after=10, fetcher=self.fetcher, clock=self.clock)
+
+    def test_01_get_served_from_cache_until_ttl(self):
+        self.assertEqual(1, self.cache.get('interviews')['version'])
+        self.clock.now = 5
+        self.assertEqual(1, self.cache.get('interviews')['version'])
+        self.assertEqual(['interviews'], self.fetcher.calls)
+        self.fetcher.version = 2
+        self.clock.now = 100
+        self.assertEqual(2, self.cache.get('interviews')['version'])
+        self.assertEqual(2, self.cache.reset_call_count())
+
+    def test_02_stale_secret_refreshed_in_background(self):
+        self.cache.get('interviews')
+        refreshed = threading.Event()
+        self.cache._fetcher = lambda name: (refreshed.set(), self.fetcher(name))[1]
+        self.fetcher.version = 2
+        self.clock.now = 50
+        self.assertEqual(1, self.cache.get('interviews')['version'])  # stale value is served straight away
+        self.assertTrue(refreshed.wait(timeout=5))
+        for _ in range(500):
+            if not self.cache._refreshing:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(2, self.cache.get('interviews')['version'])
+
+    def test_03_warm_up_fetches_missing_secrets_only(self):
+        self.cache.get('interviews')
+        self.cache.warm_up(['acuity-connection', 'interviews', 'sns-topics'])
+        self.assertCountEqual(['interviews', 'acuity-connection', 'sns-topics'], self.fetcher.calls)
+        self.cache.warm_up(['acuity-connection', 'interviews', 'sns-topics'])
+        self.assertEqual(3, self.cache.reset_call_count())
+        self.assertEqual(0, self.cache.reset_call_count())
+
+
+class TestInvocationHooks(test_utils.BaseTestCase):
+
+    def test_end_hooks_run_when_handler_raises(self):
+        seen = list()
+
+        def on_start(event, handler_name):
+            seen.append(('start', handler_name))
+
+        def on_end(event, handler_name):
+            seen.append(('end', handler_name))
+
+        register_invocation_hooks(on_start=on_start, on_end=on_end)
+        register_invocation_hooks(on_start=on_start, on_end=on_end)  # duplicates are ignored
+
+        @invocation_hooks
+        def handler(event, context):
+            raise ValueError('Deliberate error')
+
+        with self.assertRaises(ValueError):
+            handler({'id': 1}, None)
+        self.assertEqual([('start', 'handler'), ('end', 'handler')], seen)
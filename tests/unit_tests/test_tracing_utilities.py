@@ -0,0 +1,116 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import local.dev_config  # sets environment variables
+import local.secrets  # sets environment variables
+
+from unittest.mock import patch
+
+import thiscovery_dev_tools.testing_tools as test_utils
+import src.common.acuity_utilities as acuity
+from src.common.tracing_utilities import Tracer
+
+
+class FakeClock:
+    def __init__(self, step):
+        self.now = 0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+class FakeClient:
+    def get_item(self, table_name, key):
+        return {'id': key}
+
+    def put_item(self, table_name, key):
+        raise ValueError('Deliberate error')
+
+
+class FakeResponse:
+    status_code = 200
+    content = b'{}'
+
+
+class FakeSession:
+    def request(self, method, url, *args, **kwargs):
+        return FakeResponse()
+
+
+class TestTracer(test_utils.BaseTestCase):
+
+    def setUp(self):
+        self.tracer = Tracer(enabled=True, max_spans=2, clock=FakeClock(step=0.01))
+        self.tracer.start_invocation(correlation_id='test-correlation-id')
+
+    def test_01_disabled_tracer_only_counts_calls(self):
+        tracer = Tracer(enabled=False)
+        client = tracer.trace_methods(FakeClient(), 'dynamodb', ['get_item'])
+        self.assertEqual({'id': '1'}, client.get_item('Appointments', '1'))
+        tracer.wrap(lambda: None, 'sns', 'publish')()
+        with patch.object(acuity, 'tracer', tracer):
+            acuity._trace_session(FakeSession()).request('get', 'https://acuityscheduling.com/api/v1/blocks')
+        self.assertEqual({'dynamodb': 1, 'sns': 1, 'acuity': 1}, tracer.call_counts)
+        self.assertEqual([], tracer.spans)
+        tracer.reset_call_counts()
+        self.assertEqual(dict(), tracer.call_counts)
+
+    def test_02_trace_methods_records_spans(self):
+        client = self.tracer.trace_methods(FakeClient(), 'dynamodb', ['get_item', 'put_item', 'missing_method'],
+                                           get_target=lambda args, kwargs: args[0])
+        self.assertEqual({'id': '1'}, client.get_item('Appointments', '1'))
+        with self.assertRaises(ValueError):
+            client.put_item('Appointments', '2')
+        self.assertEqual([
+            {'service': 'dynamodb', 'operation': 'get_item', 'target': 'Appointments', 'duration_ms': 10.0,
+             'bytes': 11, 'status': 'ok'},
+            {'service': 'dynamodb', 'operation': 'put_item', 'target': 'Appointments', 'duration_ms': 10.0,
+             'status': 'ValueError'},
+        ], [s.as_dict() for s in self.tracer.spans])
+
+    def test_03_summary_aggregates_by_operation(self):
+        core_api_call = self.tracer.wrap(lambda: {'statusCode': 500}, 'core_api', 'send_transactional_email')
+        for _ in range(3):
+            core_api_call()
+        summary = self.tracer.summary()
+        self.assertEqual('test-correlation-id', summary['correlation_id'])
+        self.assertEqual(3, summary['outbound_calls'])
+        self.assertEqual(30.0, summary['outbound_ms'])
+        self.assertEqual(
+            {'calls': 3, 'total_ms': 30.0, 'max_ms': 10.0, 'bytes': 57, 'errors': 3},
+            summary['by_operation']['core_api.send_transactional_email']
+        )
+        self.assertEqual(2, len(summary['spans']))
+        self.assertTrue(summary['spans_truncated'])
+
+    def test_04_start_invocation_discards_previous_spans(self):
+        self.tracer.wrap(lambda: None, 'sns', 'publish')()
+        self.assertEqual({'sns': 1}, self.tracer.call_counts)
+        self.tracer.start_invocation(correlation_id='another-correlation-id')
+        self.assertEqual(0, self.tracer.summary()['outbound_calls'])
+        self.assertEqual(dict(), self.tracer.call_counts)
+
+    def test_05_acuity_session_spans_named_after_api_path(self):
+        with patch.object(acuity, 'tracer', self.tracer):
+            session = acuity._trace_session(FakeSession())
+            session.request('get', 'https://acuityscheduling.com/api/v1/appointments/399682887?pastFormAnswers=true')
+        self.assertEqual([
+            {'service': 'acuity', 'operation': 'GET appointments/{id}', 'duration_ms': 10.0, 'bytes': 2,
+             'status': 200},
+        ], [s.as_dict() for s in self.tracer.spans])
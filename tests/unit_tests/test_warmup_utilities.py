@@ -0,0 +1,54 @@
+#
+#   Thiscovery API - THIS Institute’s citizen science platform
+#   Copyright (C) 2019 THIS Institute
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   A copy of the GNU Affero General Public License is available in the
+#   docs folder of this project.  It is also available www.gnu.org/licenses/
+#
+import local.dev_config  # sets environment variables
+import local.secrets  # sets environment variables
+
+from unittest.mock import patch
+
+import thiscovery_dev_tools.testing_tools as test_utils
+import src.common.warmup_utilities as wu
+from src.common.warmup_utilities import get_lambda_handler, should_warm_up, warm_up
+
+
+class TestWarmUp(test_utils.BaseTestCase):
+
+    def test_should_warm_up_false_in_unit_tests(self):
+        self.assertFalse(should_warm_up())
+
+    def test_should_warm_up_only_in_handler_module(self):
+        lambda_env = {'AWS_LAMBDA_FUNCTION_NAME': 'SendAppointmentReminder', '_HANDLER': 'reminders.interview_reminder_handler'}
+        with patch.dict(wu.os.environ, lambda_env), patch.object(wu.utils, 'running_unit_tests', return_value=False):
+            self.assertEqual(('reminders', 'interview_reminder_handler'), get_lambda_handler())
+            self.assertTrue(should_warm_up('reminders'))
+            self.assertFalse(should_warm_up('appointments'))
+
+    def test_warm_up_times_phases_and_does_not_raise(self):
+        calls = list()
+
+        def failing_phase():
+            calls.append('failing')
+            raise ValueError('Deliberate error')
+
+        timings = warm_up([
+            ('first', lambda: calls.append('first')),
+            ('failing', failing_phase),
+            ('last', lambda: calls.append('last')),
+        ])
+        self.assertEqual(['first', 'failing', 'last'], calls)
+        self.assertCountEqual(['first', 'failing', 'last', 'total'], timings.keys())
+        self.assertGreaterEqual(timings['total'], timings['failing'])